@@ -11,6 +11,7 @@ def register(l1_core: owlready2.Ontology, l4_core: owlready2.Ontology, l4_de: ow
         class Driveable_Lane(owlready2.Thing):
 
             @augment(AugmentationType.OBJECT_PROPERTY, "sfIntersects_lane_driver")
+            @local
             def augment_intersects_lane_driver(self, other: l4_core.Driver):
                 if same_scene(self, other) and has_geometry(self) and has_geometry(other):
                     geo_self = wkt.loads(self.hasGeometry[0].asWKT[0])
@@ -20,6 +21,7 @@ def register(l1_core: owlready2.Ontology, l4_core: owlready2.Ontology, l4_de: ow
         @augment_class
         class Non_Driveable_Lane(owlready2.Thing):
             @augment(AugmentationType.OBJECT_PROPERTY, "sfIntersects_nonlane_bicyclist")
+            @local
             def augment_intersects_nonlane_bicyclist(self, other: l4_de.Bicyclist):
                 if same_scene(self, other) and has_geometry(self) and has_geometry(other):
                     geo_self = wkt.loads(self.hasGeometry[0].asWKT[0])
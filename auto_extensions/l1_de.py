@@ -11,6 +11,7 @@ def register(l1_de: owlready2.Ontology, l1_core: owlready2.Ontology, l4_de: owlr
         class Pedestrian_Crossing(owlready2.Thing):
 
             @augment(AugmentationType.OBJECT_PROPERTY, "sfIntersects_crosswalk_lane")
+            @local
             def augment_intersects_crosswalk_lane(self, other: l1_core.Driveable_Lane):
                 if same_scene(self, other) and has_geometry(self) and has_geometry(other):
                     geo_self = wkt.loads(self.hasGeometry[0].asWKT[0])
@@ -18,6 +19,7 @@ def register(l1_de: owlready2.Ontology, l1_core: owlready2.Ontology, l4_de: owlr
                     return geo_self.intersects(geo_other)
 
             @augment(AugmentationType.OBJECT_PROPERTY, "sfIntersects_crosswalk_bicyclist")
+            @local
             def augment_intersects_crosswalk_bicyclist(self, other: l4_de.Bicyclist):
                 if same_scene(self, other) and has_geometry(self) and has_geometry(other):
                     geo_self = wkt.loads(self.hasGeometry[0].asWKT[0])
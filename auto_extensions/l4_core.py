@@ -21,6 +21,56 @@ def _rec_ids(i):
     return ids
 
 
+def get_relevant_area_ped(a: Polygon, speed: float) -> Polygon:
+    """
+    Helper function for CP small distance for pedestrians. Gets the relevant area of a pedestrian as a Polygon.
+    """
+    if speed > 0:
+        return a.centroid.buffer(_MAX_TIME_SMALL_DISTANCE * speed + math.sqrt(a.area))
+    else:
+        return a
+
+
+def get_relevant_area_veh(a: Polygon, speed: float, yaw: float, max_yaw_rate: float, max_yaw: float = 20) -> \
+        Polygon:
+    """
+    Helper function for CP small distance for vehicles. Gets the relevant area of a vehicle as a Polygon.
+    """
+
+    def pos(a_pos: tuple, speed_pos: float, yaw_pos: float, max_yaw_rate_pos: float, max_yaw_pos: float,
+            t_pos: float) \
+            -> tuple:
+        """
+        Simple prediction model. Calculates the 2D-point at which the actor will be  at time t + t_pos assuming the
+        given parameters.
+        """
+        if abs(max_yaw_rate_pos * t_pos) <= max_yaw_pos:
+            theta = (yaw_pos + (max_yaw_rate_pos * (t_pos ** 2)) / 2) % 360
+        else:
+            theta = (yaw_pos + (
+                    -(max_yaw_pos ** 2) / (2 * max_yaw_rate_pos) + numpy.sign(max_yaw_rate_pos) * max_yaw *
+                    t_pos)) % 360
+        return speed_pos * t_pos * math.cos(math.radians(theta)) + a_pos[0], \
+               speed_pos * t_pos * math.sin(math.radians(theta)) + a_pos[1]
+
+    yaw_sampling = 1
+    samples = []
+    for cur_max_yaw_rate in numpy.arange(-max_yaw_rate, max_yaw_rate + yaw_sampling, yaw_sampling):
+        path = []
+        if cur_max_yaw_rate < 0:
+            a_point = left_front_point(a, yaw)
+        else:
+            a_point = right_front_point(a, yaw)
+        if abs(cur_max_yaw_rate) == max_yaw_rate:
+            for t in numpy.arange(0, _MAX_TIME_SMALL_DISTANCE + 0.2, 0.2):
+                path.append(pos(a_point, speed, yaw, cur_max_yaw_rate, max_yaw, t))
+        else:
+            path.append(pos(a_point, speed, yaw, cur_max_yaw_rate, max_yaw, _MAX_TIME_SMALL_DISTANCE))
+        samples.append(path)
+    geo = Polygon(samples[0] + [x[-1] for x in samples] + list(reversed(samples[-1])))
+    return geo.union(a)
+
+
 def register(l4_core: owlready2.Ontology, l4_de: owlready2.Ontology, l2_de: owlready2.Ontology,
              physics: owlready2.Ontology, time: owlready2.Ontology):
     def get_relevant_area(thing: owlready2.Thing) -> Polygon:
@@ -53,59 +103,12 @@ def register(l4_core: owlready2.Ontology, l4_de: owlready2.Ontology, l2_de: owlr
         else:
             return geom
 
-    def get_relevant_area_ped(a: Polygon, speed: float) -> Polygon:
-        """
-        Helper function for CP small distance for pedestrians. Gets the relevant area of a pedestrian as a Polygon.
-        """
-        if speed > 0:
-            return a.centroid.buffer(_MAX_TIME_SMALL_DISTANCE * speed + math.sqrt(a.area))
-        else:
-            return a
-
-    def get_relevant_area_veh(a: Polygon, speed: float, yaw: float, max_yaw_rate: float, max_yaw: float = 20) -> \
-            Polygon:
-        """
-        Helper function for CP small distance for vehicles. Gets the relevant area of a vehicle as a Polygon.
-        """
-
-        def pos(a_pos: tuple, speed_pos: float, yaw_pos: float, max_yaw_rate_pos: float, max_yaw_pos: float,
-                t_pos: float) \
-                -> tuple:
-            """
-            Simple prediction model. Calculates the 2D-point at which the actor will be  at time t + t_pos assuming the
-            given parameters.
-            """
-            if abs(max_yaw_rate_pos * t_pos) <= max_yaw_pos:
-                theta = (yaw_pos + (max_yaw_rate_pos * (t_pos ** 2)) / 2) % 360
-            else:
-                theta = (yaw_pos + (
-                        -(max_yaw_pos ** 2) / (2 * max_yaw_rate_pos) + numpy.sign(max_yaw_rate_pos) * max_yaw *
-                        t_pos)) % 360
-            return speed_pos * t_pos * math.cos(math.radians(theta)) + a_pos[0], \
-                   speed_pos * t_pos * math.sin(math.radians(theta)) + a_pos[1]
-
-        yaw_sampling = 1
-        samples = []
-        for cur_max_yaw_rate in numpy.arange(-max_yaw_rate, max_yaw_rate + yaw_sampling, yaw_sampling):
-            path = []
-            if cur_max_yaw_rate < 0:
-                a_point = left_front_point(a, yaw)
-            else:
-                a_point = right_front_point(a, yaw)
-            if abs(cur_max_yaw_rate) == max_yaw_rate:
-                for t in numpy.arange(0, _MAX_TIME_SMALL_DISTANCE + 0.2, 0.2):
-                    path.append(pos(a_point, speed, yaw, cur_max_yaw_rate, max_yaw, t))
-            else:
-                path.append(pos(a_point, speed, yaw, cur_max_yaw_rate, max_yaw, _MAX_TIME_SMALL_DISTANCE))
-            samples.append(path)
-        geo = Polygon(samples[0] + [x[-1] for x in samples] + list(reversed(samples[-1])))
-        return geo.union(a)
-
     with l4_core:
 
         @augment_class
         class Pedestrian(owlready2.Thing):
             @augment(AugmentationType.OBJECT_PROPERTY, "CP_150")
+            @local
             def augment_cp_150(self, other: physics.Spatial_Object):
                 # Small distance
                 if self != other and same_scene(self, other) and has_geometry(self) and has_geometry(other) and \
@@ -118,6 +121,7 @@ def register(l4_core: owlready2.Ontology, l4_de: owlready2.Ontology, l2_de: owlr
         @augment_class
         class Vehicle(owlready2.Thing):
             @augment(AugmentationType.OBJECT_PROPERTY, "CP_150")
+            @local
             def augment_cp_150(self, other: physics.Spatial_Object):
                 # Small distance
                 if self != other and same_scene(self, other) and has_geometry(self) and has_geometry(other) and \
@@ -14,83 +14,85 @@ _OCCLUSION_SAMPLING_STEP = 0.25  # °, the step size that is used to sample the
 _DEBUG_OCCLUSION = False  # shows debug outputs for occlusion (plot, tty)
 
 
-def register(perception: owlready2.Ontology):
-    def get_occluded_areas(others: list, fov, visibility=None):
-        if visibility is None:
-            visibility = _DEFAULT_VISIBILITY
-        cutoffs = dict()
-        geos = []
-        for x in others:
-            geo = wkt.loads(wkt.dumps(wkt.loads(x.hasGeometry[0].asWKT[0]), output_dimension=2)).buffer(0)
-            geos.append(geo.intersection(fov))
-        for i, a in enumerate(geos):
-            if isinstance(a, Point):
-                points = [(a.x, a.y)]
-            else:
-                points = list(zip(a.exterior.xy[0], a.exterior.xy[1]))
-            angles = []
-            angle_points = []
-            for p in points:
-                rel_p = (p[0] - fov.centroid.x, p[1] - fov.centroid.y)
-                angles.append(math.degrees(math.atan2(rel_p[1], rel_p[0])) % 360)
-                angle_points.append(p)
-            y_points = [x[1] for x in points]
-            if min(y_points) <= fov.centroid.y <= max(y_points) and len([x for x in angles if x < 90]) > 0 and \
-                    len([x for x in angles if x > 270]) > 0:
-                min_angle = min([x for x in angles if x >= 180])
-                max_angle = max([x for x in angles if x < 180])
-            else:
-                min_angle = min(angles)
-                max_angle = max(angles)
-            samples = []
-            for alpha in np.arange(0, (max_angle - min_angle) % 360, _OCCLUSION_SAMPLING_STEP):
-                angle = (min_angle + alpha) % 360
-                samples.append((visibility * math.cos(math.radians(angle)) + fov.centroid.x,
-                                visibility * math.sin(math.radians(angle)) + fov.centroid.y))
-            samples += [points[angles.index(max_angle)], points[angles.index(min_angle)]]
-            if len(samples) > 2:
-                cutoff = Polygon(samples)
-            elif len(samples) == 2:
-                cutoff = LineString(samples)
-            elif len(samples) == 1:
-                cutoff = Point(samples)
-            else:
-                cutoff = Polygon()
-            cutoff = cutoff.buffer(0).union(a)
-            cutoffs[others[i]] = cutoff
-            if _DEBUG_OCCLUSION and hasattr(cutoff, "exterior"):
-                plt.plot(*cutoff.exterior.xy, color="black")
-        return cutoffs
+def get_occluded_areas(others: list, fov, visibility=None):
+    if visibility is None:
+        visibility = _DEFAULT_VISIBILITY
+    cutoffs = dict()
+    geos = []
+    for x in others:
+        geo = wkt.loads(wkt.dumps(wkt.loads(x.hasGeometry[0].asWKT[0]), output_dimension=2)).buffer(0)
+        geos.append(geo.intersection(fov))
+    for i, a in enumerate(geos):
+        if isinstance(a, Point):
+            points = [(a.x, a.y)]
+        else:
+            points = list(zip(a.exterior.xy[0], a.exterior.xy[1]))
+        angles = []
+        angle_points = []
+        for p in points:
+            rel_p = (p[0] - fov.centroid.x, p[1] - fov.centroid.y)
+            angles.append(math.degrees(math.atan2(rel_p[1], rel_p[0])) % 360)
+            angle_points.append(p)
+        y_points = [x[1] for x in points]
+        if min(y_points) <= fov.centroid.y <= max(y_points) and len([x for x in angles if x < 90]) > 0 and \
+                len([x for x in angles if x > 270]) > 0:
+            min_angle = min([x for x in angles if x >= 180])
+            max_angle = max([x for x in angles if x < 180])
+        else:
+            min_angle = min(angles)
+            max_angle = max(angles)
+        samples = []
+        for alpha in np.arange(0, (max_angle - min_angle) % 360, _OCCLUSION_SAMPLING_STEP):
+            angle = (min_angle + alpha) % 360
+            samples.append((visibility * math.cos(math.radians(angle)) + fov.centroid.x,
+                            visibility * math.sin(math.radians(angle)) + fov.centroid.y))
+        samples += [points[angles.index(max_angle)], points[angles.index(min_angle)]]
+        if len(samples) > 2:
+            cutoff = Polygon(samples)
+        elif len(samples) == 2:
+            cutoff = LineString(samples)
+        elif len(samples) == 1:
+            cutoff = Point(samples)
+        else:
+            cutoff = Polygon()
+        cutoff = cutoff.buffer(0).union(a)
+        cutoffs[others[i]] = cutoff
+        if _DEBUG_OCCLUSION and hasattr(cutoff, "exterior"):
+            plt.plot(*cutoff.exterior.xy, color="black")
+    return cutoffs
+
 
-    def get_occlusions(others: list, cutoffs: dict, fov):
-        occs = []
-        geos = [wkt.loads(wkt.dumps(wkt.loads(x.hasGeometry[0].asWKT[0]), output_dimension=2)).buffer(0)
-                for x in others]
-        for i, geom in enumerate(geos):
-            fov_intersection = geom.intersection(fov).area
-            if fov_intersection > 0:
-                ints = []
-                for a in cutoffs.keys():
-                    if a != others[i]:
-                        intersection = geom.intersection(cutoffs[a])
-                        if intersection.area > 0:
-                            ints.append((a, intersection))
-                            if _DEBUG_OCCLUSION:
-                                if not intersection.is_empty and not isinstance(intersection, Point):
-                                    if hasattr(cutoffs[a], "exterior"):
-                                        plt.fill(*cutoffs[a].exterior.xy, color="coral")
-                                    elif isinstance(cutoffs[a], MultiPolygon):
-                                        for pg in cutoffs[a]:
-                                            plt.fill(*pg.exterior.xy, color="coral")
-                if len(ints) > 0:
-                    union = ints[0][1]
-                    for j in ints[1:]:
-                        union = union.union(j[1])
-                    percentage = min(int((union.area / fov_intersection) * 100) / 100, 1.0)
-                    occ = ([j[0] for j in ints], others[i], percentage)
-                    occs.append(occ)
-        return occs
+def get_occlusions(others: list, cutoffs: dict, fov):
+    occs = []
+    geos = [wkt.loads(wkt.dumps(wkt.loads(x.hasGeometry[0].asWKT[0]), output_dimension=2)).buffer(0)
+            for x in others]
+    for i, geom in enumerate(geos):
+        fov_intersection = geom.intersection(fov).area
+        if fov_intersection > 0:
+            ints = []
+            for a in cutoffs.keys():
+                if a != others[i]:
+                    intersection = geom.intersection(cutoffs[a])
+                    if intersection.area > 0:
+                        ints.append((a, intersection))
+                        if _DEBUG_OCCLUSION:
+                            if not intersection.is_empty and not isinstance(intersection, Point):
+                                if hasattr(cutoffs[a], "exterior"):
+                                    plt.fill(*cutoffs[a].exterior.xy, color="coral")
+                                elif isinstance(cutoffs[a], MultiPolygon):
+                                    for pg in cutoffs[a]:
+                                        plt.fill(*pg.exterior.xy, color="coral")
+            if len(ints) > 0:
+                union = ints[0][1]
+                for j in ints[1:]:
+                    union = union.union(j[1])
+                percentage = min(int((union.area / fov_intersection) * 100) / 100, 1.0)
+                occ = ([j[0] for j in ints], others[i], percentage)
+                occs.append(occ)
+    return occs
 
+
+def register(perception: owlready2.Ontology):
     with perception:
 
         @augment_class
@@ -105,6 +107,7 @@ def register(perception: owlready2.Ontology):
                                                            other_geom.equals(self_geom)))
 
             @augment(AugmentationType.CLASS_SUBSUMPTION, None)  # This is a bit hacky, but is more performant
+            @reads_world
             def augment_occlusion(self):
                 if has_geometry(self) and (self.has_yaw is not None or (len(self.drives) > 0 and self.drives[0].has_yaw
                                            is not None and has_geometry(self.drives[0]))) and \
@@ -21,6 +21,41 @@ def _lies_within_spatial_predicate_threshold(geo_self, geo_other):
     return float(geo_self.distance(geo_other)) <= _SPATIAL_PREDICATE_THRESHOLD
 
 
+def has_intersecting_path(p_1, yaw_1: float, speed_1: float, p_2, yaw_2: float, speed_2: float):
+    """
+    Checks whether the straight paths of two objects intersect soon and with a small post-encroachment time.
+    :param p_1: The position of the first object (a shapely Point).
+    :param yaw_1: The yaw of the first object (in degrees).
+    :param speed_1: The (non-zero) speed of the first object, negative if it moves backwards.
+    :param p_2: The position of the second object (a shapely Point).
+    :param yaw_2: The yaw of the second object (in degrees).
+    :param speed_2: The (non-zero) speed of the second object, negative if it moves backwards.
+    :return: True iff. the paths intersect in the near future with a small post-encroachment time, False otherwise,
+    None if both objects have the same position.
+    """
+    p_self = geometry.Point(p_1.x, p_1.y)
+    p_other = geometry.Point(p_2.x, p_2.y)
+    if p_self != p_other:
+        if speed_1 < 0:
+            yaw_1 = (yaw_1 + 180) % 360
+        if speed_2 < 0:
+            yaw_2 = (yaw_2 + 180) % 360
+        p_self_1 = geometry.Point(p_1.x + math.cos(math.radians(yaw_1)), p_1.y + math.sin(math.radians(yaw_1)))
+        p_other_1 = geometry.Point(p_2.x + math.cos(math.radians(yaw_2)), p_2.y + math.sin(math.radians(yaw_2)))
+        self_path = geometry.Ray(p_self, p_self_1)
+        other_path = geometry.Ray(p_other, p_other_1)
+        p_cross = geometry.intersection(self_path, other_path)
+        if len(p_cross) > 0:
+            d_self = geometry.Point.distance(p_cross[0], p_self)
+            d_other = geometry.Point.distance(p_cross[0], p_other)
+            t_self = float(d_self) / speed_1
+            t_other = float(d_other) / speed_2
+            return t_self + t_other < _INTERSECTING_PATH_THRESHOLD and \
+                abs(t_self - t_other) < _INTERSECTING_PATH_MAX_PET
+        else:
+            return False
+
+
 def register(physics: owlready2.Ontology):
     with physics:
 
@@ -28,6 +63,7 @@ def register(physics: owlready2.Ontology):
         class Dynamical_Object(owlready2.Thing):
             @augment(AugmentationType.REIFIED_DATA_PROPERTY, physics.Has_Distance_To, "distance_from", "distance_to",
                      "has_distance")
+            @local
             def augment_distance(self, other: physics.Spatial_Object):
                 if same_scene(self, other) and has_geometry(self) and has_geometry(other):
                     p1 = wkt.loads(self.hasGeometry[0].asWKT[0])
@@ -37,6 +73,7 @@ def register(physics: owlready2.Ontology):
                         return distance
 
             @augment(AugmentationType.DATA_PROPERTY, "has_speed")
+            @local
             def augment_speed(self):
                 v = [x for x in [self.has_velocity_x, self.has_velocity_y, self.has_velocity_z] if x is not None]
                 if len(v) > 1:
@@ -47,6 +84,7 @@ def register(physics: owlready2.Ontology):
                     return float(sign * numpy.linalg.norm(v))
 
             @augment(AugmentationType.DATA_PROPERTY, "has_acceleration")
+            @local
             def augment_acceleration(self):
                 a = [x for x in [self.has_acceleration_x, self.has_acceleration_y, self.has_acceleration_z] if
                      x is not None]
@@ -60,39 +98,18 @@ def register(physics: owlready2.Ontology):
         @augment_class
         class Moving_Dynamical_Object(owlready2.Thing):
             @augment(AugmentationType.OBJECT_PROPERTY, "has_intersecting_path")
+            @local
             def augment_has_intersecting_path(self, other: physics.Moving_Dynamical_Object):
                 # TODO document in OWL
                 if same_scene(self, other) and has_geometry(self) and has_geometry(other) and self.has_yaw is not None \
                         and other.has_yaw is not None and self.has_speed and other.has_speed:
                     p_1 = wkt.loads(self.hasGeometry[0].asWKT[0]).centroid
                     p_2 = wkt.loads(other.hasGeometry[0].asWKT[0]).centroid
-                    p_self = geometry.Point(p_1.x, p_1.y)
-                    p_other = geometry.Point(p_2.x, p_2.y)
-                    if p_self != p_other:
-                        self_yaw = self.has_yaw
-                        other_yaw = other.has_yaw
-                        if self.has_speed < 0:
-                            self_yaw = (self.has_yaw + 180) % 360
-                        if other.has_speed < 0:
-                            other_yaw = (other.has_yaw + 180) % 360
-                        p_self_1 = geometry.Point(p_1.x + math.cos(math.radians(self_yaw)),
-                                                  p_1.y + math.sin(math.radians(self_yaw)))
-                        p_other_1 = geometry.Point(p_2.x + math.cos(math.radians(other_yaw)),
-                                                   p_2.y + math.sin(math.radians(other_yaw)))
-                        self_path = geometry.Ray(p_self, p_self_1)
-                        other_path = geometry.Ray(p_other, p_other_1)
-                        p_cross = geometry.intersection(self_path, other_path)
-                        if len(p_cross) > 0:
-                            d_self = geometry.Point.distance(p_cross[0], p_self)
-                            d_other = geometry.Point.distance(p_cross[0], p_other)
-                            t_self = float(d_self) / self.has_speed
-                            t_other = float(d_other) / other.has_speed
-                            return t_self + t_other < _INTERSECTING_PATH_THRESHOLD and \
-                                   abs(t_self - t_other) < _INTERSECTING_PATH_MAX_PET
-                        else:
-                            return False
+                    return has_intersecting_path(p_1, self.has_yaw, self.has_speed, p_2, other.has_yaw,
+                                                 other.has_speed)
 
             @augment(AugmentationType.OBJECT_PROPERTY, "CP_163")
+            @local
             def augment_cp_163(self, other: physics.Moving_Dynamical_Object):
                 # High relative speed
                 if self != other and same_scene(self, other) and has_geometry(self) and has_geometry(other) and \
@@ -120,6 +137,7 @@ def register(physics: owlready2.Ontology):
         @augment_class
         class Spatial_Object(owlready2.Thing):
             @augment(AugmentationType.OBJECT_PROPERTY, "is_in_proximity")
+            @local
             def augment_is_in_proximity(self, other: physics.Spatial_Object):
                 if same_scene(self, other) and has_geometry(self) and has_geometry(other):
                     p1 = wkt.loads(self.hasGeometry[0].asWKT[0])
@@ -128,6 +146,7 @@ def register(physics: owlready2.Ontology):
                         return True
 
             @augment(AugmentationType.OBJECT_PROPERTY, "is_near")
+            @local
             def augment_is_near(self, other: physics.Spatial_Object):
                 if same_scene(self, other) and has_geometry(self) and has_geometry(other):
                     p1 = wkt.loads(self.hasGeometry[0].asWKT[0])
@@ -136,6 +155,7 @@ def register(physics: owlready2.Ontology):
                         return True
 
             @augment(AugmentationType.OBJECT_PROPERTY, "sfIntersects")
+            @local
             def augment_intersects(self, other: physics.Spatial_Object):
                 if same_scene(self, other) and has_geometry(self) and has_geometry(other):
                     geo_self = wkt.loads(self.hasGeometry[0].asWKT[0])
@@ -143,6 +163,7 @@ def register(physics: owlready2.Ontology):
                     return geo_self.intersects(geo_other)
 
             @augment(AugmentationType.OBJECT_PROPERTY, "sfOverlaps")
+            @local
             def augment_overlaps(self, other: physics.Spatial_Object):
                 if same_scene(self, other) and has_geometry(self) and has_geometry(other):
                     geo_self = wkt.loads(self.hasGeometry[0].asWKT[0])
@@ -150,6 +171,7 @@ def register(physics: owlready2.Ontology):
                     return geo_self.overlaps(geo_other)
 
             @augment(AugmentationType.OBJECT_PROPERTY, "sfTouches")
+            @local
             def augment_touches(self, other: physics.Spatial_Object):
                 if same_scene(self, other) and has_geometry(self) and has_geometry(other):
                     geo_self = wkt.loads(self.hasGeometry[0].asWKT[0])
@@ -157,6 +179,7 @@ def register(physics: owlready2.Ontology):
                     return geo_self.touches(geo_other)
 
             @augment(AugmentationType.OBJECT_PROPERTY, "sfWithin")
+            @local
             def augment_within(self, other: physics.Spatial_Object):
                 if same_scene(self, other) and has_geometry(self) and has_geometry(other):
                     geo_self = wkt.loads(self.hasGeometry[0].asWKT[0])
@@ -164,6 +187,7 @@ def register(physics: owlready2.Ontology):
                     return geo_self.within(geo_other)
 
             @augment(AugmentationType.OBJECT_PROPERTY, "sfDisjoint")
+            @local
             def augment_disjoint(self, other: physics.Spatial_Object):
                 if same_scene(self, other) and has_geometry(self) and has_geometry(other):
                     geo_self = wkt.loads(self.hasGeometry[0].asWKT[0])
@@ -172,6 +196,7 @@ def register(physics: owlready2.Ontology):
                         return geo_self.disjoint(geo_other)
 
             @augment(AugmentationType.OBJECT_PROPERTY, "sfCrosses")
+            @local
             def augment_crosses(self, other: physics.Spatial_Object):
                 if same_scene(self, other) and has_geometry(self) and has_geometry(other):
                     geo_self = wkt.loads(self.hasGeometry[0].asWKT[0])
@@ -179,6 +204,7 @@ def register(physics: owlready2.Ontology):
                     return geo_self.crosses(geo_other)
 
             @augment(AugmentationType.OBJECT_PROPERTY, "sfContains")
+            @local
             def augment_contains(self, other: physics.Spatial_Object):
                 if same_scene(self, other) and has_geometry(self) and has_geometry(other):
                     geo_self = wkt.loads(self.hasGeometry[0].asWKT[0])
@@ -186,6 +212,7 @@ def register(physics: owlready2.Ontology):
                     return geo_self.contains(geo_other)
 
             @augment(AugmentationType.OBJECT_PROPERTY, "is_behind")
+            @local
             def augment_is_behind(self, other: physics.Dynamical_Object):
                 if same_scene(self, other) and self != other and has_geometry(self) and has_geometry(other) and \
                         other.has_yaw is not None:
@@ -199,6 +226,7 @@ def register(physics: owlready2.Ontology):
                         return 90 < angle < 270
 
             @augment(AugmentationType.OBJECT_PROPERTY, "is_left_of")
+            @local
             def augment_is_left_of(self, other: physics.Dynamical_Object):
                 if same_scene(self, other) and self != other and has_geometry(self) and has_geometry(other) and \
                         other.has_yaw is not None:
@@ -212,6 +240,7 @@ def register(physics: owlready2.Ontology):
                         return 0 < angle < 180
 
             @augment(AugmentationType.OBJECT_PROPERTY, "is_right_of")
+            @local
             def augment_is_right_of(self, other: physics.Dynamical_Object):
                 if same_scene(self, other) and self != other and has_geometry(self) and has_geometry(other) and \
                         other.has_yaw is not None:
@@ -225,6 +254,7 @@ def register(physics: owlready2.Ontology):
                         return 180 < angle < 360
 
             @augment(AugmentationType.OBJECT_PROPERTY, "is_in_front_of")
+            @local
             def augment_is_in_front_of(self, other: physics.Dynamical_Object):
                 if same_scene(self, other) and self != other and has_geometry(self) and has_geometry(other) and \
                         other.has_yaw is not None:
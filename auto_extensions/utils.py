@@ -5,6 +5,26 @@ Some common functionality for A.U.T.O. extensions, especially for checking domai
 """
 
 
+def reads_world(func):
+    """
+    Marks an augmentation function whose result does not only depend on its arguments (self and other) but on other
+    parts of the world as well. Such functions are always re-evaluated by incremental augmentation.
+    """
+    func._reads_world = True
+    return func
+
+
+def local(func):
+    """
+    Marks an augmentation function whose result only depends on the triples of its arguments (self and other), on the
+    data of their scenes and classes, and on their geometries. Incremental augmentation only re-evaluates such functions
+    for arguments that changed. Functions reading further (e.g. the time positions of the beginning of an interval) must
+    not be marked.
+    """
+    func._local = True
+    return func
+
+
 def same_scene(x, y):
     """
     Returns true iff. x and y are in the same scene.
@@ -0,0 +1,133 @@
+import argparse
+import concurrent.futures
+import csv
+import itertools
+import logging
+import multiprocessing
+import os
+import timeit
+
+import owlready2
+import psutil
+
+from criticality_recognition import criticality_recognition, phenomena_extraction, telemetry
+from inputs import synthetic
+
+logger = logging.getLogger(__name__)
+
+# Parameters of the synthetic scenarios that span the benchmark grid.
+_PARAMETERS = ["scenes", "vehicles", "pedestrians", "bicyclists", "lanes", "crossings"]
+# Stages (i.e. telemetry spans) whose wall time is recorded. Reasoning stages contain the Pellet, rule and augmentation
+# stages of their iterations.
+_STAGES = ["generate", "scene reasoning", "pellet", "rules", "augmentation", "merge", "temporal reduction",
+           "scenario reasoning", "restore", "phenomena extraction"]
+
+
+def run(parameters: dict, memory: int, options: dict) -> dict:
+    """
+    Generates a synthetic scenario and runs the criticality recognition on it. Shall be run in a fresh process such
+    that the peak memory is not influenced by previous runs.
+    :param parameters: The parameters for inputs.synthetic.get_synthetic_worlds().
+    :param memory: The maximum memory of Pellet's JVM (in MB).
+    :param options: Further keyword arguments for criticality_recognition.reason_scenario().
+    :return: A dictionary containing the wall time of each stage (in s), the total time (in s), the peak memory of
+    Python and Pellet's JVM (in MB), the A-Box size of the reasoned scenario, and the number of inferred criticality
+    phenomena.
+    """
+    owlready2.reasoning.JAVA_MEMORY = memory
+    tracer = telemetry.start()
+    t1 = timeit.default_timer()
+    with telemetry.span("generate"):
+        scenario_worlds = synthetic.get_synthetic_worlds(**parameters)
+    scenario = criticality_recognition.reason_scenario(scenario_worlds, **options)
+    with telemetry.span("phenomena extraction"):
+        cps = phenomena_extraction.phenomena_scenario(scenario)
+    t2 = timeit.default_timer()
+    telemetry.stop()
+    result = {stage: sum(e["dur"] for e in tracer.events if e["name"] == stage and e["ph"] == "X") / 1e6
+              for stage in _STAGES}
+    result["total"] = t2 - t1
+    result["python_peak_mb"] = telemetry.get_peak_memory()
+    result["jvm_peak_mb"] = telemetry.get_peak_memory(children=True)
+    result["triples"] = telemetry.get_triple_count(scenario)
+    result["cps"] = len(cps)
+    return result
+
+
+if __name__ == "__main__":
+    # Instantiate the parser
+    parser = argparse.ArgumentParser(description="Scaling benchmark of the criticality recognition. Runs the "
+                                                 "criticality recognition on synthetic scenarios for each combination "
+                                                 "of the given parameters and records the wall time of each stage, the "
+                                                 "peak memory and the number of inferred criticality phenomena as CSV.")
+    parser.add_argument("--scenes", type=int, nargs="+", default=[3], metavar="N", help="Number(s) of scenes. "
+                                                                                        "Default: 3")
+    parser.add_argument("--vehicles", type=int, nargs="+", default=[2], metavar="N", help="Number(s) of vehicles. "
+                                                                                          "Default: 2")
+    parser.add_argument("--pedestrians", type=int, nargs="+", default=[1], metavar="N", help="Number(s) of "
+                                                                                             "pedestrians. Default: 1")
+    parser.add_argument("--bicyclists", type=int, nargs="+", default=[1], metavar="N", help="Number(s) of bicyclists."
+                                                                                            " Default: 1")
+    parser.add_argument("--lanes", type=int, nargs="+", default=[2], metavar="N", help="Number(s) of lanes per road. "
+                                                                                       "Default: 2")
+    parser.add_argument("--crossings", type=int, nargs="+", default=[1], metavar="N", help="Number(s) of crossings. "
+                                                                                           "Default: 1")
+    parser.add_argument("--repetitions", type=int, default=1, metavar="N", help="Number of runs for each combination. "
+                                                                                "Default: 1")
+    parser.add_argument("--memory", type=int, metavar="N", help="Maximum memory (MB) for Pellet JVM. Default: 70 "
+                                                                "percent of available RAM")
+    parser.add_argument("--projection", action="store_true", help="If flag is set, temporal reasoning runs on a "
+                                                                  "projection of the scenario")
+    parser.add_argument("--window", type=int, nargs="?", const=0, metavar="N", help="If given, temporal reasoning runs "
+                                                                                    "on overlapping windows of N "
+                                                                                    "scenes (implies --projection). "
+                                                                                    "N is at least (and by default) "
+                                                                                    "the horizon of the temporal "
+                                                                                    "criticality phenomena (20 "
+                                                                                    "scenes if they do not bound "
+                                                                                    "their durations)")
+    parser.add_argument("--native-rules", action="store_true", help="Experimental. If flag is set, evaluates the SWRL "
+                                                                    "rules by a native rule engine")
+    parser.add_argument("--incremental-augmentation", action="store_true", help="If flag is set, augmentation "
+                                                                                "functions are evaluated incrementally")
+    parser.add_argument("output", type=str, metavar="FILE", help="CSV file to append the results to")
+    args = parser.parse_args()
+
+    logging.basicConfig(format="%(asctime)s %(levelname)s  %(message)s", datefmt="%H:%M:%S", level=logging.INFO)
+    logging.getLogger("shapely.geos").setLevel(logging.WARNING)
+
+    if args.memory:
+        java_memory = args.memory
+    else:
+        java_memory = int((psutil.virtual_memory().available >> 20) * 0.7)
+    reasoning_options = {"projection": args.projection, "native_rules": args.native_rules,
+                         "incremental_augmentation": args.incremental_augmentation, "window": args.window}
+
+    grid = []
+    for values in itertools.product(*[getattr(args, p) for p in _PARAMETERS]):
+        scenario_parameters = dict(zip(_PARAMETERS, values))
+        if scenario_parameters["pedestrians"] > 0 and scenario_parameters["crossings"] < 1:
+            logger.warning("Skipping " + ", ".join(k + "=" + str(v) for k, v in scenario_parameters.items()) +
+                           " since pedestrians need a crossing")
+        else:
+            grid.append(values)
+    write_header = not os.path.exists(args.output) or os.path.getsize(args.output) == 0
+    with open(args.output, "a", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=_PARAMETERS + ["repetition"] + _STAGES +
+                                ["total", "python_peak_mb", "jvm_peak_mb", "triples", "cps"])
+        if write_header:
+            writer.writeheader()
+        for i, values in enumerate(grid):
+            scenario_parameters = dict(zip(_PARAMETERS, values))
+            for repetition in range(args.repetitions):
+                logger.info("Benchmark " + str(i + 1) + "/" + str(len(grid)) + " (repetition " + str(repetition + 1) +
+                            "): " + ", ".join(k + "=" + str(v) for k, v in scenario_parameters.items()))
+                # Each run gets a fresh process to measure its peak memory and to not leak memory into the next run
+                with concurrent.futures.ProcessPoolExecutor(max_workers=1,
+                                                            mp_context=multiprocessing.get_context("spawn")) as pool:
+                    row = pool.submit(run, scenario_parameters, java_memory, reasoning_options).result()
+                row.update(scenario_parameters)
+                row["repetition"] = repetition + 1
+                writer.writerow(row)
+                f.flush()
+                logger.info("Took %.2f s, inferred %d criticality phenomena" % (row["total"], row["cps"]))
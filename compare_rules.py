@@ -0,0 +1,127 @@
+import argparse
+import logging
+import os
+import timeit
+
+import owlready2
+import psutil
+
+from criticality_recognition import criticality_recognition, phenomena_extraction, pellet, rule_engine
+import omega2auto
+from inputs import example_fuc_2_3
+
+# Instantiate the parser
+parser = argparse.ArgumentParser(description="Compares the criticality phenomena inferred with the native SWRL rule "
+                                             "engine against the Pellet baseline (where Pellet evaluates all rules) on "
+                                             "either an OMEGA hdf5 file or the FUC 2.3 example. Given an .owl file "
+                                             "(e.g. as stored by infer.py), only compares the facts inferred by "
+                                             "reasoning on this A-Box (without augmentation).")
+parser.add_argument("--auto", type=str, default="auto/ontology", metavar="FOLDER_PATH",
+                    help="Path to A.U.T.O. ontology folder. Default: auto/ontology")
+parser.add_argument("--memory", type=int, metavar="N", help="Maximum memory (GB) for Pellet JVM. Default: 70 percent of"
+                                                            " available RAM")
+parser.add_argument("--scenarios", type=int, nargs="+", metavar="N", help="The ID(s) of the scenario to analyze. "
+                                                                          "Default: All scenarios in hdf5")
+parser.add_argument("--start", type=float, metavar="N", help="Optional start offset (added) for scenarios (in s).")
+parser.add_argument("--end", type=float, metavar="N", help="Optional end offset (subtracted) for scenarios (in s).")
+parser.add_argument("--hertz", type=float, metavar="N", help="The sampling rate to reduce the input scenarios to.")
+parser.add_argument("--projection", action="store_true", help="If flag is set, temporal reasoning runs on a projection "
+                                                              "of the scenario")
+parser.add_argument("input", type=str, metavar="FILE", help="Input file. A .hdf5 file in OMEGA-format, an .owl file or "
+                                                            "the string \"fuc23\" (will run the provided use case "
+                                                            "example)")
+args = parser.parse_args()
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(format="%(asctime)s %(levelname)s  %(message)s", datefmt="%H:%M:%S", level=logging.INFO)
+logging.getLogger("shapely.geos").setLevel(logging.WARNING)
+
+if args.memory:
+    owlready2.reasoning.JAVA_MEMORY = args.memory
+else:
+    owlready2.reasoning.JAVA_MEMORY = int((psutil.virtual_memory().available >> 20) * 0.7)
+
+
+def load_scenarios() -> list:
+    """
+    Loads (i.e. converts) the scenarios from the input. Needs to be called for each run since reasoning modifies the
+    scenario worlds.
+    """
+    if args.input.endswith(".hdf5"):
+        return omega2auto.convert(os.path.abspath(args.input), args.auto, cp=True, scenarios=args.scenarios,
+                                  sampling_rate=args.hertz, start_offset=args.start, end_offset=args.end)
+    elif args.input == "fuc23":
+        return [example_fuc_2_3.get_fuc23_worlds()]
+    return []
+
+
+def cp_key(cp: phenomena_extraction.Criticality_Phenomenon) -> tuple:
+    """
+    Creates a hashable representation of a criticality phenomenon that is independent of the world it stems from.
+    """
+    if isinstance(cp.objects, dict):
+        objects = tuple(sorted((str(k), tuple(sorted(str(x) for x in v))) for k, v in cp.objects.items()))
+    else:
+        objects = tuple(sorted(str(x) for x in cp.objects))
+    return cp.predicate, str(cp.time), tuple(sorted(str(x) for x in cp.subjects)), objects
+
+
+def run(native_rules: bool) -> tuple:
+    """
+    Runs the criticality recognition on all input scenarios.
+    :return: A tuple of a list of sets of criticality phenomena (one for each scenario) and the total time needed.
+    """
+    results = []
+    duration = 0
+    for i, scenario_worlds in enumerate(load_scenarios()):
+        t1 = timeit.default_timer()
+        scenario = criticality_recognition.reason_scenario(scenario_worlds, scenario_number=i + 1,
+                                                           projection=args.projection, native_rules=native_rules)
+        duration += timeit.default_timer() - t1
+        results.append({cp_key(cp) for cp in phenomena_extraction.phenomena_scenario(scenario)})
+    return results, duration
+
+
+def run_abox(native_rules: bool) -> tuple:
+    """
+    Runs the reasoner (and the rule engine) on the input A-Box until no new facts are inferred.
+    :return: A tuple of a list containing the set of inferred facts and the time needed.
+    """
+    world = owlready2.World()
+    world.get_ontology("file://" + os.path.abspath(args.input)).load()
+    t1 = timeit.default_timer()
+    if native_rules:
+        rules = rule_engine.get_rules(world)
+        exclude_entities = rule_engine.get_rule_storids(world, rules)
+        logger.info("Native rule engine supports " + str(len(rules)) + "/" + str(len(list(world.rules()))) + " rules")
+    else:
+        rules = []
+        exclude_entities = None
+    run_pellet = True
+    while run_pellet:
+        pellet.sync_reasoner_pellet(world, infer_property_values=True, exclude_entities=exclude_entities)
+        run_pellet = len(rules) > 0 and rule_engine.materialize(world, rules) > 0
+    duration = timeit.default_timer() - t1
+    facts = rule_engine.get_facts(world)
+    world.close()
+    return [facts], duration
+
+
+if args.input.endswith(".owl"):
+    run = run_abox
+logger.info("Running Pellet baseline ...")
+baseline, baseline_time = run(native_rules=False)
+logger.info("Running with native rule engine ...")
+native, native_time = run(native_rules=True)
+
+differences = 0
+for i, (baseline_cps, native_cps) in enumerate(zip(baseline, native)):
+    print("Scenario " + str(i + 1) + ": " + str(len(baseline_cps)) + " CPs or facts (baseline), " +
+          str(len(native_cps)) + " CPs or facts (native rules)")
+    for cp in sorted(baseline_cps - native_cps):
+        print("  Only in baseline:     " + str(cp))
+    for cp in sorted(native_cps - baseline_cps):
+        print("  Only in native rules: " + str(cp))
+    differences += len(baseline_cps ^ native_cps)
+print("Reasoning time: %.2f s (baseline), %.2f s (native rules)" % (baseline_time, native_time))
+print("Total differences: " + str(differences))
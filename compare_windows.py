@@ -0,0 +1,99 @@
+import argparse
+import logging
+import os
+import timeit
+
+import owlready2
+import psutil
+
+from criticality_recognition import criticality_recognition, phenomena_extraction
+import omega2auto
+from inputs import example_fuc_2_3
+
+# Instantiate the parser
+parser = argparse.ArgumentParser(description="Compares the criticality phenomena inferred by temporal reasoning on "
+                                             "overlapping windows of scenes (infer.py --window) against temporal "
+                                             "reasoning on the whole projection of the scenario (infer.py "
+                                             "--projection) on either an OMEGA hdf5 file or the FUC 2.3 example.")
+parser.add_argument("--auto", type=str, default="auto/ontology", metavar="FOLDER_PATH",
+                    help="Path to A.U.T.O. ontology folder. Default: auto/ontology")
+parser.add_argument("--memory", type=int, metavar="N", help="Maximum memory (GB) for Pellet JVM. Default: 70 percent of"
+                                                            " available RAM")
+parser.add_argument("--scenarios", type=int, nargs="+", metavar="N", help="The ID(s) of the scenario to analyze. "
+                                                                          "Default: All scenarios in hdf5")
+parser.add_argument("--start", type=float, metavar="N", help="Optional start offset (added) for scenarios (in s).")
+parser.add_argument("--end", type=float, metavar="N", help="Optional end offset (subtracted) for scenarios (in s).")
+parser.add_argument("--hertz", type=float, metavar="N", help="The sampling rate to reduce the input scenarios to.")
+parser.add_argument("--window", type=int, default=0, metavar="N", help="The number of scenes per window. Default: "
+                                                                       "horizon of the temporal criticality phenomena")
+parser.add_argument("input", type=str, metavar="FILE", help="Input file. A .hdf5 file in OMEGA-format or the string "
+                                                            "\"fuc23\" (will run the provided use case example)")
+args = parser.parse_args()
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(format="%(asctime)s %(levelname)s  %(message)s", datefmt="%H:%M:%S", level=logging.INFO)
+logging.getLogger("shapely.geos").setLevel(logging.WARNING)
+
+if args.memory:
+    owlready2.reasoning.JAVA_MEMORY = args.memory
+else:
+    owlready2.reasoning.JAVA_MEMORY = int((psutil.virtual_memory().available >> 20) * 0.7)
+
+
+def load_scenarios() -> list:
+    """
+    Loads (i.e. converts) the scenarios from the input. Needs to be called for each run since reasoning modifies the
+    scenario worlds.
+    """
+    if args.input.endswith(".hdf5"):
+        return omega2auto.convert(os.path.abspath(args.input), args.auto, cp=True, scenarios=args.scenarios,
+                                  sampling_rate=args.hertz, start_offset=args.start, end_offset=args.end)
+    elif args.input == "fuc23":
+        return [example_fuc_2_3.get_fuc23_worlds()]
+    return []
+
+
+def cp_key(cp: phenomena_extraction.Criticality_Phenomenon) -> tuple:
+    """
+    Creates a hashable representation of a criticality phenomenon that is independent of the world it stems from.
+    """
+    if isinstance(cp.objects, dict):
+        objects = tuple(sorted((str(k), tuple(sorted(str(x) for x in v))) for k, v in cp.objects.items()))
+    else:
+        objects = tuple(sorted(str(x) for x in cp.objects))
+    return cp.predicate, str(cp.time), tuple(sorted(str(x) for x in cp.subjects)), objects
+
+
+def run(window) -> tuple:
+    """
+    Runs the criticality recognition with temporal reasoning on the projection on all input scenarios.
+    :param window: The window size (see criticality_recognition.reason_scenario()), None for no windows.
+    :return: A tuple of a list of sets of criticality phenomena (one for each scenario) and the total time needed.
+    """
+    results = []
+    duration = 0
+    for i, scenario_worlds in enumerate(load_scenarios()):
+        t1 = timeit.default_timer()
+        scenario = criticality_recognition.reason_scenario(scenario_worlds, scenario_number=i + 1, projection=True,
+                                                           window=window)
+        duration += timeit.default_timer() - t1
+        results.append({cp_key(cp) for cp in phenomena_extraction.phenomena_scenario(scenario)})
+    return results, duration
+
+
+logger.info("Running temporal reasoning on the whole projection ...")
+baseline, baseline_time = run(window=None)
+logger.info("Running temporal reasoning on windows ...")
+windowed, windowed_time = run(window=args.window)
+
+differences = 0
+for i, (baseline_cps, windowed_cps) in enumerate(zip(baseline, windowed)):
+    print("Scenario " + str(i + 1) + ": " + str(len(baseline_cps)) + " CPs (whole projection), " +
+          str(len(windowed_cps)) + " CPs (windows)")
+    for cp in sorted(baseline_cps - windowed_cps):
+        print("  Only in whole projection: " + str(cp))
+    for cp in sorted(windowed_cps - baseline_cps):
+        print("  Only in windows:          " + str(cp))
+    differences += len(baseline_cps ^ windowed_cps)
+print("Reasoning time: %.2f s (whole projection), %.2f s (windows)" % (baseline_time, windowed_time))
+print("Total differences: " + str(differences))
@@ -0,0 +1,167 @@
+import logging
+import zlib
+from collections import defaultdict
+import owlready2
+from owlready2.base import rdf_type
+
+from . import augmentation_planner
+
+logger = logging.getLogger(__name__)
+
+
+class Augmentation_Memo:
+    """
+    Tracks changes of individuals between augmentation rounds and memoizes the results of augmentation functions, such
+    that a function is only re-evaluated for (self, other) pairs where at least one individual changed since the pair
+    was evaluated. An individual changes if it gains or loses a class or property value (incoming or outgoing), e.g. by
+    the inferences of the reasoner or by the augmentations of the previous round.
+    This is only sound if the result of a function depends on nothing but the triples of its arguments, the data of
+    their scenes (an individual changes if the data of its scene changes) and data that does not change during
+    reasoning (e.g. geometries). Therefore, only functions marked by `@local` (from auto_extensions.utils) are memoized
+    per pair. All other functions are re-evaluated for every pair, unless they declare their concepts by `@concepts`
+    (from the augmentator) and none of these changed since they last ran (see augmentation_planner), in which case they
+    are skipped completely. Local functions are skipped completely if none of the classes of their arguments changed.
+    """
+
+    def __init__(self, world: owlready2.World):
+        """
+        :param world: The world in which augmentation is performed. Its augmentation functions need to be registered
+        before.
+        """
+        self.world = world
+        self.functions = augmentation_planner.get_augmentation_functions(world)
+        self.calls = defaultdict(int)
+        self.evaluations = defaultdict(int)
+        self._results = defaultdict(dict)
+        self._states = dict()
+        self._predicate_states = dict()
+        self._scene_states = dict()
+        self._changed = set()
+        self._ran = set()
+        self._skipped = set()
+        self._dependents = {f.key: {g.key for g in self.functions if g.depends_on(f)} for f in self.functions}
+        # Data values are fingerprinted by their hashes (also regarding their predicate)
+        world.graph.db.create_function("memo_hash", 2, _hash, deterministic=True)
+
+    def wrap(self):
+        """
+        Replaces all augmentation functions in the classes of the world by memoizing wrappers.
+        """
+        for f in self.functions:
+            type.__setattr__(f.cls, f.name, self._get_wrapper(f.key, f.func))
+        logger.debug("Memoizing " + str(len(self.functions)) + " augmentation functions")
+
+    def unwrap(self):
+        """
+        Restores the original augmentation functions.
+        """
+        for f in self.functions:
+            type.__setattr__(f.cls, f.name, f.func)
+        logger.debug("Evaluated " + str(sum(self.evaluations.values())) + " of " + str(sum(self.calls.values())) +
+                     " augmentation function calls")
+
+    def start_round(self):
+        """
+        Determines the individuals and concepts that changed since the start of the previous round. Shall be called
+        right before each augmentation round.
+        """
+        graph = self.world.graph
+        states = defaultdict(tuple)
+        for x, *state in graph.execute("SELECT s, COUNT(), TOTAL(p), TOTAL(o) FROM objs GROUP BY s"):
+            states[x] += tuple(state)
+        for x, *state in graph.execute("SELECT o, COUNT(), TOTAL(p), TOTAL(s) FROM objs WHERE o>0 GROUP BY o"):
+            states[x] += (None, *state)
+        for x, *state in graph.execute("SELECT s, COUNT(), TOTAL(p), TOTAL(memo_hash(p, o)) FROM datas GROUP BY s"):
+            states[x] += (None, None, *state)
+        self._changed = {x for x in states.keys() | self._states.keys() if states.get(x) != self._states.get(x)}
+        self._states = states
+        # Individuals change if the data of their scene changes (membership may also be asserted by the inverse)
+        in_traffic_model = self.world._props.get("in_traffic_model")
+        if in_traffic_model is not None:
+            has_traffic_entity = getattr(in_traffic_model.inverse_property, "storid", None)
+            scene_states = {x: tuple(state) for x, *state in graph.execute(
+                "SELECT s, COUNT(), TOTAL(memo_hash(p, o)) FROM datas WHERE s IN (SELECT o FROM objs WHERE p=? "
+                "UNION SELECT s FROM objs WHERE p=?) GROUP BY s", (in_traffic_model.storid, has_traffic_entity))}
+            changed_scenes = [x for x in scene_states.keys() | self._scene_states.keys() if
+                              scene_states.get(x) != self._scene_states.get(x)]
+            self._scene_states = scene_states
+            if len(changed_scenes) > 0:
+                placeholders = ",".join("?" for _ in changed_scenes)
+                self._changed.update(x for (x,) in graph.execute(
+                    "SELECT s FROM objs WHERE p=? AND o IN (%s) UNION SELECT o FROM objs WHERE p=? AND s IN (%s)" %
+                    (placeholders, placeholders),
+                    (in_traffic_model.storid, *changed_scenes, has_traffic_entity, *changed_scenes)))
+        predicate_states = defaultdict(tuple)
+        for p, *state in graph.execute("SELECT p, COUNT(), TOTAL(s), TOTAL(o) FROM objs GROUP BY p"):
+            predicate_states[p] += tuple(state)
+        for p, *state in graph.execute("SELECT p, COUNT(), TOTAL(s), TOTAL(memo_hash(s, o)) FROM datas GROUP BY p"):
+            predicate_states[p] += (None, *state)
+        changed_predicates = {p for p in predicate_states.keys() | self._predicate_states.keys() if
+                              predicate_states.get(p) != self._predicate_states.get(p)}
+        self._predicate_states = predicate_states
+        self._skipped = {f.key for f in self.functions if f.key in self._ran and f.reads is not None and
+                         (getattr(f.func, "_used_concepts", None) or _is_local(f.func)) and
+                         not self._has_changed(f.reads, changed_predicates)}
+        logger.debug(str(len(self._changed)) + " entities changed since previous augmentation round, skipping " +
+                     str(len(self._skipped)) + " augmentation functions")
+
+    def _has_changed(self, concepts: set, changed_predicates: set) -> bool:
+        """
+        :return: True iff. some individual of the given classes changed or some of the given properties changed.
+        """
+        for concept in concepts:
+            descendants = [x.storid for x in concept.descendants()]
+            if isinstance(concept, owlready2.PropertyClass):
+                if not changed_predicates.isdisjoint(descendants):
+                    return True
+            elif len(self._changed) > 0:
+                for (s,) in self.world.graph.execute("SELECT s FROM objs WHERE p=? AND o IN (%s)" %
+                                                     ",".join("?" for _ in descendants), (rdf_type, *descendants)):
+                    if s in self._changed:
+                        return True
+        return False
+
+    def _get_wrapper(self, key: str, func):
+        """
+        Creates a memoizing wrapper with the same arguments as the given augmentation function.
+        """
+        results = self._results[key]
+        local = _is_local(func)
+        return augmentation_planner.wrap_function(func, lambda *args: self._call(key, func, results, local, *args))
+
+    def _call(self, key: str, func, results: dict, local: bool, *args):
+        self.calls[key] += 1
+        ids = tuple(x.storid for x in args)
+        if ids in results and (key in self._skipped or (local and not any(x in self._changed for x in ids))):
+            return results[ids]
+        self.evaluations[key] += 1
+        self._ran.add(key)
+        result = func(*args)
+        if ids in results and results[ids] == result:
+            return result  # Has already been written into the world by the augmentator
+        results[ids] = result
+        # The augmentator will write the result into the world, therefore the arguments change within this round, and
+        # functions reading what this function writes can not be skipped anymore
+        if isinstance(result, tuple):
+            if len(result) > 0 and result[0]:
+                self._changed.update(x.storid for x in args + result if isinstance(x, owlready2.Thing))
+                self._skipped -= self._dependents[key]
+        elif result is not None and result is not False:
+            self._changed.update(ids)
+            self._skipped -= self._dependents[key]
+        return result
+
+
+def _is_local(func) -> bool:
+    """
+    :return: True iff. the given augmentation function is marked as local and reads no declared concepts or the world.
+    """
+    return getattr(func, "_local", False) and not (getattr(func, "_used_concepts", None) or
+                                                   getattr(func, "_reads_world", False))
+
+
+def _hash(key, value) -> int:
+    """
+    :return: A 32 bit hash of the given key and value, which can be summed up without loss of precision.
+    """
+    return zlib.crc32((str(key) + " " + repr(value)).encode("utf8"))
@@ -0,0 +1,166 @@
+import functools
+import inspect
+import logging
+import owlready2
+
+logger = logging.getLogger(__name__)
+
+# Package in which the augmentation functions are implemented.
+_AUGMENTATION_PACKAGE = "auto_extensions"
+
+
+class Augmentation_Function:
+    """
+    A registered augmentation function together with the concepts (classes and properties) it reads and writes.
+    - reads: The concepts the function depends on, i.e. the declared `@concepts` or else the class it is defined in and
+      the class of its `other` argument. None if the function reads the world (`@reads_world`) without declaring its
+      concepts, i.e. it may depend on anything.
+    - writes: The concepts the function writes to, as found in the arguments of its `@augment` decorator.
+    """
+    def __init__(self, world: owlready2.World, cls: owlready2.ThingClass, name: str, func):
+        self.cls = cls
+        self.name = name
+        self.func = func
+        self.key = cls.iri + "." + name
+        self.ontology = cls.namespace.ontology
+        self.reads = _get_reads(cls, func)
+        self.writes = _get_writes(world, cls, func)
+
+    def __str__(self) -> str:
+        return self.key
+
+    def depends_on(self, other) -> bool:
+        """
+        :param other: Another augmentation function.
+        :return: True iff. this function reads some concept that the other function writes (or may affect).
+        """
+        return self.reads is None or any(_affects(w, r) for w in other.writes for r in self.reads)
+
+
+def get_augmentation_functions(world: owlready2.World) -> list:
+    """
+    Fetches all registered augmentation functions from the classes of the world, i.e. functions from auto_extensions
+    that were decorated by the augmentator.
+    :param world: The world to fetch the functions from. The functions need to be registered before.
+    :return: A list of augmentation functions.
+    """
+    functions = []
+    for onto in world.ontologies.values():
+        for cls in onto.classes():
+            for name, func in list(vars(cls).items()):
+                if callable(func) and getattr(func, "__module__", "").startswith(_AUGMENTATION_PACKAGE) and \
+                        len(getattr(func, "__dict__", {})) > 0 and func.__code__.co_argcount in [1, 2]:
+                    functions.append(Augmentation_Function(world, cls, name, func))
+    return functions
+
+
+def wrap_function(func, handler):
+    """
+    Creates a wrapper with the same arguments (self and optionally other) and attributes as the given augmentation
+    function, such that the augmentator treats it like the function itself.
+    :param func: The augmentation function to wrap.
+    :param handler: A function that is called with the arguments of each call instead of the augmentation function.
+    :return: The wrapper.
+    """
+    if func.__code__.co_argcount == 1:
+        def wrapper(self):
+            return handler(self)
+    else:
+        def wrapper(self, other):
+            return handler(self, other)
+    return functools.update_wrapper(wrapper, func)
+
+
+def schedule(functions: list, ontologies: list) -> list:
+    """
+    Orders the given ontologies (whose augmentation functions are run in this order by the augmentator) topologically
+    along the dependencies of their functions, such that functions writing a concept are run before the functions
+    reading it. Ontologies within cyclic dependencies keep their given order. Note that the augmentator runs all
+    functions of an ontology at once, hence the schedule is per ontology: Dependencies between functions of the same
+    ontology are not ordered and, like cyclic dependencies, only resolved by the next augmentation iteration.
+    :param functions: The augmentation functions as returned by get_augmentation_functions().
+    :param ontologies: The ontologies to order.
+    :return: The ordered list of ontologies.
+    """
+    depends = {o: set() for o in ontologies}
+    unordered = []
+    for f in functions:
+        for g in functions:
+            if f.ontology in depends and g.ontology in depends and f is not g and f.reads is not None and \
+                    f.depends_on(g):
+                if f.ontology != g.ontology:
+                    depends[f.ontology].add(g.ontology)
+                else:
+                    unordered.append((f, g))
+    for f, g in unordered:
+        logger.debug("Can not order " + str(f) + " after " + str(g) + " within ontology " + str(f.ontology.name) +
+                     ", the dependency is resolved by the next augmentation iteration")
+    order = []
+    remaining = list(ontologies)
+    while remaining:
+        # Picks the first ontology without open dependencies or, in case of a cycle, the first remaining one
+        ready = [o for o in remaining if depends[o].isdisjoint(remaining)] or remaining
+        order.append(ready[0])
+        remaining.remove(ready[0])
+    logger.debug("Augmentation schedule: " + ", ".join(str(o.name) for o in order))
+    return order
+
+
+def _get_reads(cls: owlready2.ThingClass, func) -> set or None:
+    """
+    Fetches the concepts an augmentation function reads, see Augmentation_Function.
+    """
+    used_concepts = getattr(func, "_used_concepts", None)
+    if used_concepts and isinstance(used_concepts, set):
+        return set(used_concepts)
+    elif getattr(func, "_reads_world", False):
+        return None
+    reads = {cls}
+    other = inspect.signature(func).parameters.get("other")
+    if other is not None and isinstance(other.annotation, owlready2.ThingClass):
+        reads.add(other.annotation)
+    return reads
+
+
+def _get_writes(world: owlready2.World, cls: owlready2.ThingClass, func) -> set:
+    """
+    Fetches the concepts an augmentation function writes by scanning the attributes that the augmentator stored on the
+    function for classes, properties and property names. Names are resolved in the ontology of the function and its
+    (indirect) imports. Names not declared there are resolved as the augmentator sets them, i.e. as Python names of
+    properties of the world.
+    """
+    ontologies = [cls.namespace.ontology] + list(cls.namespace.ontology.indirectly_imported_ontologies())
+    writes = set()
+    values = [v for k, v in vars(func).items() if k != "_used_concepts"]
+    while values:
+        value = values.pop()
+        if isinstance(value, (list, tuple, set)):
+            values.extend(value)
+        elif isinstance(value, owlready2.ThingClass) or isinstance(value, owlready2.PropertyClass):
+            writes.add(value)
+        elif isinstance(value, str):
+            entity = next((x for x in (o[value] for o in ontologies) if x is not None), None) or world._props.get(value)
+            if entity is not None:
+                writes.add(entity)
+            else:
+                logger.debug("Can not resolve " + value + " written by " + cls.iri + "." + func.__name__)
+    if len(writes) == 0:
+        writes.add(cls)  # e.g. class subsumptions
+    return writes
+
+
+def _affects(write, read) -> bool:
+    """
+    :return: True iff. writing the given concept may change the given read concept.
+    """
+    if write == read:
+        return True
+    elif isinstance(read, owlready2.ThingClass):
+        if isinstance(write, owlready2.ThingClass):
+            return issubclass(write, read) or issubclass(read, write)
+        # Writing a property changes the individuals in its domain and range
+        bounds = [x for x in list(write.domain) + list(write.range) if isinstance(x, owlready2.ThingClass)]
+        return len(bounds) == 0 or any(issubclass(x, read) or issubclass(read, x) for x in bounds)
+    elif isinstance(read, owlready2.PropertyClass) and isinstance(write, owlready2.PropertyClass):
+        return write in read.descendants() or read in write.descendants()
+    return False
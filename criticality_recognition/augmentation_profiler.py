@@ -0,0 +1,158 @@
+import contextlib
+import json
+import logging
+import math
+import timeit
+from array import array
+from collections import defaultdict
+from shapely import wkt
+
+from . import augmentation_planner
+
+logger = logging.getLogger(__name__)
+
+
+class _Statistics:
+    """
+    The recorded statistics of an augmentation function (in some reasoning iteration).
+    """
+    def __init__(self):
+        self.calls = 0
+        self.true = 0
+        self.false = 0
+        self.none = 0
+        self.parses = 0
+        self.times = array("d")
+
+    def add(self, other):
+        self.calls += other.calls
+        self.true += other.true
+        self.false += other.false
+        self.none += other.none
+        self.parses += other.parses
+        self.times.extend(other.times)
+
+    def to_dict(self) -> dict:
+        if len(self.times) > 0:
+            p95 = sorted(self.times)[math.ceil(0.95 * len(self.times)) - 1]
+        else:
+            p95 = 0
+        return {"calls": self.calls, "true": self.true, "false": self.false, "none": self.none,
+                "total_time": sum(self.times), "p95_time": p95, "geometry_parses": self.parses}
+
+
+class Augmentation_Profiler:
+    """
+    Records for each augmentation function (and each reasoning iteration) the number of calls, their outcomes (True,
+    False, or None, where None means that the function does not apply to its arguments, i.e. the pair was pruned), the
+    total and 95th percentile time per call, and the number of geometries parsed (i.e. calls to shapely.wkt.loads).
+    Outcomes of functions returning tuples are counted by their first element, other results by their truth value.
+    The profiler wraps the functions only while a world is reasoned on (see wrap() and unwrap()), therefore, reasoning
+    without a profiler is not slowed down at all. Likewise, shapely.wkt.loads is only replaced by a counting parser
+    during each call of a function, and parses of nested calls count for the calling function as well. If results are
+    memoized (see augmentation_memo), memoized calls are recorded as well.
+    """
+
+    def __init__(self):
+        self.iteration = 0
+        self._statistics = defaultdict(lambda: defaultdict(_Statistics))
+        self._functions = []
+
+    def wrap(self, world):
+        """
+        Replaces all augmentation functions in the classes of the world by profiling wrappers.
+        :param world: The world in which augmentation is performed. Its augmentation functions need to be registered
+        before.
+        """
+        self._functions = augmentation_planner.get_augmentation_functions(world)
+        for f in self._functions:
+            type.__setattr__(f.cls, f.name, self._get_wrapper(f.cls.name + "." + f.name, f.func))
+
+    def unwrap(self):
+        """
+        Restores the original augmentation functions.
+        """
+        for f in self._functions:
+            type.__setattr__(f.cls, f.name, f.func)
+        self._functions = []
+
+    def _get_wrapper(self, name: str, func):
+        """
+        Creates a profiling wrapper with the same arguments as the given augmentation function.
+        """
+        return augmentation_planner.wrap_function(func, lambda *args: self._call(name, func, *args))
+
+    def _call(self, name: str, func, *args):
+        statistics = self._statistics[name][self.iteration]
+        t = timeit.default_timer()
+        try:
+            with _count_parses(statistics):
+                result = func(*args)
+        finally:
+            statistics.times.append(timeit.default_timer() - t)
+        statistics.calls += 1
+        if isinstance(result, tuple) and len(result) > 0:
+            outcome = result[0]
+        else:
+            outcome = result
+        if outcome is None:
+            statistics.none += 1
+        elif outcome:
+            statistics.true += 1
+        else:
+            statistics.false += 1
+        return result
+
+    def to_dict(self) -> dict:
+        """
+        :return: The recorded statistics as a dictionary from function names (class.function) to their total
+        statistics, with the statistics of each reasoning iteration under the key "iterations".
+        """
+        result = dict()
+        for name, iterations in self._statistics.items():
+            total = _Statistics()
+            for statistics in iterations.values():
+                total.add(statistics)
+            result[name] = total.to_dict()
+            result[name]["iterations"] = {str(i): s.to_dict() for i, s in sorted(iterations.items())}
+        return result
+
+    def save(self, file: str):
+        """
+        Stores the recorded statistics as JSON in the given file.
+        """
+        with open(file, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+        logger.info("Saved augmentation profile to file://" + file)
+
+    def to_table(self) -> str:
+        """
+        :return: The total statistics of each function as a text table, sorted descending by total time.
+        """
+        rows = sorted(self.to_dict().items(), key=lambda x: x[1]["total_time"], reverse=True)
+        width = max([len("Function")] + [len(name) for name, _ in rows])
+        lines = [("%-" + str(width) + "s %10s %10s %10s %10s %12s %12s %10s") %
+                 ("Function", "Calls", "True", "False", "None", "Total (s)", "p95 (ms)", "Parses")]
+        for name, s in rows:
+            lines.append(("%-" + str(width) + "s %10d %10d %10d %10d %12.3f %12.3f %10d") %
+                         (name, s["calls"], s["true"], s["false"], s["none"], s["total_time"], s["p95_time"] * 1000,
+                          s["geometry_parses"]))
+        return "\n".join(lines)
+
+
+@contextlib.contextmanager
+def _count_parses(statistics: _Statistics):
+    """
+    Counts the calls to shapely.wkt.loads in the given statistics while the context is active. The original parser is
+    always restored when leaving the context.
+    """
+    loads = wkt.loads
+
+    def parse(*args, **kwargs):
+        statistics.parses += 1
+        return loads(*args, **kwargs)
+    wkt.loads = parse
+    try:
+        yield
+    finally:
+        wkt.loads = loads
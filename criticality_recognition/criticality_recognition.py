@@ -1,110 +1,238 @@
+import contextlib
+import gc
 import logging
 import os
-import sys
 import re
 import timeit
+import weakref
 import owlready2
 from pyauto import auto
 import owlready2_augmentator
 from auto_extensions import time, perception, physics, l1_core, l1_de, l4_core
 from . import world_merger
 from . import temporal_reduction
+from . import pellet
+from . import rule_engine
+from . import augmentation_memo
+from . import augmentation_planner
+from . import telemetry
 
 logger = logging.getLogger(__name__)
 
 
-def reason_scenario(scenario: list, pellet_output=False, no_reasoning=False, scenario_number=0) -> owlready2.World:
+def reason_scenario(scenario: list, pellet_output=False, no_reasoning=False, scenario_number=0, projection=False,
+                    cache=None, native_rules=False, incremental_augmentation=False, profiler=None,
+                    window=None) -> owlready2.World:
     """
     Augments and reasons on the given scenario (in-place). The main algorithm to infer the presence of criticality
     phenomena.
-    :param scenario: A list of worlds, each world representing a single scene.
+    :param scenario: A list of worlds, each world representing a single scene. All but the first world are removed
+    from the list and released after being merged into the first one.
     :param pellet_output: Whether to show the output of Pellet (can be quite long sometimes, but this will also supress
     errors!).
     :param no_reasoning: Whether to actually perform augmentation and reasoning steps. Can be used for 'dry-runs'.
     :param scenario_number: The identifier of the scenario as an integer (useful if the scenario comes in a sequence of
     scenarios and needs to be distinguished later on).
+    :param projection: Whether to perform temporal reasoning on a projection of the scenario to its temporal individuals
+    (copied into a lightweight reasoning world) instead of reducing and restoring the scenario world itself.
+    :param cache: Optional. A reasoning_cache.Reasoning_Cache to look up and store the results of Pellet in.
+    :param native_rules: Whether to evaluate the supported SWRL rules by the native rule engine instead of Pellet.
+    :param incremental_augmentation: Whether to re-evaluate augmentation functions only for changed individuals.
+    :param profiler: Optional. An augmentation_profiler.Augmentation_Profiler to record the augmentation functions in.
+    :param window: Optional. Whether to perform temporal reasoning on overlapping windows of this many consecutive
+    scenes of the projection of the scenario (implies projection). If 0 or less than the horizon of the temporal
+    criticality phenomena as given by their formalization, the window size is the horizon. If the formalization does
+    not bound the durations of the phenomena, the horizon is the window size or, if 0,
+    temporal_reduction.DEFAULT_HORIZON.
     :return: A world containing the fully merged and reasoned / augmented scenario.
     """
     t1 = timeit.default_timer()
-    if not no_reasoning:
-        # Reasoning on every scene
-        for i, scene_world in enumerate(scenario):
-            logger.debug("Criticality reasoning on scene " + str(i + 1) + "/" + str(len(scenario)))
-            _reason(scene_world, pellet_output=pellet_output)
-
-    # Merging inferred worlds & re-adding temporal individual identity information
-    logger.debug("Merging scene worlds into a single scenario world")
-    for i, scene_world in enumerate(scenario[1:]):
-        logger.debug("Merging scene world " + str(i + 2) + " into scene world 1")
-        world_merger.merge(scenario[0], scene_world, add_temporal_identity=False)
-
-    # Destroying large ontologies in the scene worlds (some will remain because of global references)
-    for scene_world in scenario[1:]:
-        for ont in set(scene_world.ontologies.values()):
-            try:
-                ont.destroy()
-            except KeyError:
-                logger.warning("Could not delete ontology " + str(ont) + ".")
-
-    # Create scenario in world
     merged_scenario = scenario[0]
-    world_merger.add_temporal_identity(merged_scenario)
-    tm = auto.get_ontology(auto.Ontology.Traffic_Model, merged_scenario)
-    ti = auto.get_ontology(auto.Ontology.Time, merged_scenario)
-    scenes = merged_scenario.search(type=tm.Scene)
+    scenes = scenario[:]
+    del scenario[1:]
+    _reason_scenes(merged_scenario, scenes, pellet_output=pellet_output, no_reasoning=no_reasoning, cache=cache,
+                   native_rules=native_rules, incremental_augmentation=incremental_augmentation, profiler=profiler)
+    _create_scenario(merged_scenario, scenario_number)
+    _reason_temporal(merged_scenario, pellet_output=pellet_output, no_reasoning=no_reasoning, projection=projection,
+                     cache=cache, native_rules=native_rules, incremental_augmentation=incremental_augmentation,
+                     profiler=profiler, window=window)
+    logger.debug("Fully finished criticality reasoning on scenario. Took %.2f s" % (timeit.default_timer() - t1))
+
+    return merged_scenario
+
+
+def refine_scenario(world: owlready2.World, scenes: list, pellet_output=False, no_reasoning=False, projection=False,
+                    cache=None, native_rules=False, incremental_augmentation=False, profiler=None,
+                    window=None, time_windows=None) -> owlready2.World:
+    """
+    Refines an already reasoned scenario by additional scenes (e.g. sampled at a finer rate around the criticality
+    phenomena found in the scenario). The additional scenes are augmented and reasoned on and merged into the scenario,
+    which is then extended by them and reasoned on again for temporal inference.
+    :param world: The world containing the reasoned scenario as returned by reason_scenario().
+    :param scenes: A list of worlds, each world representing a single additional scene. The worlds are removed from the
+    list and released after being merged into the scenario.
+    :param pellet_output: See reason_scenario().
+    :param no_reasoning: See reason_scenario().
+    :param projection: See reason_scenario().
+    :param cache: See reason_scenario().
+    :param native_rules: See reason_scenario().
+    :param incremental_augmentation: See reason_scenario().
+    :param profiler: See reason_scenario().
+    :param window: See reason_scenario().
+    :param time_windows: Optional. The time windows of the additional scenes as tuples of their start and end time (in
+    s), e.g. as returned by scene_sampler.get_refinement_windows(). If given, the reasoner only runs on the projection
+    of the scenario to the temporal individuals within these windows (implies projection).
+    :return: The given world, containing the refined scenario.
+    """
+    t1 = timeit.default_timer()
+    _reason_scenes(world, scenes, pellet_output=pellet_output, no_reasoning=no_reasoning, cache=cache,
+                   native_rules=native_rules, incremental_augmentation=incremental_augmentation, profiler=profiler)
+    _create_scenario(world)
+    _reason_temporal(world, pellet_output=pellet_output, no_reasoning=no_reasoning, projection=projection,
+                     cache=cache, native_rules=native_rules, incremental_augmentation=incremental_augmentation,
+                     profiler=profiler, window=window, time_windows=time_windows)
+    logger.debug("Fully finished refinement of scenario. Took %.2f s" % (timeit.default_timer() - t1))
+
+    return world
+
+
+def _reason_scenes(world: owlready2.World, scenes: list, pellet_output=False, no_reasoning=False, cache=None,
+                   native_rules=False, incremental_augmentation=False, profiler=None):
+    """
+    Reasons on every given scene and merges it into the given world as soon as it is reasoned, such that at most two
+    scene worlds are alive at any time. Merged scene worlds are released.
+    :param world: The world to merge the scenes into. If it is among the scenes, it is reasoned on but not merged.
+    :param scenes: A list of worlds, each world representing a single scene. The worlds are removed from the list.
+    :param pellet_output: See reason_scenario().
+    :param no_reasoning: See reason_scenario().
+    :param cache: See reason_scenario().
+    :param native_rules: See reason_scenario().
+    :param incremental_augmentation: See reason_scenario().
+    :param profiler: See reason_scenario().
+    """
+    number_of_scenes = len(scenes)
+    released = []
+    for i in range(number_of_scenes):
+        scene_world = scenes.pop(0)
+        if not no_reasoning:
+            logger.debug("Criticality reasoning on scene " + str(i + 1) + "/" + str(number_of_scenes))
+            with telemetry.span("scene reasoning", scene_world, scene=i + 1):
+                _reason(scene_world, pellet_output=pellet_output, cache=cache, native_rules=native_rules,
+                        incremental_augmentation=incremental_augmentation, profiler=profiler)
+        if scene_world is not world:
+            logger.debug("Merging scene world " + str(i + 1) + " into scenario world")
+            with telemetry.span("merge", world, scene=i + 1):
+                world_merger.merge(world, scene_world, add_temporal_identity=False)
+            released.append(_release(scene_world))
+        del scene_world
+    _check_released(released)
+
+
+def _create_scenario(world: owlready2.World, scenario_number=0):
+    """
+    Creates the scenario in the given world from all of its scenes (or updates the existing scenario if the world
+    already contains one), and re-adds the temporal identity information of its individuals.
+    :param world: The world containing the merged scenes.
+    :param scenario_number: The identifier of the scenario (if it is created).
+    """
+    world_merger.add_temporal_identity(world)
+    tm = auto.get_ontology(auto.Ontology.Traffic_Model, world)
+    ti = auto.get_ontology(auto.Ontology.Time, world)
+    scenes = world.search(type=tm.Scene)
     scenes.sort(key=lambda x: x.inTimePosition[0].numericPosition[0])
+    scenes[0].after = []
+    scenes[-1].before = []
     for i in range(len(scenes) - 1):
         scenes[i].before = [scenes[i + 1]]
         scenes[i + 1].after = [scenes[i]]
-    scenario_inst = tm.Scenario()
-    scenario_inst.identifier = scenario_number
+    scenarios = world.search(type=tm.Scenario)
+    if len(scenarios) > 0:
+        scenario_inst = scenarios[0]
+        scenario_duration = scenario_inst.hasDuration[0]
+    else:
+        scenario_inst = tm.Scenario()
+        scenario_inst.identifier = scenario_number
+        scenario_duration = ti.Duration()
+        scenario_inst.hasDuration = [scenario_duration]
     scenario_inst.hasBeginning = [scenes[0]]
     scenario_inst.hasEnd = [scenes[-1]]
-    scenario_duration = ti.Duration()
     scenario_duration.numericDuration = [scenes[-1].inTimePosition[0].numericPosition[0] -
                                          scenes[0].inTimePosition[0].numericPosition[0]]
-    scenario_inst.hasDuration = [scenario_duration]
     for scene in scenes:
-        scenario_inst.has_traffic_model.append(scene)
-
-    # Reduce scenario to temporal individuals only as to create a manageable ABox
-    logger.debug("Reducing ABox to temporal concepts only")
-    logger.debug("Full scenario individuals: " + str(len(list(merged_scenario.individuals()))))
-    # Get functions which will be used for augmentation (to not remove any temporal concepts that they may rely on)
-    aug_concepts = set()
-    for onto in merged_scenario.ontologies.values():
-        for cls in onto.classes():
-            for func in vars(cls).values():
-                if hasattr(func, "_used_concepts"):
-                    concepts = getattr(func, "_used_concepts")
-                    if concepts and isinstance(concepts, set):
-                        aug_concepts = aug_concepts.union(concepts)
-    undos, aug_undos = temporal_reduction.reduce(merged_scenario, aug_concepts)
-    logger.debug("Reduced scenario individuals: " + str(len(list(merged_scenario.individuals()))))
-
-    # Reasoning on complete scenario for temporal inference
-    if not no_reasoning:
-        logger.debug("Performing temporal criticality reasoning on scenario")
-        aug_undos = _reason(merged_scenario, aug_undos, pellet_output)
-
-    # Restore scenario
-    for undo, individual in reversed(undos + aug_undos):
-        # Final undo: Undoing deletion of individual
-        try:
-            undo()
-        except:
-            pass
-        # Hacky bugfix, Python seems to cache some properties badly... We need to call __getattr__, otherwise the
-        # cached properties will be used (which may be empty because of the previous deletion).
-        for prop in individual.__dict__.keys():
-            if individual.namespace.world._props.get(prop):
+        if scene not in scenario_inst.has_traffic_model:
+            scenario_inst.has_traffic_model.append(scene)
+
+
+def _reason_temporal(merged_scenario: owlready2.World, pellet_output=False, no_reasoning=False, projection=False,
+                     cache=None, native_rules=False, incremental_augmentation=False, profiler=None, window=None,
+                     time_windows=None):
+    """
+    Performs the temporal reasoning on the given scenario, either on a projection or on the reduced scenario, which is
+    restored afterwards.
+    :param merged_scenario: The world containing the scenario.
+    :param pellet_output: See reason_scenario().
+    :param no_reasoning: See reason_scenario().
+    :param projection: See reason_scenario().
+    :param cache: See reason_scenario().
+    :param native_rules: See reason_scenario().
+    :param incremental_augmentation: See reason_scenario().
+    :param profiler: See reason_scenario().
+    :param window: See reason_scenario().
+    :param time_windows: See refine_scenario().
+    """
+    if projection or window is not None or time_windows is not None:
+        # Reasoning on a projection of the scenario to its temporal individuals - the scenario world itself is never
+        # reduced and therefore does not need to be restored afterwards
+        if not no_reasoning:
+            logger.debug("Performing temporal criticality reasoning on projected scenario")
+            with telemetry.span("scenario reasoning", merged_scenario, projection=True, window=window):
+                _reason(merged_scenario, pellet_output=pellet_output,
+                        temporal_concepts=temporal_reduction.get_temporal_concepts(merged_scenario), cache=cache,
+                        native_rules=native_rules, incremental_augmentation=incremental_augmentation,
+                        profiler=profiler, window=window, time_windows=time_windows)
+    else:
+        # Reduce scenario to temporal individuals only as to create a manageable ABox
+        logger.debug("Reducing ABox to temporal concepts only")
+        logger.debug("Full scenario individuals: " + str(len(list(merged_scenario.individuals()))))
+        # Get functions which will be used for augmentation (to not remove any temporal concepts that they may rely on)
+        aug_concepts = set()
+        for onto in merged_scenario.ontologies.values():
+            for cls in onto.classes():
+                for func in vars(cls).values():
+                    if hasattr(func, "_used_concepts"):
+                        concepts = getattr(func, "_used_concepts")
+                        if concepts and isinstance(concepts, set):
+                            aug_concepts = aug_concepts.union(concepts)
+        with telemetry.span("temporal reduction", merged_scenario):
+            undos, aug_undos = temporal_reduction.reduce(merged_scenario, aug_concepts)
+        logger.debug("Reduced scenario individuals: " + str(len(list(merged_scenario.individuals()))))
+
+        # Reasoning on complete scenario for temporal inference
+        if not no_reasoning:
+            logger.debug("Performing temporal criticality reasoning on scenario")
+            with telemetry.span("scenario reasoning", merged_scenario, projection=False):
+                aug_undos = _reason(merged_scenario, aug_undos, pellet_output, cache=cache, native_rules=native_rules,
+                                    incremental_augmentation=incremental_augmentation, profiler=profiler)
+
+        # Restore scenario
+        with telemetry.span("restore", merged_scenario, individuals=len(undos) + len(aug_undos)):
+            for undo, individual in reversed(undos + aug_undos):
+                # Final undo: Undoing deletion of individual
                 try:
-                    getattr(individual, "__getattr__")(prop)
-                except TypeError:
+                    undo()
+                except:
                     pass
-                    # TODO this seems not to impact anything (i.e. properties are there). investigate further.
-                    # logger.error("Undo deletion: Not in graph: " + str(individual) + "." + str(prop))
-        # Store for later undoing
+                # Hacky bugfix, Python seems to cache some properties badly... We need to call __getattr__, otherwise
+                # the cached properties will be used (which may be empty because of the previous deletion).
+                for prop in individual.__dict__.keys():
+                    if individual.namespace.world._props.get(prop):
+                        try:
+                            getattr(individual, "__getattr__")(prop)
+                        except TypeError:
+                            pass
+                            # TODO this seems not to impact anything (i.e. properties are there). investigate further.
+                            # logger.error("Undo deletion: Not in graph: " + str(individual) + "." + str(prop))
+                # Store for later undoing
 
     # Get all individuals with some geometrical representation.
     geometrical_individuals = list(filter(lambda x: hasattr(x, "hasGeometry") and len(x.hasGeometry) > 0,
@@ -123,12 +251,37 @@ def reason_scenario(scenario: list, pellet_output=False, no_reasoning=False, sce
                     pass
 
     logger.debug("Restored full scenario individuals: " + str(len(list(merged_scenario.individuals()))))
-    logger.debug("Fully finished criticality reasoning on scenario. Took %.2f s" % (timeit.default_timer() - t1))
 
-    return merged_scenario
+
+def _release(world: owlready2.World) -> weakref.ref:
+    """
+    Closes the given (merged) scene world such that its quadstore and cached entities can be freed.
+    :param world: The world to release. Must not be used afterwards.
+    :return: A weak reference to the world to check whether it was garbage-collected.
+    """
+    world.close()
+    return weakref.ref(world)
+
+
+def _check_released(released: list):
+    """
+    Checks whether the released scene worlds were garbage-collected and warns about the ones still alive, i.e. the
+    ones that are still referenced from somewhere and hence leak memory.
+    :param released: A list of weak references to released worlds.
+    """
+    if len(released) == 0:
+        return
+    gc.collect()
+    alive = len([ref for ref in released if ref() is not None])
+    if alive > 0:
+        logger.warning(str(alive) + "/" + str(len(released)) + " released scene worlds were not garbage-collected "
+                       "(still referenced somewhere).")
+    else:
+        logger.debug("All " + str(len(released)) + " released scene worlds were garbage-collected")
 
 
-def _reason(world: owlready2.World, aug_undos=None, pellet_output=False) -> list:
+def _reason(world: owlready2.World, aug_undos=None, pellet_output=False, temporal_concepts=None, cache=None,
+            native_rules=False, incremental_augmentation=False, profiler=None, window=None, time_windows=None) -> list:
     """
     Augments the ABox & runs the Pellet reasoner on the given world. Can handle both scenes and scenarios, i.e. it
     checks whether there is a scenario (then, we run temporal scenario reasoning), or a scene in the world (then we run
@@ -139,6 +292,24 @@ def _reason(world: owlready2.World, aug_undos=None, pellet_output=False) -> list
     and perform augmentation on this state (since reduction might reduce concrete information that are needed for
     augmentation). Before reasoning, we obviously use a reduced ABox.
     :param pellet_output: Whether to show the output of Pellet.
+    :param temporal_concepts: Only for scenario reasoning: If given, the world is not reduced at all. Instead, the
+    reasoner runs on a projection of the world to the individuals related to the given temporal concepts, and its
+    inferences are written back into the world.
+    :param cache: Optional. A reasoning_cache.Reasoning_Cache to look up and store the results of Pellet in.
+    :param native_rules: Whether to evaluate the supported SWRL rules by the native rule engine. Those rules are then
+    excluded from Pellet's input, and Pellet only runs again if the rules infer new facts.
+    :param incremental_augmentation: Whether to memoize the results of augmentation functions across iterations and only
+    re-evaluate them for individuals that changed since their last evaluation. Functions are then scheduled along their
+    dependencies and skipped if none of their concepts changed.
+    :param profiler: Optional. An augmentation_profiler.Augmentation_Profiler to record the augmentation functions in
+    (per iteration).
+    :param window: Only for scenario reasoning with temporal concepts: If given, the reasoner runs on overlapping
+    windows of this many consecutive scenes of the projection instead of the whole projection. Windows span at least
+    the horizon of the temporal criticality phenomena (see temporal_reduction.get_temporal_horizon()), i.e. if 0 or
+    less than the horizon, the window size is the horizon. If no phenomenon bounds its duration, the horizon is the
+    window size or, if 0, temporal_reduction.DEFAULT_HORIZON.
+    :param time_windows: Only for scenario reasoning with temporal concepts: If given, only the temporal individuals
+    within these time windows (see refine_scenario()) are projected.
     :return: A list of undo methods that shall be executed in reverse order to restore the previous state.
     """
     # Fetch relevant ontologies
@@ -160,121 +331,189 @@ def _reason(world: owlready2.World, aug_undos=None, pellet_output=False) -> list
     l1_core.register(l1_core=l1core, l4_core=l4core, l4_de=l4de)
     l1_de.register(l1_de=l1de, l1_core=l1core, l4_de=l4de)
     l4_core.register(l4_core=l4core, l4_de=l4de, l2_de=l2de, physics=ph, time=ti)
+    augmentation_ontologies = [ph, pe, l4core, ti, l1core, l1de]
+    if incremental_augmentation:
+        memo = augmentation_memo.Augmentation_Memo(world)
+        memo.wrap()
+        augmentation_ontologies = augmentation_planner.schedule(memo.functions, augmentation_ontologies)
+    if profiler is not None:
+        profiler.wrap(world)
+
+    tbox = None
+    try:
+        # bugfix for owlready2 bug - creates storid for inferences ontology so that it will not be created when applying
+        # reasoning results. then, this storid may be one of the storids of the cleaned up individuals which leads to a
+        # crash after undoing their deletion.
+        world.get_ontology("http://inferrences/")
 
-    # bugfix for owlready2 bug - creates storid for inferences ontology so that it will not be created when applying
-    # reasoning results. then, this storid may be one of the storids of the cleaned up individuals which leads to a
-    # crash after undoing their deletion.
-    world.get_ontology("http://inferrences/")
-
-    # Run reasoner & perform augmentation
-    augmentation = True
-    c = 0
-    single_scene = len(world.search(type=tm.Scenario)) == 0
-
-    while augmentation:
-        c += 1
-        logger.debug("Cleaning up A-Box before criticality reasoning...")
-        # inferences into ontology
-        cleanup_undos = _cleanup_abox_for_reasoning(world)
-        logger.debug("Criticality reasoning iteration #" + str(c) + "...")
-        # Reasoner
-        t1 = timeit.default_timer()
-        if not pellet_output:
-            sys.stderr = open(os.devnull, "w")
-            sys.stdout = open(os.devnull, "w")
-        owlready2.sync_reasoner_pellet(world, infer_property_values=True)  # set debug=2 for explanation if inconsistent
-        if not pellet_output:
-            sys.stdout = sys.__stdout__
-            sys.stderr = sys.__stderr__
-        t2 = timeit.default_timer()
-        logger.debug("Criticality reasoning iteration #" + str(c) + " done. Took %.2f s" % (t2 - t1))
-        logger.debug("Restoring cleaned up A-Box...")
-        for undo, individual in reversed(cleanup_undos):
-            try:
-                undo()
-            except:
-                pass
-            for prop in individual.__dict__.keys():
-                if individual.namespace.world._props.get(prop):
+        # Run reasoner & perform augmentation
+        augmentation = True
+        c = 0
+        single_scene = len(world.search(type=tm.Scenario)) == 0
+        exclude_classes, exclude_predicates = _get_reasoning_exclusions(world)
+        if temporal_concepts is not None:
+            projected_individuals = temporal_reduction.get_temporal_individuals(world, temporal_concepts)
+            if time_windows is not None:
+                projected_individuals = temporal_reduction.get_individuals_in_time_windows(world, projected_individuals,
+                                                                                           time_windows)
+            # Augmentation only adds individuals, hence all projections (of all windows and iterations) share a TBox
+            tbox = temporal_reduction.get_tbox(world)
+
+        while augmentation:
+            c += 1
+            if temporal_concepts is None:
+                reasoning_individuals = [None]
+            elif window is None:
+                reasoning_individuals = [projected_individuals]
+            else:
+                # Windows shorter than the horizon could split phenomena, hence windows span at least the horizon
+                window_size = temporal_reduction.get_temporal_horizon(
+                    world, projected_individuals, default=window if window > 0 else temporal_reduction.DEFAULT_HORIZON)
+                if window > window_size:
+                    window_size = window
+                elif 0 < window < window_size:
+                    logger.warning("Window of " + str(window) + " scenes is shorter than the horizon of the temporal "
+                                   "criticality phenomena, using " + str(window_size) + " scenes instead")
+                reasoning_individuals = temporal_reduction.get_windows(world, projected_individuals, window_size)
+                logger.debug("Splitting A-Box into " + str(len(reasoning_individuals)) + " windows of " +
+                             str(window_size) + " scenes before criticality reasoning...")
+            logger.debug("Criticality reasoning iteration #" + str(c) + "...")
+            t1 = timeit.default_timer()
+            for w, individuals in enumerate(reasoning_individuals):
+                if individuals is not None:
+                    logger.debug("Projecting A-Box to " + str(len(individuals)) + " temporal individuals before "
+                                 "criticality reasoning...")
+                    reasoning_world = temporal_reduction.project(world, individuals, tbox)
+                else:
+                    reasoning_world = world
+                if native_rules:
+                    rules = rule_engine.get_rules(reasoning_world)
+                    exclude_entities = rule_engine.get_rule_storids(reasoning_world, rules)
+                else:
+                    rules = []
+                    exclude_entities = None
+                # Reasoner
+                with _suppress_output(not pellet_output):
+                    run_pellet = True
+                    while run_pellet:
+                        with telemetry.span("pellet", reasoning_world, iteration=c, window=w + 1):
+                            pellet.sync_reasoner_pellet(reasoning_world, infer_property_values=True,
+                                                        exclude_classes=exclude_classes,
+                                                        exclude_predicates=exclude_predicates,
+                                                        exclude_entities=exclude_entities, cache=cache)
+                        # Rules are evaluated on top of Pellet's inferences, Pellet only needs to run again if they
+                        # infer new facts
+                        with telemetry.span("rules", reasoning_world, iteration=c, window=w + 1, rules=len(rules)):
+                            run_pellet = len(rules) > 0 and rule_engine.materialize(reasoning_world, rules) > 0
+                if reasoning_world is not world:
+                    # Inferences of overlapping windows on the same individual are stitched together in the world
+                    temporal_reduction.write_back(reasoning_world, world)
+                    temporal_reduction.discard(reasoning_world)
+            t2 = timeit.default_timer()
+            logger.debug("Criticality reasoning iteration #" + str(c) + " done. Took %.2f s" % (t2 - t1))
+            logger.debug("Augmentation iteration #" + str(c) + "...")
+
+            # Augmentations
+            # First, restore anything that may be necessary to perform (temporal) augmentations - will later be
+            # un-undone for reasoning (as to not blow up the ABox)
+            if aug_undos:
+                for undo, individual in reversed(aug_undos):
+                    # Reasoning iteration: Undoing deletion of individual
                     try:
-                        getattr(individual, "__getattr__")(prop)
-                    except TypeError:
+                        undo()
+                    except:
                         pass
-        logger.debug("Augmentation iteration #" + str(c) + "...")
-
-        # Augmentations
-        # First, restore anything that may be necessary to perform (temporal) augmentations - will later be un-undone
-        # for reasoning (as to not blow up the ABox)
-        if aug_undos:
-            for undo, individual in reversed(aug_undos):
-                # Reasoning iteration: Undoing deletion of individual
-                try:
-                    undo()
-                except:
-                    pass
-                for prop in individual.__dict__.keys():
-                    if individual.namespace.world._props.get(prop):
-                        try:
-                            getattr(individual, "__getattr__")(prop)
-                        except TypeError:
-                            pass
-                            # TODO this seems not to impact anything (i.e. properties are there). investigate further.
-                            # logger.error("Undo deletion: Not in graph: " + str(individual) + "." + str(prop))
-        logger.debug("Size of ABox before augmentation: " + str(len([x for x in world.graph._iter_triples()])) +
-                     " triples")
-        t3 = timeit.default_timer()
-
-        augmentation, new_individuals = owlready2_augmentator.do_augmentation(ph, pe, l4core, ti, l1core, l1de)
-
-        # Remove previously re-added individuals since they have now been used in augmentations and can safely be
-        # deleted
-        if aug_undos:
-            new_aug_undos = []
-            for undo, individual in aug_undos:
-                # Reasoning iteration: Destroying individual
-                try:
-                    new_aug_undo = owlready2.destroy_entity(individual, undoable=True)
-                    new_aug_undos.append((new_aug_undo, individual))
-                except:
-                    pass
-            aug_undos = new_aug_undos
-        # Add augmented entities to scene or scenario
-        if single_scene:
-            world.search(type=tm.Scene)[0].has_traffic_entity = world.search(type=tm.Scene)[0].has_traffic_entity + \
-                                                                list(new_individuals)
-        else:
-            scenario = world.search(type=tm.Scenario)[0]
-            for new_individual in new_individuals:
-                if isinstance(new_individual, ac.Activity):
-                    scenario.has_traffic_entity.append(new_individual)
-                else:
-                    logger.warning("Augmented scenario with individual that is not an activity: " + str(new_individual))
-        t4 = timeit.default_timer()
-        # Print debug information
-        logger.debug("Size of ABox after augmentation : " + str(len([x for x in world.graph._iter_triples()])) +
-                     " triples")
-        logger.debug("Augmentation iteration #" + str(c) + " done. Took %.2f s" % (t4 - t3))
-        logger.debug("Iteration #" + str(c) + " done. Took %.2f s" % (t4 - t1))
+                    for prop in individual.__dict__.keys():
+                        if individual.namespace.world._props.get(prop):
+                            try:
+                                getattr(individual, "__getattr__")(prop)
+                            except TypeError:
+                                pass
+                                # TODO this seems not to impact anything (i.e. properties are there). investigate
+                                #  further.
+                                # logger.error("Undo deletion: Not in graph: " + str(individual) + "." + str(prop))
+            logger.debug("Size of ABox before augmentation: " + str(len([x for x in world.graph._iter_triples()])) +
+                         " triples")
+            t3 = timeit.default_timer()
+
+            if incremental_augmentation:
+                memo.start_round()
+            if profiler is not None:
+                profiler.iteration = c
+            with telemetry.span("augmentation", world, iteration=c):
+                augmentation, new_individuals = owlready2_augmentator.do_augmentation(*augmentation_ontologies)
+
+            # Remove previously re-added individuals since they have now been used in augmentations and can safely be
+            # deleted
+            if aug_undos:
+                new_aug_undos = []
+                for undo, individual in aug_undos:
+                    # Reasoning iteration: Destroying individual
+                    try:
+                        new_aug_undo = owlready2.destroy_entity(individual, undoable=True)
+                        new_aug_undos.append((new_aug_undo, individual))
+                    except:
+                        pass
+                aug_undos = new_aug_undos
+            # Newly augmented temporal individuals will be part of the next projection
+            if temporal_concepts is not None:
+                new_temporal_individuals = temporal_reduction.get_temporal_individuals(world, temporal_concepts,
+                                                                                       new_individuals)
+                if time_windows is not None:
+                    new_temporal_individuals = temporal_reduction.get_individuals_in_time_windows(
+                        world, new_temporal_individuals, time_windows)
+                projected_individuals |= new_temporal_individuals
+            # Add augmented entities to scene or scenario
+            if single_scene:
+                scene = world.search(type=tm.Scene)[0]
+                scene.has_traffic_entity = scene.has_traffic_entity + list(new_individuals)
+            else:
+                scenario = world.search(type=tm.Scenario)[0]
+                for new_individual in new_individuals:
+                    if isinstance(new_individual, ac.Activity):
+                        scenario.has_traffic_entity.append(new_individual)
+                    else:
+                        logger.warning("Augmented scenario with individual that is not an activity: " +
+                                       str(new_individual))
+            t4 = timeit.default_timer()
+            # Print debug information
+            logger.debug("Size of ABox after augmentation : " + str(len([x for x in world.graph._iter_triples()])) +
+                         " triples")
+            logger.debug("Augmentation iteration #" + str(c) + " done. Took %.2f s" % (t4 - t3))
+            logger.debug("Iteration #" + str(c) + " done. Took %.2f s" % (t4 - t1))
+    finally:
+        if tbox is not None:
+            temporal_reduction.discard_tbox(tbox)
+        # The augmentation functions are restored also if reasoning or augmentation fails
+        if profiler is not None:
+            profiler.unwrap()
+        if incremental_augmentation:
+            memo.unwrap()
 
     return aug_undos
 
 
-def _cleanup_abox_for_reasoning(world) -> list:
+@contextlib.contextmanager
+def _suppress_output(suppress=True):
     """
-    This helper method reduces the ABox before reasoning on each scene based on the owlready2 `destroy_entity` method.
-    It can be very useful to avoid memory problems if one knows a-priori that certain classes can be ignored for
-    scene-level reasoning. Right now, we remove every individual of the class GeoSPARQL.Geometry.
-    :param world: The scene world to reduce.
-    :return: A list of undo methods that shall be executed in reverse order to restore the previous state.
+    Redirects stdout and stderr to /dev/null within the with-block (if suppress is True).
+    """
+    if not suppress:
+        yield
+        return
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull), contextlib.redirect_stderr(devnull):
+        yield
+
+
+def _get_reasoning_exclusions(world) -> tuple:
+    """
+    This helper method returns the classes and predicates that are filtered out of the reasoner's input (the world
+    itself is not modified). It can be very useful to avoid memory problems if one knows a-priori that certain classes
+    can be ignored for reasoning. Right now, we exclude every individual of the class GeoSPARQL.Geometry as well as
+    every WKT literal.
+    :param world: The world to reason on.
+    :return: A tuple of a set of classes whose individuals shall be excluded and a set of predicates to exclude.
     """
-    # Adjust this set to add more classes whose individuals shall be removed before scene reasoning.
-    clean_clss = {auto.get_ontology(auto.Ontology.GeoSPARQL, world).Geometry}
-    undos = []
-    individuals = [x for x in world.individuals() if len(set(x.INDIRECT_is_a).intersection(clean_clss)) > 0]
-    for individual in individuals:
-        try:
-            undo = owlready2.destroy_entity(individual, undoable=True)
-            undos.append((undo, individual))
-        except:
-            pass
-    return undos
+    geo = auto.get_ontology(auto.Ontology.GeoSPARQL, world)
+    # Adjust these sets to add more classes or predicates that shall be excluded before reasoning.
+    return {geo.Geometry}, {geo.asWKT}
@@ -0,0 +1,254 @@
+import logging
+import os
+import subprocess
+import tempfile
+import timeit
+from collections import defaultdict
+from functools import lru_cache
+import owlready2
+from owlready2.base import rdf_type
+from owlready2.reasoning import _INFERRENCES_ONTOLOGY, _PELLET_CLASSPATH, _PELLET_PROP_REGEXP, _subprocess_kargs, \
+    _decode, _apply_reasoning_results, _apply_inferred_obj_relations
+
+logger = logging.getLogger(__name__)
+
+# The loader used by Pellet. Jena has shown to lead to faulty behavior of Pellet on A.U.T.O. (see README.md and
+# patches/owlready2_reasoning.patch).
+_PELLET_LOADER = "OWLAPIv3"
+# owlready2-internal predicate that shall never be passed to the reasoner.
+_PYTHON_NAME_PREDICATE = "http://www.lesfleursdunormal.fr/static/_downloads/owlready_ontology.owl#python_name"
+
+
+def sync_reasoner_pellet(world: owlready2.World, infer_property_values=False, exclude_classes=None,
+                         exclude_predicates=None, exclude_entities=None, cache=None):
+    """
+    Runs the Pellet reasoner on the given world and applies its inferences to the inferences ontology of the world,
+    equivalently to owlready2's `sync_reasoner_pellet`. In contrast to owlready2, the triples are streamed into
+    Pellet's input file while applying an exclusion filter. This way, the world does not need to be modified in order
+    to keep large but irrelevant parts of the ABox (e.g. geometries) away from the reasoner.
+    :param world: The world to reason on.
+    :param infer_property_values: Whether to infer object property values.
+    :param exclude_classes: Optional. A set of classes whose individuals (including the individuals of subclasses) shall
+    be excluded from the reasoner's input, together with every triple they are part of.
+    :param exclude_predicates: Optional. A set of properties whose triples shall be excluded from the reasoner's input.
+    :param exclude_entities: Optional. A set of quad store IDs (e.g. of rules and their blank nodes) whose triples shall
+    be excluded from the reasoner's input.
+    :param cache: Optional. A reasoning_cache.Reasoning_Cache. If it contains results for the reasoner's input, they are
+    applied instead of running Pellet. Otherwise, Pellet's results are added to the cache.
+    """
+    ontology = world.get_ontology(_INFERRENCES_ONTOLOGY)
+    locked = world.graph.has_write_lock()
+    if locked:
+        world.graph.release_write_lock()  # Not needed during reasoning
+    results = None
+    try:
+        # Pellet's input file is written in the same scan of the quad store that computes the key of the cache
+        tmp = tempfile.NamedTemporaryFile("wb", suffix=".nt", delete=False)
+        try:
+            if cache is not None:
+                key, labels = cache.key(world, stream_ntriples(world, tmp, exclude_classes, exclude_predicates,
+                                                               exclude_entities), infer_property_values)
+                results = cache.get(world, key, labels)
+                if results is not None:
+                    logger.debug("Reasoning cache hit for " + key + ", skipping Pellet")
+            else:
+                write_ntriples(world, tmp, exclude_classes, exclude_predicates, exclude_entities)
+            if results is None:
+                tmp.close()
+                logger.debug("Streamed triples to Pellet input file " + tmp.name)
+                output = _run_pellet(tmp.name, infer_property_values)
+        finally:
+            tmp.close()
+            os.unlink(tmp.name)
+        if results is None:
+            results = _parse_output(world, ontology, output, infer_property_values)
+            if cache is not None:
+                cache.put(world, key, labels, results)
+    finally:
+        if locked:
+            world.graph.acquire_write_lock()  # Re-lock when applying results
+    _apply_results(world, ontology, results)
+
+
+def write_ntriples(world: owlready2.World, file, exclude_classes=None, exclude_predicates=None, exclude_entities=None) \
+        -> int:
+    """
+    Streams all triples of the world as N-Triples into the given file, except for the triples excluded by the given
+    classes and predicates. The filter is evaluated by the quad store, the world is not modified.
+    :param world: The world to write.
+    :param file: A file object opened in binary mode.
+    :param exclude_classes: Optional. A set of classes whose individuals (including the individuals of subclasses) shall
+    be excluded, together with every triple they are part of.
+    :param exclude_predicates: Optional. A set of properties whose triples shall be excluded.
+    :param exclude_entities: Optional. A set of quad store IDs whose triples shall be excluded.
+    :return: The number of written triples.
+    """
+    nb_triples = 0
+    for _ in stream_ntriples(world, file, exclude_classes, exclude_predicates, exclude_entities):
+        nb_triples += 1
+    return nb_triples
+
+
+def stream_ntriples(world: owlready2.World, file, exclude_classes=None, exclude_predicates=None,
+                    exclude_entities=None):
+    """
+    Iterates over the triples of the world like iter_triples() and writes each triple as N-Triples into the given file
+    while iterating, e.g. to compute the key of the reasoning cache in the same scan. For parameters, see
+    write_ntriples().
+    :return: A generator yielding (subject, predicate, object, datatype) tuples.
+    """
+    unabbreviate = lru_cache(None)(world._unabbreviate)
+    for s, p, o, d in iter_triples(world, exclude_classes, exclude_predicates, exclude_entities):
+        file.write((format_ntriple(s, p, o, d, unabbreviate) + "\n").encode("utf8"))
+        yield s, p, o, d
+
+
+def iter_triples(world: owlready2.World, exclude_classes=None, exclude_predicates=None, exclude_entities=None):
+    """
+    Iterates over all triples of the world (as quad store IDs) except for the triples excluded by the given classes and
+    predicates. For parameters, see write_ntriples().
+    :return: A cursor yielding (subject, predicate, object, datatype) tuples.
+    """
+    graph = world.graph
+    predicates = {world._abbreviate(_PYTHON_NAME_PREDICATE)}.union(
+        {x.storid for x in exclude_predicates or [] if x is not None})
+    classes = {x.storid for cls in exclude_classes or [] if cls is not None for x in cls.descendants()}
+    graph.execute("CREATE TEMP TABLE IF NOT EXISTS excluded_individuals (storid INTEGER PRIMARY KEY)")
+    graph.execute("DELETE FROM excluded_individuals")
+    if len(classes) > 0:
+        graph.execute("INSERT OR IGNORE INTO excluded_individuals SELECT s FROM objs WHERE p=? AND o IN (%s)" %
+                      ",".join("?" for _ in classes), (rdf_type, *classes))
+    if exclude_entities:
+        graph.db.executemany("INSERT OR IGNORE INTO excluded_individuals VALUES (?)", [(x,) for x in exclude_entities])
+    excluded = "(SELECT storid FROM excluded_individuals)"
+    # A new cursor allows to stream without loading all triples into memory, while still being able to query
+    cursor = graph.db.cursor()
+    cursor.execute("SELECT s, p, o, d FROM quads WHERE p NOT IN (%s) AND s NOT IN %s AND (d IS NOT NULL OR o NOT IN %s)"
+                   % (",".join("?" for _ in predicates), excluded, excluded), tuple(predicates))
+    return cursor
+
+
+def format_ntriple(s, p, o, d, unabbreviate) -> str:
+    """
+    Formats a triple of quad store IDs as an N-Triples line (without line break), as done by owlready2.
+    :param s: The subject.
+    :param p: The predicate.
+    :param o: The object (either a quad store ID or a literal value).
+    :param d: The datatype of the object (None if the object is not a literal).
+    :param unabbreviate: A function mapping quad store IDs to IRIs.
+    :return: The N-Triples line.
+    """
+    if s < 0:
+        s = "_:%s" % (-s)
+    else:
+        s = "<%s>" % unabbreviate(s)
+    p = "<%s>" % unabbreviate(p)
+    if d is None:
+        if o < 0:
+            o = "_:%s" % (-o)
+        else:
+            o = "<%s>" % unabbreviate(o)
+    else:
+        if isinstance(o, str):
+            o = o.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+        if isinstance(d, str) and d.startswith("@"):
+            o = "\"%s\"%s" % (o, d)
+        elif d == 0:
+            o = "\"%s\"" % o
+        else:
+            o = "\"%s\"^^<%s>" % (o, unabbreviate(d))
+    return "%s %s %s ." % (s, p, o)
+
+
+def _run_pellet(filename: str, infer_property_values=False) -> str:
+    """
+    Runs Pellet's realization on the given N-Triples file.
+    :param filename: The path to the N-Triples file.
+    :param infer_property_values: Whether to infer object property values.
+    :return: Pellet's output.
+    """
+    command = [owlready2.JAVA_EXE, "-Xmx%sM" % owlready2.reasoning.JAVA_MEMORY, "-cp", _PELLET_CLASSPATH,
+               "pellet.Pellet", "realize", "--loader", _PELLET_LOADER, "--input-format", "N-Triples",
+               "--ignore-imports", filename]
+    if infer_property_values:
+        command.insert(-2, "--infer-prop-values")
+    logger.debug("Running Pellet: " + " ".join(command))
+    t1 = timeit.default_timer()
+    try:
+        output = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True,
+                                **_subprocess_kargs).stdout
+    except subprocess.CalledProcessError as e:
+        if e.returncode == 1 and b"ERROR: Ontology is inconsistent" in (e.stderr or b""):
+            raise owlready2.OwlReadyInconsistentOntologyError("Java error message is: %s" %
+                                                              _decode(e.stderr or e.output or b""))
+        else:
+            raise owlready2.OwlReadyJavaError("Java error message is:\n%s" % _decode(e.stderr or e.output or b""))
+    logger.debug("Pellet took %.2f s" % (timeit.default_timer() - t1))
+    return _decode(output).replace("\r", "")
+
+
+def _parse_output(world: owlready2.World, ontology: owlready2.Ontology, output: str, infer_property_values=False) \
+        -> tuple:
+    """
+    Parses the output of Pellet's realization into new parents, new equivalences and new object property relations (as
+    done by owlready2).
+    :param world: The world that was reasoned on.
+    :param ontology: The ontology to store the inferences in.
+    :param output: Pellet's output.
+    :param infer_property_values: Whether object property values were inferred.
+    :return: A tuple of new parents, new equivalences, types of entities and inferred object property relations.
+    """
+    new_parents = defaultdict(list)
+    new_equivs = defaultdict(list)
+    entity_2_type = {}
+    stack = []
+    for line in output.split("\n"):
+        if not line:
+            continue
+        line2 = line.lstrip()
+        depth = len(line) - len(line2)
+        splitted = line2.split(" - ", 1)
+        class_storids = [ontology._abbreviate(class_iri) for class_iri in splitted[0].split(" = ")]
+        if len(class_storids) > 1:
+            for class_storid1 in class_storids:
+                for class_storid2 in class_storids:
+                    if class_storid1 is not class_storid2:
+                        new_equivs[class_storid1].append(class_storid2)
+        while stack and stack[-1][0] >= depth:
+            del stack[-1]
+        for class_storid in class_storids:
+            entity_2_type[class_storid] = "class"
+            if len(stack) > 1:  # If the stack only contains Thing, it is not interesting
+                new_parents[class_storid].extend(stack[-1][1])
+        stack.append((depth, class_storids))
+        if len(splitted) == 2:
+            for ind_iri in splitted[1][1:-1].split(", "):
+                ind_storid = ontology._abbreviate(ind_iri)
+                entity_2_type[ind_storid] = "individual"
+                new_parents[ind_storid].extend(class_storids)
+    inferred_obj_relations = []
+    if infer_property_values:
+        for a_iri, prop_iri, b_iri in _PELLET_PROP_REGEXP.findall(output):
+            prop = world[prop_iri]
+            if prop is None:
+                continue
+            a_storid = ontology._abbreviate(a_iri, False)
+            b_storid = ontology._abbreviate(b_iri.strip(), False)
+            if a_storid is not None and b_storid is not None and \
+                    not world._has_obj_triple_spo(a_storid, prop.storid, b_storid) and \
+                    (not prop._inverse_property or
+                     not world._has_obj_triple_spo(b_storid, prop._inverse_storid, a_storid)):
+                inferred_obj_relations.append((a_storid, prop, b_storid))
+    return new_parents, new_equivs, entity_2_type, inferred_obj_relations
+
+
+def _apply_results(world: owlready2.World, ontology: owlready2.Ontology, results: tuple):
+    """
+    Applies parsed reasoning results to the world (by owlready2's functionality).
+    :param world: The world to apply the results to.
+    :param ontology: The ontology to store the inferences in.
+    :param results: The results as returned by _parse_output().
+    """
+    new_parents, new_equivs, entity_2_type, inferred_obj_relations = results
+    _apply_reasoning_results(world, ontology, False, new_parents, new_equivs, entity_2_type)
+    _apply_inferred_obj_relations(world, ontology, False, inferred_obj_relations)
@@ -1,17 +1,121 @@
+import io
 import logging
+from collections import defaultdict
 import owlready2
+from owlready2.base import rdf_type
 import tqdm
+import weakref
 
 from pyauto import auto, utils
 
 logger = logging.getLogger(__name__)
 
+# The compiled extraction codes of the CP classes as a dict from their IRIs to a tuple of the compiled subject and
+# object extraction code (see _get_extraction_code()).
 _CACHED_CP_CLASSES = dict()
 
+# The labels of the most specific classes of individuals, as a dict from each world to a dict from the storids of its
+# individuals to a tuple of their labels (see cache_most_specific_classes()).
+_CACHED_MOST_SPECIFIC_CLASSES = weakref.WeakKeyDictionary()
+
+
+def _get_extraction_code(cp_cls) -> tuple:
+    """
+    Returns the subject and object extraction code of the given CP class, compiled only once per class. If the code of
+    the class is invalid, the compilation error is returned instead (and raised by _exec()).
+    :param cp_cls: The class of the TBox of the criticality phenomenon.
+    :return: A tuple of the compiled subject and object extraction code (None if the class has no such code).
+    """
+    if cp_cls.iri not in _CACHED_CP_CLASSES:
+        codes = []
+        for code in [cp_cls.subject_extraction_code, cp_cls.object_extraction_code]:
+            if len(code) > 0:
+                try:
+                    codes.append(compile(code[0], str(cp_cls), "exec"))
+                except Exception as e:
+                    codes.append(e)
+            else:
+                codes.append(None)
+        _CACHED_CP_CLASSES[cp_cls.iri] = tuple(codes)
+    return _CACHED_CP_CLASSES[cp_cls.iri]
+
+
+def _exec(code, local_dict: dict):
+    """
+    Executes the given compiled extraction code (see _get_extraction_code()) with the given local variables.
+    """
+    if isinstance(code, Exception):
+        raise code.with_traceback(None)
+    exec(code, globals(), local_dict)
+
+
+class _Prefetched_Relations:
+    """
+    The relations needed to extract the criticality phenomena of a world (their participants, scenes and time bounds),
+    fetched from the quadstore by a few set-based queries instead of one query per attribute access.
+    """
+    # The object properties to prefetch, by their Python names.
+    PROPERTIES = ["conducted_by", "has_participant", "in_traffic_model", "hasBeginning", "hasEnd", "inTimePosition"]
+
+    def __init__(self, world: owlready2.World):
+        """
+        :param world: The world to fetch the relations in.
+        """
+        ac = auto.get_ontology(auto.Ontology.Act, world)
+        ti = auto.get_ontology(auto.Ontology.Time, world)
+        tm = auto.get_ontology(auto.Ontology.Traffic_Model, world)
+        self.world = world
+        self.activities = {x.storid for x in world.search(type=ac.Activity)}
+        self.temporal = self.activities.union(x.storid for x in world.search(type=ti.Interval))
+        self.scenes = {x.storid for x in world.search(type=tm.Scene)}
+        props = {world._props[x].storid: x for x in self.PROPERTIES if x in world._props}
+        # Relations may also be asserted by the inverse property (e.g. a scene has_traffic_entity some lane), as
+        # resolved by owlready2 on attribute access
+        inverses = {world._props[x].inverse_property.storid: x for x in self.PROPERTIES if x in world._props and
+                    world._props[x].inverse_property is not None}
+        self._relations = defaultdict(list)
+        for s, p, o in world.graph.execute("SELECT s, p, o FROM objs WHERE p IN (" +
+                                           ",".join("?" * (len(props) + len(inverses))) + ")",
+                                           tuple(props.keys()) + tuple(inverses.keys())):
+            if p in props:
+                relation = self._relations[s, props[p]]
+            else:
+                s, o = o, s
+                relation = self._relations[s, inverses[p]]
+            if o not in relation:
+                relation.append(o)
+        self._positions = dict()
+        for s, o, d in world.graph.execute("SELECT s, o, d FROM datas WHERE p=?", (ti.numericPosition.storid,)):
+            self._positions.setdefault(s, owlready2.from_literal(o, d))
+
+    def get(self, individual, prop: str) -> list:
+        """
+        :param individual: The individual (or its storid).
+        :param prop: The Python name of the object property (one of PROPERTIES).
+        :return: The list of the storids of the objects of the individual for the property.
+        """
+        return self._relations.get((getattr(individual, "storid", individual), prop), [])
+
+    def get_entities(self, individual, prop: str) -> list:
+        """
+        :return: The list of the objects (as entities) of the individual for the property, see get().
+        """
+        return [self.world._get_by_storid(x) for x in self.get(individual, prop)]
+
+    def get_time(self, traffic_model):
+        """
+        :param traffic_model: The scene (or any individual with a time position), or its storid.
+        :return: The numeric position of the time position of the given traffic model, or None if it has none.
+        """
+        for time_position in self.get(traffic_model, "inTimePosition"):
+            if time_position in self._positions:
+                return self._positions[time_position]
+        return None
+
 
 class Criticality_Phenomenon:
 
-    def __init__(self, traffic_model, cp, cp_cls, objects=None):
+    def __init__(self, traffic_model, cp, cp_cls, objects=None, relations=None):
         """
         Constructor for criticality phenomena. Information about criticality phenomena are stored as follows:
         - traffic_model: The scene or scenario in which the CP occurs.
@@ -27,24 +131,33 @@ class Criticality_Phenomenon:
         :param objects: If the objects of the criticality phenomenon were already extracted previously, they can be
         passed here as a dict, assigning each object property (str) a list of objects, e.g. {"prop1": [obj1, obj2],
         "prop2": [obj2, obj3]}. If None is given, objects will be extracted in the constructor.
+        :param relations: Optional. The prefetched relations of the world of the criticality phenomenon to read the
+        participants and time bounds from instead of accessing them on the individual.
         """
         self.traffic_model = traffic_model
         self.cp = cp
         self.cp_cls = cp_cls
         self.time = 0
-        ac = auto.get_ontology(auto.Ontology.Act, self.cp.namespace.world)
+        if relations is not None:
+            is_activity = self.cp.storid in relations.activities
+            conducted_by = relations.get_entities(self.cp, "conducted_by") if is_activity else []
+        else:
+            ac = auto.get_ontology(auto.Ontology.Act, self.cp.namespace.world)
+            is_activity = ac.Activity in self.cp.INDIRECT_is_a
+            conducted_by = self.cp.conducted_by if is_activity else []
+        subject_code, object_code = _get_extraction_code(self.cp_cls)
         # Subjects
-        if len(self.cp_cls.subject_extraction_code) > 0:
+        if subject_code is not None:
             try:
                 local_dict = {"subject": self.cp, "subjects": []}
-                exec(self.cp_cls.subject_extraction_code[0], globals(), local_dict)
+                _exec(subject_code, local_dict)
                 self.subjects = local_dict["subjects"] or []
             except Exception as e:
                 logger.error("Invalid subject extraction code in OWL during CP extraction of: " + str(self.cp) + " (" +
                              str(self.cp_cls) + "): " + str(e))
                 self.subjects = []
-        elif ac.Activity in self.cp.INDIRECT_is_a and len(self.cp.conducted_by) > 0:
-            self.subjects = self.cp.conducted_by
+        elif is_activity and len(conducted_by) > 0:
+            self.subjects = conducted_by
         else:
             self.subjects = [self.cp]
         # Predicate
@@ -52,17 +165,20 @@ class Criticality_Phenomenon:
         if len(self.cp_cls.label.en) > 0:
             self.predicate += " (" + self.cp_cls.label.en[0] + ")"
         # Objects
-        if objects is None and len(self.cp_cls.object_extraction_code) > 0:
+        if objects is None and object_code is not None:
             try:
                 local_dict = {"subject": self.cp, "objects": []}
-                exec(self.cp_cls.object_extraction_code[0], globals(), local_dict)
+                _exec(object_code, local_dict)
                 self.objects = local_dict["objects"] or []
             except Exception as e:
                 logger.error("Invalid object extraction code in OWL during CP extraction of: " + str(self.cp) + " (" +
                              str(self.cp_cls) + "): " + str(e))
                 self.objects = []
-        elif objects is None and ac.Activity in self.cp.INDIRECT_is_a:
-            self.objects = {"participants": self.cp.has_participant}
+        elif objects is None and is_activity:
+            if relations is not None:
+                self.objects = {"participants": relations.get_entities(self.cp, "has_participant")}
+            else:
+                self.objects = {"participants": self.cp.has_participant}
         else:
             self.objects = objects or dict()
 
@@ -76,13 +192,13 @@ class Criticality_Phenomenon:
         label = "t = " + str(self.at_time()) + ": "
         # Subjects
         if len(self.subjects) > 0:
-            subj_and_classes = pyauto.utils.get_most_specific_classes(self.subjects)
+            subj_and_classes = get_most_specific_classes(self.subjects)
             label += ", ".join([str(x[0]) + " (" + ", ".join(x[1]) + ")" for x in subj_and_classes]) + " -- "
         # Predicate
         label += self.predicate
         # Objects
         for obj_predicate in self.objects.keys():
-            obj_and_classes = pyauto.utils.get_most_specific_classes(self.objects[obj_predicate])
+            obj_and_classes = get_most_specific_classes(self.objects[obj_predicate])
             label += " -- " + obj_predicate + " --> " + ", ".join([str(x[0]) + " (" + ", ".join(x[1]) + ")" for x in
                                                                    obj_and_classes])
         return label
@@ -142,20 +258,30 @@ class Scene_Criticality_Phenomenon(Criticality_Phenomenon):
     """
     Concretization for scene-level criticality phenomena. Note that member traffic_model is a list of scenes.
     """
-    def __init__(self, traffic_model: list, cp, cp_cls, objects=None):
+    def __init__(self, traffic_model: list, cp, cp_cls, objects=None, relations=None):
         if len(traffic_model) == 0:
             raise ValueError("Scene CP with scenes")
-        Criticality_Phenomenon.__init__(self, traffic_model, cp, cp_cls, objects)
-        self.time = traffic_model[0].inTimePosition[0].numericPosition[0]
+        Criticality_Phenomenon.__init__(self, traffic_model, cp, cp_cls, objects, relations)
+        if relations is not None:
+            self.time = relations.get_time(traffic_model[0])
+        else:
+            self.time = traffic_model[0].inTimePosition[0].numericPosition[0]
 
 
 class Scenario_Criticality_Phenomenon(Criticality_Phenomenon):
     """
     Concretization for scenario-level criticality phenomena.
     """
-    def __init__(self, traffic_model, cp, cp_cls, objects=None):
-        Criticality_Phenomenon.__init__(self, traffic_model, cp, cp_cls, objects)
-        if hasattr(self.cp, "hasBeginning") and hasattr(self.cp, "hasEnd") and len(self.cp.hasBeginning) > 0 and \
+    def __init__(self, traffic_model, cp, cp_cls, objects=None, relations=None):
+        Criticality_Phenomenon.__init__(self, traffic_model, cp, cp_cls, objects, relations)
+        if relations is not None:
+            begin = [relations.get_time(x) for x in relations.get(self.cp, "hasBeginning")[:1]]
+            end = [relations.get_time(x) for x in relations.get(self.cp, "hasEnd")[:1]]
+            if len(begin) == 0 or begin[0] is None or len(end) == 0 or end[0] is None:
+                begin = [relations.get_time(x) for x in relations.get(self.traffic_model, "hasBeginning")[:1]]
+                end = [relations.get_time(x) for x in relations.get(self.traffic_model, "hasEnd")[:1]]
+            self.time = (begin[0], end[0])
+        elif hasattr(self.cp, "hasBeginning") and hasattr(self.cp, "hasEnd") and len(self.cp.hasBeginning) > 0 and \
                 len(self.cp.hasBeginning[0].inTimePosition) > 0 and \
                 len(self.cp.hasBeginning[0].inTimePosition[0].numericPosition) > 0 and len(self.cp.hasEnd) > 0 and \
                 len(self.cp.hasEnd[0].inTimePosition) > 0 and \
@@ -167,6 +293,159 @@ class Scenario_Criticality_Phenomenon(Criticality_Phenomenon):
                          self.traffic_model.hasEnd[0].inTimePosition[0].numericPosition[0])
 
 
+class Criticality_Phenomenon_Record:
+    """
+    A compact, self-contained record of a criticality phenomenon that only holds resolved names, IRIs, class labels and
+    times, such that it can be printed, listed (see list_cps()) and serialized without the world being loaded. Records
+    are created in bulk from criticality phenomena by to_records().
+    - cp: The IRI of the CP individual.
+    - cp_cls: The IRI of the class of the criticality phenomenon.
+    - predicate: The predicate (i.e. name and label of the class) of the criticality phenomenon.
+    - time: Either an interval tuple (start, end) or a time point as float.
+    - subjects: A tuple of the subjects as tuples of their IRI, name and the labels of their most specific classes.
+    - objects: A tuple of the objects as tuples of the object property and a tuple of the objects (as the subjects).
+    - scenes: A frozenset of the IRIs of the scenes that all subjects and objects are in.
+    """
+    __slots__ = ("cp", "cp_cls", "predicate", "time", "subjects", "objects", "scenes")
+
+    def __init__(self, cp: str, cp_cls: str, predicate: str, time, subjects: tuple, objects: tuple, scenes: frozenset):
+        self.cp = cp
+        self.cp_cls = cp_cls
+        self.predicate = predicate
+        self.time = time
+        self.subjects = subjects
+        self.objects = objects
+        self.scenes = scenes
+
+    def __str__(self) -> str:
+        """
+        Returns a string representation of the criticality phenomenon in the form 't = X: subject(s) -- predicate -->
+        object(s)', equal to the one of Criticality_Phenomenon.
+        :return: String representation as described above.
+        """
+        label = "t = " + str(self.at_time()) + ": "
+        if len(self.subjects) > 0:
+            label += _format_individuals(self.subjects) + " -- "
+        label += self.predicate
+        for obj_predicate, objects in self.objects:
+            label += " -- " + obj_predicate + " --> " + _format_individuals(objects)
+        return label
+
+    def to_csv(self) -> str:
+        """
+        Returns a CSV representation (semicolon-separated) of the criticality phenomenon in the form 'time; predicate;
+        subject(s); object(s)', equal to the one of Criticality_Phenomenon.
+        :return: CSV as a string as described above
+        """
+        time = self.at_time()
+        if isinstance(time, tuple):
+            start, end = time
+        else:
+            start, end = time, time
+        csv_res = str(start) + ";" + str(end) + ";" + self.predicate + ";" + _format_individuals(self.subjects) + ";"
+        csv_res += " | ".join(obj_predicate + ": " + _format_individuals(objects) for obj_predicate, objects in
+                              self.objects)
+        return csv_res
+
+    def at_time(self):
+        """
+        :return: The time at which self occurs.
+        """
+        return self.time
+
+    def is_representable_in_scene(self, scene) -> bool:
+        """
+        :param scene: The scene (or its IRI) to check against.
+        :return: True iff all subjects and objects of the phenomenon are within the scene.
+        """
+        return len(self.subjects) > 0 and getattr(scene, "iri", scene) in self.scenes
+
+    def to_dict(self) -> dict:
+        """
+        :return: The record as a JSON-serializable dict.
+        """
+        return {"cp": self.cp, "cp_cls": self.cp_cls, "predicate": self.predicate, "time": self.time,
+                "subjects": self.subjects, "objects": self.objects, "scenes": sorted(self.scenes)}
+
+    @staticmethod
+    def from_dict(d: dict):
+        """
+        :param d: A dict as created by to_dict() (possibly after a JSON round trip).
+        :return: The record represented by the dict.
+        """
+        time = tuple(d["time"]) if isinstance(d["time"], list) else d["time"]
+        subjects = tuple((iri, name, tuple(classes)) for iri, name, classes in d["subjects"])
+        objects = tuple((prop, tuple((iri, name, tuple(classes)) for iri, name, classes in objects))
+                        for prop, objects in d["objects"])
+        return Criticality_Phenomenon_Record(d["cp"], d["cp_cls"], d["predicate"], time, subjects, objects,
+                                             frozenset(d["scenes"]))
+
+
+def cache_most_specific_classes(cps: list):
+    """
+    Determines the most specific classes of all subjects and objects of the given criticality phenomena at once and
+    caches them per world, such that formatting the phenomena (e.g. by list_cps()) does not compute them per line.
+    :param cps: A list of criticality phenomena.
+    """
+    individuals = [x for cp in cps if isinstance(cp, Criticality_Phenomenon) for x in cp.subjects]
+    individuals += [x for cp in cps if isinstance(cp, Criticality_Phenomenon) for _, objects in _get_objects(cp)
+                    for x in objects]
+    get_most_specific_classes(individuals)
+
+
+def get_most_specific_classes(individuals: list) -> list:
+    """
+    Memoized version of pyauto.utils.get_most_specific_classes(). Individuals whose classes are not cached yet are
+    passed to it at once.
+    :param individuals: A list of individuals.
+    :return: A list of tuples of each given individual and the labels of its most specific classes.
+    """
+    missing = dict()
+    for individual in individuals:
+        world = individual.namespace.world
+        if world not in _CACHED_MOST_SPECIFIC_CLASSES:
+            _CACHED_MOST_SPECIFIC_CLASSES[world] = dict()
+        if individual.storid not in _CACHED_MOST_SPECIFIC_CLASSES[world]:
+            missing[individual.storid, world] = individual
+    if len(missing) > 0:
+        for individual, classes in utils.get_most_specific_classes(list(missing.values())):
+            _CACHED_MOST_SPECIFIC_CLASSES[individual.namespace.world][individual.storid] = tuple(classes)
+    return [(x, _CACHED_MOST_SPECIFIC_CLASSES[x.namespace.world].get(x.storid, ())) for x in individuals]
+
+
+def _get_objects(cp) -> list:
+    return cp.objects.items() if isinstance(cp.objects, dict) else [("objects", cp.objects)]
+
+
+def _format_individuals(individuals: tuple) -> str:
+    return ", ".join(name + " (" + ", ".join(classes) + ")" for _, name, classes in individuals)
+
+
+def to_records(cps: list) -> list:
+    """
+    Resolves the given criticality phenomena into compact records that do not reference the world anymore. The most
+    specific classes of all subjects and objects are determined at once.
+    :param cps: A list of criticality phenomena (as returned by phenomena_scenario()).
+    :return: A list of Criticality_Phenomenon_Record, in the order of the given phenomena.
+    """
+    cache_most_specific_classes(cps)
+    scenes = dict()
+
+    def resolve(individual):
+        if individual not in scenes:
+            scenes[individual] = frozenset(x.iri for x in getattr(individual, "in_traffic_model", []))
+        return individual.iri, str(individual), get_most_specific_classes([individual])[0][1]
+    records = []
+    for cp in cps:
+        subjects = tuple(resolve(x) for x in cp.subjects)
+        objects = tuple((prop, tuple(resolve(x) for x in objects)) for prop, objects in _get_objects(cp))
+        members = list(cp.subjects) + [x for _, objects in _get_objects(cp) for x in objects]
+        cp_scenes = frozenset.intersection(*[scenes[x] for x in members]) if len(members) > 0 else frozenset()
+        records.append(Criticality_Phenomenon_Record(cp.cp.iri, cp.cp_cls.iri, cp.predicate, cp.time, subjects,
+                                                     objects, cp_scenes))
+    return records
+
+
 def phenomena_scenario(scenario: list or owlready2.World) -> list:
     """
     scenario: Either a list of worlds, each world representing a single scene or a single world representing a whole
@@ -188,8 +467,6 @@ def phenomena_scenario(scenario: list or owlready2.World) -> list:
 
     elif type(scenario) == owlready2.World:
         tm = auto.get_ontology(auto.Ontology.Traffic_Model, scenario)
-        ac = auto.get_ontology(auto.Ontology.Act, scenario)
-        ti = auto.get_ontology(auto.Ontology.Time, scenario)
         cp_ont = auto.get_ontology(auto.Ontology.Criticality_Phenomena, scenario)
         scenarios = list(scenario.search(type=tm.Scenario))
         if len(scenarios) > 0:
@@ -197,28 +474,34 @@ def phenomena_scenario(scenario: list or owlready2.World) -> list:
                 search_space = tqdm.tqdm(list(scenario.search(type=cp_ont.Criticality_Phenomenon)))
             else:
                 search_space = scenario.search(type=cp_ont.Criticality_Phenomenon)
+            cp_classes = {x for x in scenario.classes() if x.namespace.base_iri == cp_ont.base_iri}
+            types = _get_types(scenario)
+            relations = _Prefetched_Relations(scenario)
+            most_specific_cp_classes = dict()
             for cp in search_space:
-                cp_clss = list(filter(lambda x: x in scenario.classes(),
-                                      [y for y in cp.INDIRECT_is_a if hasattr(y, "namespace") and y.namespace.base_iri
-                                       == "http://purl.org/auto/criticality_phenomena#"]))
-                most_specific_cp_clss = [cp_cls for cp_cls in cp_clss if hasattr(cp_cls, "__subclasses__") and
-                                         len(set(cp_cls.__subclasses__()).intersection(set(cp_clss))) == 0]
-                for cp_cls in most_specific_cp_clss:
+                cp_types = frozenset(types[cp.storid])
+                if cp_types not in most_specific_cp_classes:
+                    most_specific_cp_classes[cp_types] = _get_most_specific_cp_classes(scenario, cp_types, cp_classes)
+                for cp_cls in most_specific_cp_classes[cp_types]:
                     objects = [None]
-                    if len(cp_cls.object_extraction_code) > 0:
+                    object_code = _get_extraction_code(cp_cls)[1]
+                    if object_code is not None:
                         try:
                             local_dict = {"subject": cp, "subjects": []}
-                            exec(cp_cls.object_extraction_code[0], globals(), local_dict)
+                            _exec(object_code, local_dict)
                             objects = local_dict["objects"] or []
                         except Exception as e:
                             logger.error("Invalid object extraction code in OWL during CP extraction of: " + str(cp) +
                                          " (" + str(cp_cls) + "): " + str(e))
+                    traffic_models = relations.get(cp, "in_traffic_model")
                     for object_dict in objects:
-                        if set(cp.INDIRECT_is_a).intersection({ac.Activity, ti.Interval}):
-                            scenario_cp_obj = Scenario_Criticality_Phenomenon(scenarios[0], cp, cp_cls, object_dict)
+                        if cp.storid in relations.temporal:
+                            scenario_cp_obj = Scenario_Criticality_Phenomenon(scenarios[0], cp, cp_cls, object_dict,
+                                                                              relations)
                             cps.append(scenario_cp_obj)
-                        elif len(cp.in_traffic_model) > 0 and tm.Scene in cp.in_traffic_model[0].INDIRECT_is_a:
-                            scene_cp_obj = Scene_Criticality_Phenomenon(cp.in_traffic_model, cp, cp_cls, object_dict)
+                        elif len(traffic_models) > 0 and traffic_models[0] in relations.scenes:
+                            scene_cp_obj = Scene_Criticality_Phenomenon(relations.get_entities(cp, "in_traffic_model"),
+                                                                        cp, cp_cls, object_dict, relations)
                             cps.append(scene_cp_obj)
                         else:
                             raise ValueError("CP with no scene or scenario found: " + str(cp))
@@ -232,6 +515,37 @@ def phenomena_scenario(scenario: list or owlready2.World) -> list:
     return cps
 
 
+def _get_types(world: owlready2.World) -> dict:
+    """
+    Fetches the asserted and inferred types of all individuals of the world at once from the quadstore.
+    :param world: The world to fetch the types in.
+    :return: A dict from the storids of the individuals to the set of the storids of their types.
+    """
+    types = defaultdict(set)
+    for s, o in world.graph.execute("SELECT s, o FROM objs WHERE p=? AND o>0", (rdf_type,)):
+        types[s].add(o)
+    return types
+
+
+def _get_most_specific_cp_classes(world: owlready2.World, types: frozenset, cp_classes: set) -> list:
+    """
+    Determines the most specific CP classes among the ancestors of the given types, i.e. those CP classes that have no
+    subclass which is also among the ancestors.
+    :param world: The world containing the types.
+    :param types: The storids of the types of an individual.
+    :param cp_classes: All CP classes of the world.
+    :return: A list of the most specific CP classes, sorted by their name.
+    """
+    ancestors = set()
+    for storid in types:
+        cls = world._get_by_storid(storid)
+        if isinstance(cls, owlready2.ThingClass):
+            ancestors |= cls.ancestors()
+    cp_clss = ancestors.intersection(cp_classes)
+    return sorted([cp_cls for cp_cls in cp_clss if len(set(cp_cls.__subclasses__()).intersection(cp_clss)) == 0],
+                  key=str)
+
+
 def list_cps(cps: list, output_format="natural", world=None, print_non_visualizable_info=False) -> str:
     """
     Lists the given criticality phenomena in a given output format. If a world is given, checks if the phenomena are
@@ -245,33 +559,71 @@ def list_cps(cps: list, output_format="natural", world=None, print_non_visualiza
     :param print_non_visualizable_info: Whether to check if CPs
     :return: A string with each line representing a criticality phenomenon
     """
-    output = ""
-    scene_cps = []
-    if print_non_visualizable_info and world:
-        tm = auto.get_ontology(auto.Ontology.Traffic_Model, world)
-        scenes = list(filter(lambda x: tm.Scene in x.is_a, world.search(type=tm.Scenario)[0].has_traffic_model))
-        for scene in scenes:
-            scene_cps += [cp for cp in cps if cp.is_representable_in_scene(scene)]
+    output = io.StringIO()
+    write_cps(output, cps, output_format, world, print_non_visualizable_info)
+    return output.getvalue()[:-1]
+
+
+def write_cps(file, cps: list, output_format="natural", world=None, print_non_visualizable_info=False):
+    """
+    Writes the given criticality phenomena line by line to the given file, in the same format as list_cps() (but
+    terminated by a newline).
+    :param file: The file (or any object with a write() method) to write to.
+    :param cps: A list of criticality phenomena
+    :param output_format: "natural" or ("csv" or "csv-file" (no difference))
+    :param world: The world with the traffic model of the CP list
+    :param print_non_visualizable_info: Whether to check if CPs are visualizable in some scene of the world
+    """
+    check_scenes = print_non_visualizable_info and world
+    cache_most_specific_classes(cps)
+    if check_scenes:
+        scene_cps = _get_representable_cps(cps, world)
     if output_format == "natural":
-        output += "Result:\n"
+        file.write("Result:\n")
     elif output_format == "csv" or output_format == "csv-file":
         csv_header = "Start Time;End Time;Criticality Phenomenon;Subject(s);Object(s)"
-        if print_non_visualizable_info and world:
+        if check_scenes:
             csv_header += ";Visualizable In Scene"
-        output += csv_header + "\n"
+        file.write(csv_header + "\n")
     if len(cps) > 0:
         for cp in cps:
             if output_format == "natural":
                 visualizable = ""
-                if print_non_visualizable_info and world:
-                    if cp not in scene_cps:
-                        visualizable = "[Non visualizable] "
-                output += visualizable + str(cp) + "\n"
+                if check_scenes and cp not in scene_cps:
+                    visualizable = "[Non visualizable] "
+                file.write(visualizable + str(cp) + "\n")
             elif output_format == "csv" or output_format == "csv-file":
                 visualizable = ""
-                if print_non_visualizable_info and world:
+                if check_scenes:
                     visualizable = ";" + str(cp in scene_cps)
-                output += cp.to_csv() + visualizable + "\n"
+                file.write(cp.to_csv() + visualizable + "\n")
     elif output_format == "natural":
-        output += "No criticality phenomenon found.\n"
-    return output[:-1]
+        file.write("No criticality phenomenon found.\n")
+
+
+def _get_representable_cps(cps: list, world: owlready2.World) -> set:
+    """
+    Determines the criticality phenomena that are representable in some scene of the scenario of the given world, i.e.
+    whose subjects and objects are all within one of its scenes. The scenes of all individuals are fetched at once.
+    :param cps: A list of criticality phenomena or records.
+    :param world: The world with the traffic model of the phenomena.
+    :return: The set of representable phenomena.
+    """
+    tm = auto.get_ontology(auto.Ontology.Traffic_Model, world)
+    scenes = [x for x in world.search(type=tm.Scenario)[0].has_traffic_model if tm.Scene in x.is_a]
+    scene_iris = {x.iri for x in scenes}
+    scene_storids = {x.storid for x in scenes}
+    index = defaultdict(set)
+    for s, o in world.graph.execute("SELECT s, o FROM objs WHERE p=? UNION SELECT o, s FROM objs WHERE p=?",
+                                    (tm.in_traffic_model.storid, tm.has_traffic_entity.storid)):
+        index[s].add(o)
+    representable = set()
+    for cp in cps:
+        if isinstance(cp, Criticality_Phenomenon_Record):
+            if len(cp.subjects) > 0 and len(cp.scenes.intersection(scene_iris)) > 0:
+                representable.add(cp)
+        elif len(cp.subjects) > 0:
+            members = cp.subjects + [y for x in cp.objects.values() for y in x]
+            if len(scene_storids.intersection(*[index[x.storid] for x in members])) > 0:
+                representable.add(cp)
+    return representable
@@ -0,0 +1,199 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from collections import defaultdict
+from functools import lru_cache
+import owlready2
+from owlready2.base import rdf_type, owl_named_individual
+
+from . import pellet
+
+logger = logging.getLogger(__name__)
+
+# Bump this whenever the canonical form or the format of the stored results changes, such that old entries are ignored.
+_CACHE_VERSION = "1"
+# Prefix of canonical individual labels - can not be confused with IRIs in the stored results.
+_LABEL_PREFIX = "#"
+
+
+class Reasoning_Cache:
+    """
+    A content-addressed on-disk cache for the results of Pellet. The key of an entry is a canonical hash of the triples
+    sent to Pellet, which is invariant under the naming of the individuals in the A-Box. Therefore, structurally
+    identical scenes (e.g. with parked traffic or at low speeds) as well as scenes that were already reasoned on in a
+    previous run are only reasoned on once. The cache is bound in size, least recently used entries are evicted first.
+    """
+
+    def __init__(self, folder: str, max_size=1024):
+        """
+        :param folder: The folder to store the cache entries in. Is created if not existing.
+        :param max_size: The maximum size of the cache (in MB).
+        """
+        self.folder = folder
+        self.max_size = max_size << 20
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(folder, exist_ok=True)
+
+    def key(self, world: owlready2.World, triples, infer_property_values=False) -> tuple:
+        """
+        Computes the canonical key of the given triples. Individuals are labeled by color refinement (Weisfeiler-Lehman)
+        on the A-Box graph, starting from their classes and data values. If this does not lead to unique labels (e.g.
+        due to symmetries), the IRIs of the individuals are used as labels instead, i.e. the key then depends on naming.
+        :param world: The world that the triples stem from.
+        :param triples: An iterable of (subject, predicate, object, datatype) tuples, as from pellet.iter_triples().
+        :param infer_property_values: Whether object property values will be inferred by Pellet.
+        :return: A tuple of the key and a dict mapping the individuals' storids to their labels.
+        """
+        unabbreviate = lru_cache(None)(world._unabbreviate)
+        individuals = {s for (s,) in world.graph.execute("SELECT s FROM objs WHERE p=? AND o=?",
+                                                          (rdf_type, owl_named_individual))}
+        # Triples without individuals (mostly the T-Box) are hashed order-independent, all others are kept for labeling
+        static_hash = 0
+        features = defaultdict(list)
+        links = []
+        for s, p, o, d in triples:
+            s_ind = s in individuals
+            o_ind = d is None and o in individuals
+            if s_ind and o_ind:
+                links.append((s, unabbreviate(p), o))
+            elif s_ind:
+                features[s].append("> " + pellet.format_ntriple(s, p, o, d, unabbreviate).split(" ", 1)[1])
+            elif o_ind:
+                features[o].append("< " + pellet.format_ntriple(s, p, o, d, unabbreviate).rsplit(" ", 2)[0])
+            else:
+                static_hash += int(_hash(pellet.format_ntriple(s, p, o, d, unabbreviate)), 16)
+        individuals = individuals.intersection(features.keys()).union({x for s, _, o in links for x in (s, o)})
+        # Color refinement until the number of colors is stable
+        colors = {x: _hash("\n".join(sorted(features[x]))) for x in individuals}
+        neighbors = defaultdict(list)
+        for s, p, o in links:
+            neighbors[s].append((">", p, o))
+            neighbors[o].append(("<", p, s))
+        nb_colors = len(set(colors.values()))
+        while nb_colors < len(individuals):
+            colors = {x: _hash(colors[x] + "\n" + "\n".join(sorted(d + p + colors[y] for d, p, y in neighbors[x])))
+                      for x in individuals}
+            if len(set(colors.values())) == nb_colors:
+                break
+            nb_colors = len(set(colors.values()))
+        if nb_colors == len(individuals):
+            labels = {x: _LABEL_PREFIX + c for x, c in colors.items()}
+        else:
+            logger.debug("Color refinement did not lead to unique labels, using IRIs for cache key")
+            labels = {x: unabbreviate(x) for x in individuals}
+        # Canonical serialization of all triples containing individuals under the labeling
+        lines = [labels[x] + " " + f for x in individuals for f in features[x]]
+        lines += [labels[s] + " " + p + " " + labels[o] for s, p, o in links]
+        lines.sort()
+        header = [_CACHE_VERSION, pellet._PELLET_LOADER, str(infer_property_values), "%064x" % (static_hash % 2**256)]
+        key = hashlib.sha256("\n".join(header + lines).encode("utf8")).hexdigest()
+        return key, labels
+
+    def get(self, world: owlready2.World, key: str, labels: dict):
+        """
+        Looks up the results of Pellet for the given key and translates them to the given world.
+        :param world: The world to translate the results to.
+        :param key: The key as returned by key().
+        :param labels: The labels as returned by key().
+        :return: The results (as returned by pellet._parse_output()) or None if there is no (applicable) entry for the
+        key.
+        """
+        file = self._get_file(key)
+        try:
+            with gzip.open(file, "rt", encoding="utf8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        properties = [world[p] for _, p, _ in entry["relations"]]
+        if None in properties:
+            # The entry refers to a property that is not loaded in the world, i.e. it can not be applied (and is stale)
+            logger.debug("Reasoning cache entry " + key + " refers to unknown properties, removing it")
+            try:
+                os.remove(file)
+            except OSError:
+                pass  # Already removed, e.g. by a concurrent run
+            self.misses += 1
+            return None
+        os.utime(file)  # Marks the entry as recently used
+        self.hits += 1
+        storids = {label: x for x, label in labels.items()}
+
+        def to_storid(term):
+            if term in storids:
+                return storids[term]
+            return world._abbreviate(term)
+
+        new_parents = defaultdict(list)
+        new_equivs = defaultdict(list)
+        entity_2_type = {}
+        for entity, parents, entity_type in entry["parents"]:
+            storid = to_storid(entity)
+            new_parents[storid] = [to_storid(x) for x in parents]
+            entity_2_type[storid] = entity_type
+        for entity, equivs in entry["equivs"]:
+            new_equivs[to_storid(entity)] = [to_storid(x) for x in equivs]
+        for entity, entity_type in entry["types"]:
+            entity_2_type[to_storid(entity)] = entity_type
+        relations = [(to_storid(a), prop, to_storid(b)) for (a, _, b), prop in zip(entry["relations"], properties)]
+        return new_parents, new_equivs, entity_2_type, relations
+
+    def put(self, world: owlready2.World, key: str, labels: dict, results: tuple):
+        """
+        Stores the results of Pellet for the given key in canonical form and evicts the least recently used entries if
+        the cache exceeds its maximum size.
+        :param world: The world that the results stem from.
+        :param key: The key as returned by key().
+        :param labels: The labels as returned by key().
+        :param results: The results as returned by pellet._parse_output().
+        """
+        new_parents, new_equivs, entity_2_type, relations = results
+
+        def to_term(storid):
+            if storid in labels:
+                return labels[storid]
+            return world._unabbreviate(storid)
+
+        entry = {
+            "parents": [[to_term(x), [to_term(y) for y in ys], entity_2_type.get(x)] for x, ys in new_parents.items()],
+            "equivs": [[to_term(x), [to_term(y) for y in ys]] for x, ys in new_equivs.items()],
+            "types": [[to_term(x), t] for x, t in entity_2_type.items() if x not in new_parents],
+            "relations": [[to_term(a), p.iri, to_term(b)] for a, p, b in relations]
+        }
+        # Writes atomically, so that concurrent runs never read partial entries
+        fd, tmp = tempfile.mkstemp(dir=self.folder, suffix=".tmp")
+        with gzip.open(os.fdopen(fd, "wb"), "wt", encoding="utf8") as f:
+            json.dump(entry, f)
+        os.replace(tmp, self._get_file(key))
+        self._evict()
+
+    def _get_file(self, key: str) -> str:
+        return os.path.join(self.folder, key + ".json.gz")
+
+    def _evict(self):
+        """
+        Removes the least recently used entries until the cache does not exceed its maximum size anymore.
+        """
+        entries = []
+        for entry in os.scandir(self.folder):
+            if entry.name.endswith(".json.gz"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        size = sum(x[1] for x in entries)
+        for _, entry_size, path in sorted(entries):
+            if size <= self.max_size:
+                break
+            try:
+                os.remove(path)
+                size -= entry_size
+                logger.debug("Evicted reasoning cache entry " + path)
+            except OSError:
+                pass
+
+
+def _hash(s: str) -> str:
+    return hashlib.blake2b(s.encode("utf8"), digest_size=16).hexdigest()
@@ -0,0 +1,135 @@
+import datetime
+import json
+import logging
+import sqlite3
+
+from .phenomena_extraction import Criticality_Phenomenon_Record
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (id INTEGER PRIMARY KEY, started TEXT, command TEXT);
+CREATE TABLE IF NOT EXISTS scenarios (id INTEGER PRIMARY KEY, run INTEGER REFERENCES runs(id), number INTEGER,
+                                      name TEXT, source TEXT, output TEXT);
+CREATE TABLE IF NOT EXISTS cps (id INTEGER PRIMARY KEY, scenario INTEGER REFERENCES scenarios(id), cp TEXT,
+                                cp_cls TEXT, cp_name TEXT, predicate TEXT, start REAL, end REAL, record TEXT);
+CREATE TABLE IF NOT EXISTS actors (cp INTEGER REFERENCES cps(id), role TEXT, iri TEXT, name TEXT, cls TEXT);
+CREATE INDEX IF NOT EXISTS cps_cp_cls ON cps(cp_cls);
+CREATE INDEX IF NOT EXISTS cps_cp_name ON cps(cp_name);
+CREATE INDEX IF NOT EXISTS cps_time ON cps(start, end);
+CREATE INDEX IF NOT EXISTS cps_scenario ON cps(scenario);
+CREATE INDEX IF NOT EXISTS actors_cls ON actors(cls, cp);
+CREATE INDEX IF NOT EXISTS actors_name ON actors(name, cp);
+CREATE INDEX IF NOT EXISTS actors_cp ON actors(cp);
+"""
+
+
+class Results_Database:
+    """
+    A local SQLite database of the criticality phenomena extracted from scenarios, across scenarios and runs. Each
+    phenomenon is stored with its time range, class, scenario and source file, and each of its subjects and objects as
+    an actor row with their most specific classes, such that phenomena can be queried by class, time and actor (see
+    query()) without re-loading the OWL files. As the records hold the most specific classes only, actors do not match
+    their superclasses (e.g. a pedestrian is not found as a Dynamical_Object). Scenarios are written incrementally, i.e.
+    each one is committed as soon as it is added.
+    """
+
+    def __init__(self, file: str, command: str = None):
+        """
+        :param file: The SQLite file to store the results in (created if it does not exist).
+        :param command: Optional. The command line of the run, if the database is written to (otherwise, no run is
+        created).
+        """
+        self.file = file
+        self._connection = sqlite3.connect(file)
+        self._connection.executescript(_SCHEMA)
+        self._run = None
+        if command is not None:
+            with self._connection:
+                self._run = self._connection.execute("INSERT INTO runs (started, command) VALUES (?, ?)",
+                                                     (datetime.datetime.now().isoformat(), command)).lastrowid
+
+    def add_scenario(self, cps: list, number: int = None, name: str = None, source: str = None, output: str = None):
+        """
+        Adds the criticality phenomena of a single scenario to the database and commits them.
+        :param cps: A list of criticality phenomenon records (see phenomena_extraction.to_records()).
+        :param number: Optional. The number of the scenario within its source.
+        :param name: Optional. The name (identifier) of the scenario.
+        :param source: Optional. The input file the scenario was read from.
+        :param output: Optional. The file the scenario was saved to (see scenario_file.save()).
+        """
+        with self._connection:
+            scenario = self._connection.execute("INSERT INTO scenarios (run, number, name, source, output) VALUES "
+                                                "(?, ?, ?, ?, ?)", (self._run, number, name, source, output)).lastrowid
+            for cp in cps:
+                if isinstance(cp.time, tuple):
+                    start, end = cp.time
+                else:
+                    start, end = cp.time, cp.time
+                cp_name = cp.cp_cls.replace("/", "#").split("#")[-1]
+                cp_id = self._connection.execute("INSERT INTO cps (scenario, cp, cp_cls, cp_name, predicate, start, "
+                                                 "end, record) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                                                 (scenario, cp.cp, cp.cp_cls, cp_name, cp.predicate, start, end,
+                                                  json.dumps(cp.to_dict()))).lastrowid
+                actors = [("subject", x) for x in cp.subjects]
+                actors += [(prop, x) for prop, objects in cp.objects for x in objects]
+                self._connection.executemany("INSERT INTO actors (cp, role, iri, name, cls) VALUES (?, ?, ?, ?, ?)",
+                                             [(cp_id, role, iri, name, cls) for role, (iri, name, classes) in actors
+                                              for cls in classes or [None]])
+        logger.debug("Stored " + str(len(cps)) + " criticality phenomena of scenario " + str(number) + " in " +
+                     self.file)
+
+    def query(self, cp_cls: str = None, actors: list = None, subject: str = None, obj: str = None, start: float = None,
+              end: float = None, scenario: str = None) -> list:
+        """
+        Queries the criticality phenomena in the database. All given filters have to hold.
+        :param cp_cls: Optional. The name of the class of the phenomena (e.g. CP_150), or its IRI.
+        :param actors: Optional. A list of class labels or names of actors (e.g. ["Pedestrian", "Truck"]), each of which
+        has to be matched by some subject or object of the phenomena. Class labels only match the most specific classes
+        of the actors, not their superclasses.
+        :param subject: Optional. A class label or name that has to be matched by some subject of the phenomena.
+        :param obj: Optional. A class label or name that has to be matched by some object of the phenomena.
+        :param start: Optional. The phenomena have to end at or after this time (in s).
+        :param end: Optional. The phenomena have to start at or before this time (in s).
+        :param scenario: Optional. The name or source file of the scenarios of the phenomena.
+        :return: A list of tuples of the scenario ID (unique in the database), the scenario name, the source file and
+        the criticality phenomenon record, sorted by scenario and time.
+        """
+        conditions = []
+        parameters = []
+        if cp_cls is not None:
+            conditions.append("(cps.cp_name = ? OR cps.cp_cls = ?)")
+            parameters += [cp_cls, cp_cls]
+        for actor, role in [(x, None) for x in actors or []] + [(subject, "subject"), (obj, "object")]:
+            if actor is not None:
+                condition = "EXISTS (SELECT 1 FROM actors WHERE actors.cp = cps.id AND (actors.cls = ? OR " \
+                            "actors.name = ?)"
+                if role == "subject":
+                    condition += " AND actors.role = 'subject'"
+                elif role == "object":
+                    condition += " AND actors.role != 'subject'"
+                conditions.append(condition + ")")
+                parameters += [actor, actor]
+        if start is not None:
+            conditions.append("cps.end >= ?")
+            parameters.append(start)
+        if end is not None:
+            conditions.append("cps.start <= ?")
+            parameters.append(end)
+        if scenario is not None:
+            conditions.append("(scenarios.name = ? OR scenarios.source = ?)")
+            parameters += [scenario, scenario]
+        sql = "SELECT scenarios.id, scenarios.name, scenarios.source, cps.record FROM cps JOIN scenarios ON " \
+              "cps.scenario = scenarios.id"
+        if len(conditions) > 0:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY scenarios.id, cps.start, cps.end, cps.id"
+        return [(scenario_id, name, source, Criticality_Phenomenon_Record.from_dict(json.loads(record)))
+                for scenario_id, name, source, record in self._connection.execute(sql, parameters)]
+
+    def close(self):
+        """
+        Closes the connection to the database.
+        """
+        self._connection.close()
+
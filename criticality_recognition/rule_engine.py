@@ -0,0 +1,401 @@
+import logging
+import math
+import operator
+import timeit
+from collections import defaultdict
+import owlready2
+from owlready2.base import rdf_type, owl_named_individual
+from owlready2.reasoning import _INFERRENCES_ONTOLOGY, _apply_reasoning_results, _apply_inferred_obj_relations, \
+    _apply_inferred_data_relations
+
+logger = logging.getLogger(__name__)
+
+# Supported SWRL comparison built-ins (all arguments need to be bound).
+_COMPARISONS = {
+    "equal": operator.eq,
+    "notEqual": operator.ne,
+    "lessThan": operator.lt,
+    "lessThanOrEqual": operator.le,
+    "greaterThan": operator.gt,
+    "greaterThanOrEqual": operator.ge
+}
+# Supported SWRL math built-ins (the first argument is the result, which may be unbound).
+_FUNCTIONS = {
+    "add": lambda *x: sum(x),
+    "subtract": operator.sub,
+    "multiply": lambda *x: math.prod(x),
+    "divide": operator.truediv,
+    "integerDivide": operator.floordiv,
+    "mod": operator.mod,
+    "pow": operator.pow,
+    "unaryPlus": operator.pos,
+    "unaryMinus": operator.neg,
+    "abs": abs,
+    "ceiling": math.ceil,
+    "floor": math.floor,
+    "round": round,
+    "sin": math.sin,
+    "cos": math.cos,
+    "tan": math.tan
+}
+
+
+class _Atom:
+    """
+    A SWRL atom compiled to quad store IDs. Arguments are tuples of (is_variable, variable name or constant).
+    """
+    __slots__ = ["kind", "predicate", "args"]
+
+    def __init__(self, kind: str, predicate, args: tuple):
+        self.kind = kind  # "class", "object", "data" or "builtin"
+        self.predicate = predicate  # Storid of the class or property, name of the built-in
+        self.args = args
+
+    def variables(self) -> set:
+        return {value for is_var, value in self.args if is_var}
+
+
+class _Rule:
+    """
+    A SWRL rule compiled to quad store IDs, including the evaluation orders of its body atoms.
+    """
+    def __init__(self, imp, body: list, head: list):
+        self.imp = imp
+        self.body = body
+        self.head = head
+        # For each body atom (or None for a full evaluation), the order in which the body atoms are joined
+        self.orders = {}
+        for start in [None] + [i for i, atom in enumerate(body) if atom.kind != "builtin"]:
+            self.orders[start] = _get_join_order(body, start)
+
+    def is_safe(self) -> bool:
+        head_vars = set().union(*[atom.variables() for atom in self.head])
+        body_vars = set().union(*[atom.variables() for atom in self.body])
+        return all(order is not None for order in self.orders.values()) and head_vars <= body_vars
+
+
+class _Facts:
+    """
+    Indexes on the facts relevant to the rules: class members, and object and data property values by subject and by
+    object.
+    """
+    def __init__(self):
+        self.members = defaultdict(set)
+        self.spo = defaultdict(lambda: defaultdict(set))
+        self.ops = defaultdict(lambda: defaultdict(set))
+
+    def add(self, kind: str, predicate: int, args: tuple) -> bool:
+        if kind == "class":
+            if args[0] in self.members[predicate]:
+                return False
+            self.members[predicate].add(args[0])
+        else:
+            if args[1] in self.spo[predicate][args[0]]:
+                return False
+            self.spo[predicate][args[0]].add(args[1])
+            self.ops[predicate][args[1]].add(args[0])
+        return True
+
+    def is_empty(self) -> bool:
+        return len(self.members) == 0 and len(self.spo) == 0
+
+
+def get_rules(world: owlready2.World) -> list:
+    """
+    Compiles all SWRL rules of the world that can be evaluated by the rule engine, i.e. Horn rules consisting of class,
+    object and data property atoms as well as numeric built-ins, where each built-in can be evaluated once its inputs
+    are bound. Rules containing other atoms (or built-ins in the head) are left to the DL reasoner.
+    :param world: The world to get the rules from.
+    :return: A list of compiled rules.
+    """
+    rules = []
+    for imp in world.rules():
+        body = [_compile_atom(atom) for atom in imp.body]
+        head = [_compile_atom(atom) for atom in imp.head]
+        if None in body or None in head or len(head) == 0 or any(atom.kind == "builtin" for atom in head):
+            logger.debug("Rule is not supported by rule engine: " + str(imp))
+            continue
+        rule = _Rule(imp, body, head)
+        if rule.is_safe():
+            rules.append(rule)
+        else:
+            logger.debug("Rule is not safe and therefore not supported by rule engine: " + str(imp))
+    logger.debug("Rule engine supports " + str(len(rules)) + " rules")
+    return rules
+
+
+def get_rule_storids(world: owlready2.World, rules: list) -> set:
+    """
+    Fetches the quad store IDs of the given rules and all blank nodes they consist of (atoms and argument lists). They
+    can be excluded from the input of the DL reasoner once the rules are evaluated by the rule engine.
+    :param world: The world containing the rules.
+    :param rules: The compiled rules as returned by get_rules().
+    :return: A set of quad store IDs.
+    """
+    storids = set()
+    queue = [rule.imp.storid for rule in rules]
+    while queue:
+        storid = queue.pop()
+        if storid in storids:
+            continue
+        storids.add(storid)
+        queue.extend(o for (o,) in world.graph.execute("SELECT o FROM objs WHERE s=? AND o<0", (storid,)))
+    return storids
+
+
+def get_facts(world: owlready2.World) -> set:
+    """
+    Creates a hashable representation of all facts about the individuals of the world up to entailment, i.e. their
+    classes including all ancestors (owlready2 keeps type triples that are inferred before a more specific type is
+    inferred, whereas Pellet only reports the most specific ones if it infers both at once), and their object and data
+    property values. Allows to compare the results of the rule engine against those of the DL reasoner.
+    :param world: The world to get the facts of.
+    :return: A set of (predicate, subject, object) tuples of IRIs, with data values by their representation and
+    "type" as predicate of class memberships.
+    """
+    facts = set()
+    ancestors = dict()
+    individuals = {s for (s,) in world.graph.execute("SELECT DISTINCT s FROM objs WHERE p=? AND o=?",
+                                                     (rdf_type, owl_named_individual))}
+    for s, p, o in world.graph.execute("SELECT s, p, o FROM objs"):
+        if s not in individuals:
+            continue
+        if p == rdf_type:
+            if o not in ancestors:
+                entity = world._get_by_storid(o)
+                if hasattr(entity, "ancestors"):
+                    ancestors[o] = {x.iri for x in entity.ancestors()}
+                else:
+                    ancestors[o] = {world._unabbreviate(o)}
+            facts.update(("type", world._unabbreviate(s), x) for x in ancestors[o])
+        elif o > 0:
+            facts.add((world._unabbreviate(p), world._unabbreviate(s), world._unabbreviate(o)))
+    for s, p, o, d in world.graph.execute("SELECT s, p, o, d FROM datas"):
+        if s in individuals:
+            facts.add((world._unabbreviate(p), world._unabbreviate(s), repr(world._to_python(o, d))))
+    return facts
+
+
+def materialize(world: owlready2.World, rules: list) -> int:
+    """
+    Evaluates the given rules on the world by semi-naive forward chaining until a fix point is reached and stores the
+    inferred facts in the inferences ontology of the world (as the DL reasoner would do). Class memberships regard the
+    class hierarchy, object property values regard sub-properties, inverse and symmetric properties.
+    :param world: The world to evaluate the rules on.
+    :param rules: The compiled rules as returned by get_rules().
+    :return: The number of new facts.
+    """
+    t1 = timeit.default_timer()
+    facts, contributions = _load_facts(world, rules)
+    delta = None
+    inferred = []
+    rounds = 0
+    while delta is None or not delta.is_empty():
+        rounds += 1
+        new_delta = _Facts()
+        for rule in rules:
+            if delta is None:
+                starts = [None]
+            else:
+                starts = [i for i, atom in enumerate(rule.body) if atom.kind != "builtin" and
+                          (atom.predicate in delta.members or atom.predicate in delta.spo)]
+            for start in starts:
+                for bindings in _solve(rule.orders[start], 0, {}, facts, delta, start is not None):
+                    for atom in rule.head:
+                        args = tuple(bindings[value] if is_var else value for is_var, value in atom.args)
+                        if not facts.add(atom.kind, atom.predicate, args):
+                            continue
+                        inferred.append((atom.kind, atom.predicate, args))
+                        for predicate, inverse in contributions[(atom.kind, atom.predicate)]:
+                            fact = (args[1], args[0]) if inverse else args
+                            facts.add(atom.kind, predicate, fact)
+                            new_delta.add(atom.kind, predicate, fact)
+        delta = new_delta
+    _store(world, inferred)
+    logger.debug("Rule engine inferred " + str(len(inferred)) + " facts in " + str(rounds) + " rounds. Took %.2f s" %
+                 (timeit.default_timer() - t1))
+    return len(inferred)
+
+
+def _compile_atom(atom):
+    """
+    Compiles an owlready2 SWRL atom.
+    :param atom: The atom to compile.
+    :return: The compiled atom or None if the atom is not supported.
+    """
+    args = tuple((True, x.name) if isinstance(x, owlready2.rule.Variable) else
+                 (False, x.storid if isinstance(x, owlready2.Thing) else x) for x in atom.arguments)
+    if isinstance(atom, owlready2.rule.ClassAtom) and isinstance(atom.class_predicate, owlready2.ThingClass):
+        return _Atom("class", atom.class_predicate.storid, args)
+    elif isinstance(atom, owlready2.rule.IndividualPropertyAtom) and atom.property_predicate is not None:
+        return _Atom("object", atom.property_predicate.storid, args)
+    elif isinstance(atom, owlready2.rule.DatavaluedPropertyAtom) and atom.property_predicate is not None:
+        return _Atom("data", atom.property_predicate.storid, args)
+    elif isinstance(atom, owlready2.rule.BuiltinAtom) and (atom.builtin in _COMPARISONS or
+                                                          atom.builtin in _FUNCTIONS):
+        return _Atom("builtin", atom.builtin, args)
+    return None
+
+
+def _get_join_order(body: list, start) -> list:
+    """
+    Greedily orders the body atoms for joining: Starts with the given atom, then always prefers built-ins that can be
+    evaluated, then the atom with the most bound arguments.
+    :param body: The compiled body atoms of a rule.
+    :param start: The index of the atom to start with or None.
+    :return: The ordered atoms or None if some built-in can never be evaluated.
+    """
+    remaining = list(body)
+    order = []
+    bound = set()
+    if start is not None:
+        order.append(remaining.pop(start))
+        bound |= order[0].variables()
+    while remaining:
+        best = None
+        for atom in remaining:
+            if atom.kind == "builtin":
+                inputs = {value for is_var, value in (atom.args if atom.predicate in _COMPARISONS else atom.args[1:])
+                          if is_var}
+                if inputs <= bound:
+                    best = atom
+                    break
+            elif best is None or len(atom.variables() & bound) > len(best.variables() & bound):
+                best = atom
+        if best is None:
+            return None
+        remaining.remove(best)
+        order.append(best)
+        bound |= best.variables()
+    return order
+
+
+def _solve(order: list, i: int, bindings: dict, facts: _Facts, delta: _Facts, use_delta: bool):
+    """
+    Recursively joins the ordered body atoms and yields all variable bindings satisfying them. The first atom is
+    matched against the delta facts only if use_delta is set (semi-naive evaluation).
+    """
+    if i == len(order):
+        yield bindings
+        return
+    atom = order[i]
+    source = delta if use_delta and i == 0 else facts
+    values = [bindings.get(value) if is_var else value for is_var, value in atom.args]
+    if atom.kind == "builtin":
+        result = _evaluate_builtin(atom.predicate, values)
+        if result is True:
+            yield from _solve(order, i + 1, bindings, facts, delta, use_delta)
+        elif result is not None and result is not False:
+            yield from _solve(order, i + 1, {**bindings, atom.args[0][1]: result}, facts, delta, use_delta)
+        return
+    if atom.kind == "class":
+        members = source.members.get(atom.predicate, ())
+        if values[0] is not None:
+            candidates = [(values[0],)] if values[0] in members else []
+        else:
+            candidates = [(x,) for x in members]
+    else:
+        s, o = values
+        spo = source.spo.get(atom.predicate, {})
+        if s is not None and o is not None:
+            candidates = [(s, o)] if o in spo.get(s, ()) else []
+        elif s is not None:
+            candidates = [(s, x) for x in spo.get(s, ())]
+        elif o is not None:
+            candidates = [(x, o) for x in source.ops.get(atom.predicate, {}).get(o, ())]
+        else:
+            candidates = [(x, y) for x, ys in spo.items() for y in ys]
+    for candidate in candidates:
+        new_bindings = bindings
+        for (is_var, name), value in zip(atom.args, candidate):
+            if is_var and name not in new_bindings:
+                new_bindings = {**new_bindings, name: value}
+            elif is_var and new_bindings[name] != value:
+                break  # The same variable occurs twice in this atom with different values
+        else:
+            yield from _solve(order, i + 1, new_bindings, facts, delta, use_delta)
+
+
+def _evaluate_builtin(builtin: str, values: list):
+    """
+    Evaluates a built-in on the given argument values.
+    :return: True or False for comparisons (and functions whose result is bound), the result of a function otherwise.
+    None if the built-in can not be evaluated on the given values (e.g. wrong types or division by zero).
+    """
+    try:
+        if builtin in _COMPARISONS:
+            return _COMPARISONS[builtin](*values)
+        result = _FUNCTIONS[builtin](*values[1:])
+        if values[0] is not None:
+            return values[0] == result
+        return result
+    except (TypeError, ValueError, ArithmeticError):
+        return None
+
+
+def _load_facts(world: owlready2.World, rules: list) -> tuple:
+    """
+    Loads all facts about the classes and properties used in the given rules from the quad store.
+    :return: A tuple of the facts and a dict mapping each class or property to the classes or properties of the rules
+    whose facts it contributes to (with a flag whether its arguments shall be swapped).
+    """
+    facts = _Facts()
+    contributions = defaultdict(list)
+    graph = world.graph
+    for kind, predicate in {(atom.kind, atom.predicate) for rule in rules for atom in rule.body + rule.head
+                            if atom.kind != "builtin"}:
+        entity = world._get_by_storid(predicate)
+        descendants = {x.storid for x in entity.descendants()}
+        for descendant in descendants:
+            contributions[(kind, descendant)].append((predicate, False))
+        if kind == "class":
+            for (s,) in graph.execute("SELECT s FROM objs WHERE p=? AND o IN (%s)" %
+                                      ",".join("?" for _ in descendants), (rdf_type, *descendants)):
+                facts.add(kind, predicate, (s,))
+        elif kind == "data":
+            for s, o, d in graph.execute("SELECT s, o, d FROM datas WHERE p IN (%s)" %
+                                         ",".join("?" for _ in descendants), tuple(descendants)):
+                facts.add(kind, predicate, (s, world._to_python(o, d)))
+        else:
+            inverses = set()
+            if entity.inverse_property:
+                inverses = {x.storid for x in entity.inverse_property.descendants()}
+            if owlready2.SymmetricProperty in entity.is_a:
+                inverses |= descendants
+            for inverse in inverses:
+                contributions[(kind, inverse)].append((predicate, True))
+            for s, o in graph.execute("SELECT s, o FROM objs WHERE p IN (%s)" % ",".join("?" for _ in descendants),
+                                      tuple(descendants)):
+                facts.add(kind, predicate, (s, o))
+            if inverses:
+                for s, o in graph.execute("SELECT s, o FROM objs WHERE p IN (%s)" % ",".join("?" for _ in inverses),
+                                          tuple(inverses)):
+                    facts.add(kind, predicate, (o, s))
+    return facts, contributions
+
+
+def _store(world: owlready2.World, inferred: list):
+    """
+    Stores the inferred facts in the inferences ontology of the world, using owlready2's functionality for applying
+    reasoning results.
+    :param world: The world to store the facts in.
+    :param inferred: A list of inferred facts as (kind, predicate, arguments) tuples.
+    """
+    ontology = world.get_ontology(_INFERRENCES_ONTOLOGY)
+    new_parents = defaultdict(list)
+    obj_relations = []
+    data_relations = []
+    for kind, predicate, args in inferred:
+        if kind == "class":
+            if args[0] not in new_parents:
+                # Parents are reset when applying, therefore we need all parents of the individual
+                new_parents[args[0]] = [x for (x,) in world.graph.execute(
+                    "SELECT o FROM objs WHERE s=? AND p=? AND o>0 AND o!=?", (args[0], rdf_type, owl_named_individual))]
+            new_parents[args[0]].append(predicate)
+        elif kind == "object":
+            obj_relations.append((args[0], world._get_by_storid(predicate), args[1]))
+        else:
+            data_relations.append((args[0], world._get_by_storid(predicate), *world._to_rdf(args[1])))
+    _apply_reasoning_results(world, ontology, False, new_parents, {}, {x: "individual" for x in new_parents})
+    _apply_inferred_obj_relations(world, ontology, False, obj_relations)
+    _apply_inferred_data_relations(world, ontology, False, data_relations)
@@ -0,0 +1,189 @@
+import logging
+import os
+import queue
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import urllib.request
+import weakref
+
+import owlready2
+
+from . import telemetry
+
+logger = logging.getLogger(__name__)
+
+# The supported formats of scenario files with their file extensions. "owl" and "ntriples" are written and parsed by
+# owlready2, "sqlite" is a copy of the quadstore of the world, which can be opened without any parsing.
+FORMATS = {"owl": ".owl", "ntriples": ".nt", "sqlite": ".sqlite3"}
+
+# The header of SQLite database files.
+_SQLITE_HEADER = b"SQLite format 3\x00"
+
+# The folder containing this package, from which the snapshots are serialized (see Scenario_Writer).
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def get_format(file: str) -> str:
+    """
+    :param file: The path of a scenario file.
+    :return: The format of the scenario file as given by its extension (see FORMATS), "owl" if the extension is unknown.
+    """
+    extension = os.path.splitext(file)[1].lower()
+    for file_format, format_extension in FORMATS.items():
+        if extension == format_extension or (file_format == "sqlite" and extension in [".sqlite", ".db"]):
+            return file_format
+    return "owl"
+
+
+def save(world: owlready2.World, file: str, file_format: str = None):
+    """
+    Saves the given world (e.g. a reasoned scenario) to the given file.
+    :param world: The world to save.
+    :param file: The file to save the world to (overwritten if it exists).
+    :param file_format: Optional. One of FORMATS. Default: The format given by the extension of the file.
+    """
+    if file_format is None:
+        file_format = get_format(file)
+    if file_format == "sqlite":
+        world.graph.commit()
+        if os.path.exists(file):
+            os.remove(file)
+        target = sqlite3.connect(file)
+        try:
+            world.graph.db.backup(target)
+        finally:
+            target.close()
+    elif file_format == "ntriples":
+        world.save(file, format="ntriples")
+    elif file_format == "owl":
+        world.save(file)
+    else:
+        raise ValueError("Unknown scenario file format " + str(file_format) + ", expected one of " +
+                         ", ".join(FORMATS.keys()))
+
+
+def load(file: str) -> owlready2.World:
+    """
+    Loads a scenario file as saved by save(). Quadstore copies (detected by their header) are opened without parsing,
+    OWL and N-Triples files are parsed into the default world. The scenario file itself is never modified: As owlready2
+    opens quadstores for writing, a quadstore is opened from a temporary copy, which is removed when the world is
+    garbage collected (at the latest on exit).
+    :param file: The scenario file to load.
+    :return: The world of the scenario.
+    """
+    with open(file, "rb") as f:
+        header = f.read(len(_SQLITE_HEADER))
+    if header == _SQLITE_HEADER:
+        logger.debug("Opening quadstore " + str(file))
+        copy_handle, copy = tempfile.mkstemp(prefix="scenario_", suffix=".sqlite3")
+        os.close(copy_handle)
+        source = sqlite3.connect("file:" + urllib.request.pathname2url(os.path.abspath(file)) + "?mode=ro", uri=True)
+        target = sqlite3.connect(copy)
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+            source.close()
+        world = owlready2.World(filename=copy)
+        weakref.finalize(world, _discard_copy, world.graph.db, copy)
+        return world
+    return owlready2.get_ontology("file://" + os.path.abspath(file)).load().world
+
+
+def _discard_copy(connection: sqlite3.Connection, file: str):
+    connection.close()
+    os.remove(file)
+
+
+class Scenario_Writer:
+    """
+    Saves scenarios in the background, such that the next scenario can be reasoned on while the previous one is
+    serialized. Each scenario is first copied into a snapshot (a quadstore file next to the output file),
+    which is fast and stable against later changes or closing of the world. A background thread then serializes the
+    snapshot in a separate Python process, as owlready2 is not thread-safe and serializing in the same process would
+    compete with reasoning for the interpreter lock.
+    Quadstore copies are final after the snapshot and not queued at all. At most max_pending snapshots are queued, i.e.
+    adding a scenario blocks while the queue is full, which bounds the memory and disk space in use. If saving a
+    scenario fails, the remaining scenarios are still saved, and all errors are raised together by the next call of
+    save() or close().
+    """
+
+    def __init__(self, max_pending=1):
+        """
+        :param max_pending: The maximum number of scenarios waiting to be serialized.
+        """
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._errors = []
+        self._thread = threading.Thread(target=self._run, name="scenario writer", daemon=True)
+        self._thread.start()
+
+    def save(self, world: owlready2.World, file: str, file_format: str = None):
+        """
+        Snapshots the given world and queues it to be saved to the given file (see the function save()).
+        :param world: The world to save. It can be changed or closed as soon as this method returns.
+        :param file: The file to save the world to (overwritten if it exists).
+        :param file_format: Optional. One of FORMATS. Default: The format given by the extension of the file.
+        """
+        self._raise_error()
+        if file_format is None:
+            file_format = get_format(file)
+        if file_format not in FORMATS:
+            raise ValueError("Unknown scenario file format " + str(file_format) + ", expected one of " +
+                             ", ".join(FORMATS.keys()))
+        if file_format == "sqlite":
+            save(world, file, file_format)
+            logger.info("Saved scenario to file://" + os.path.abspath(file))
+            return
+        snapshot_handle, snapshot = tempfile.mkstemp(suffix=".sqlite3", dir=os.path.dirname(os.path.abspath(file)))
+        os.close(snapshot_handle)
+        save(world, snapshot, "sqlite")
+        self._queue.put((snapshot, file, file_format))
+
+    def close(self):
+        """
+        Waits until all queued scenarios are saved and stops the background thread (if not stopped yet).
+        """
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        self._raise_error()
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                break
+            snapshot, file, file_format = job
+            try:
+                with telemetry.span("save", file=file, format=file_format):
+                    result = subprocess.run([sys.executable, "-m", __name__, snapshot, os.path.abspath(file),
+                                             file_format], cwd=_ROOT, stdout=subprocess.DEVNULL,
+                                            stderr=subprocess.PIPE)
+                if result.returncode != 0:
+                    lines = result.stderr.decode(errors="replace").strip().splitlines()
+                    raise RuntimeError(lines[-1] if lines else "Exit code " + str(result.returncode))
+                logger.info("Saved scenario to file://" + os.path.abspath(file))
+            except Exception as e:
+                # The remaining scenarios are still saved, the errors are raised by the next call of save() or close()
+                logger.error("Saving scenario to " + str(file) + " failed: " + str(e))
+                self._errors.append((file, e))
+            finally:
+                os.remove(snapshot)
+
+    def _raise_error(self):
+        if len(self._errors) > 0:
+            errors, self._errors = self._errors, []
+            raise RuntimeError("Saving " + str(len(errors)) + " scenario(s) failed: " +
+                               "; ".join(str(file) + ": " + str(e) for file, e in errors)) from errors[0][1]
+
+
+if __name__ == "__main__":
+    # Serializes a snapshot of the Scenario_Writer: python -m criticality_recognition.scenario_file SNAPSHOT FILE FORMAT
+    snapshot_world = owlready2.World(filename=sys.argv[1])
+    try:
+        save(snapshot_world, sys.argv[2], sys.argv[3])
+    finally:
+        snapshot_world.close()
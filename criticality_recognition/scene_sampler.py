@@ -0,0 +1,235 @@
+import logging
+import math
+
+import owlready2
+from shapely import wkt
+
+from auto_extensions.utils import convert_local_to_global_vector
+from pyauto import auto
+
+logger = logging.getLogger(__name__)
+
+# Default thresholds on the change of the actor kinematics since the last kept scene.
+SPEED_THRESHOLD = 1.0  # m/s
+YAW_THRESHOLD = 10  # degrees
+DISTANCE_THRESHOLD = 2.0  # m, change of the distance between two actors
+# Only the distances between actors that are closer than this (in the last kept or the current scene) are regarded.
+_INTERACTION_RADIUS = 50  # m
+# Default thresholds for near-misses among the actors flagged by is_near or has_intersecting_path.
+NEAR_MISS_DISTANCE = 2.0  # m, the distance between the geometries of the actors
+NEAR_MISS_TTC = 1.5  # s, the time to collision of the actors at constant velocities
+
+
+def sample(scenario: list, min_gap=0.0, max_gap=2.0, speed_threshold=SPEED_THRESHOLD, yaw_threshold=YAW_THRESHOLD,
+           distance_threshold=DISTANCE_THRESHOLD) -> list:
+    """
+    Adaptively samples the scenes of the given scenario. A scene is kept only if the kinematics of some actor (i.e. an
+    individual with an identifier, a geometry and a yaw) changed beyond the given thresholds since the last kept scene,
+    or a new actor appeared. The first and last scenes are always kept. Regardless of the kinematics, scenes are dropped
+    if they follow the last kept scene within the minimum time gap and are kept if dropping them would exceed the
+    maximum time gap. Dropped scene worlds are closed.
+    :param scenario: A list of worlds, each world representing a single scene, sorted by time (e.g. as converted with
+    a high sampling rate).
+    :param min_gap: The minimum time between two kept scenes (in s).
+    :param max_gap: The maximum time between two kept scenes (in s).
+    :param speed_threshold: The change of the speed of an actor (in m/s) to keep a scene for.
+    :param yaw_threshold: The change of the yaw of an actor (in degrees) to keep a scene for.
+    :param distance_threshold: The change of the distance between two nearby actors (in m) to keep a scene for.
+    :return: A list of the kept worlds.
+    """
+    if len(scenario) <= 2:
+        return scenario
+    times = [_get_scene_time(x) for x in scenario]
+    kept = [scenario[0]]
+    last_time, last_actors = times[0], _get_actors(scenario[0])
+    for i, scene_world in enumerate(scenario[1:], start=1):
+        time = times[i]
+        actors = None
+        if i == len(scenario) - 1:
+            reason = "last scene"
+        elif time - last_time < min_gap:
+            reason = None
+        elif times[i + 1] - last_time > max_gap:
+            reason = "maximum gap"
+        else:
+            actors = _get_actors(scene_world)
+            reason = _get_change(last_actors, actors, speed_threshold, yaw_threshold, distance_threshold)
+        if reason is not None:
+            logger.debug("Keeping scene at " + str(time) + " s (" + reason + ")")
+            kept.append(scene_world)
+            last_time, last_actors = time, actors if actors is not None else _get_actors(scene_world)
+        else:
+            scene_world.close()
+    logger.info("Adaptive sampling kept " + str(len(kept)) + "/" + str(len(scenario)) + " scenes")
+    return kept
+
+
+def split(scenario: list, hertz: float) -> tuple:
+    """
+    Splits the scenes of the given scenario (e.g. as converted with a fine sampling rate) into the scenes of a coarser
+    sampling rate and the remaining scenes.
+    :param scenario: A list of worlds, each world representing a single scene, sorted by time.
+    :param hertz: The coarse sampling rate.
+    :return: A tuple of a list of the worlds sampled at the coarse rate (including the first and last scene) and a list
+    of the remaining worlds.
+    """
+    coarse = []
+    remaining = []
+    last_time = None
+    for i, scene_world in enumerate(scenario):
+        time = _get_scene_time(scene_world)
+        if last_time is None or i == len(scenario) - 1 or time - last_time >= 1 / hertz - 1e-6:
+            coarse.append(scene_world)
+            last_time = time
+        else:
+            remaining.append(scene_world)
+    logger.debug("Split " + str(len(scenario)) + " scenes into " + str(len(coarse)) + " scenes at " + str(hertz) +
+                 " Hz and " + str(len(remaining)) + " remaining scenes")
+    return coarse, remaining
+
+
+def get_refinement_windows(world: owlready2.World, cps: list, padding: float, distance_threshold=NEAR_MISS_DISTANCE,
+                           ttc_threshold=NEAR_MISS_TTC) -> list:
+    """
+    Determines the time windows of a reasoned scenario that are worth refining, i.e. those around the criticality
+    phenomena found and around near-misses. Near-misses are pairs of actors flagged by the cheap augmentations is_near
+    or has_intersecting_path that are closer than the distance threshold or would collide within the time to collision
+    threshold (regarding the distance of their geometries and their velocities along the line between them).
+    :param world: The world containing the reasoned scenario.
+    :param cps: The criticality phenomena of the scenario (as extracted by phenomena_extraction).
+    :param padding: The time to extend each window by on both sides (in s), e.g. the time between two coarse scenes.
+    :param distance_threshold: The distance (in m) below which flagged actors are a near-miss.
+    :param ttc_threshold: The time to collision (in s) below which flagged actors are a near-miss.
+    :return: A sorted list of disjoint time windows as tuples of their start and end time (in s).
+    """
+    ph = auto.get_ontology(auto.Ontology.Physics, world)
+    intervals = []
+    for cp in cps:
+        if isinstance(cp.time, tuple):
+            intervals.append(cp.time)
+        else:
+            intervals.append((cp.time, cp.time))
+    near_misses = 0
+    for prop in [ph.is_near, ph.has_intersecting_path]:
+        for subject, other in prop.get_relations():
+            scenes = getattr(subject, "in_traffic_model", [])
+            if len(scenes) > 0 and len(scenes[0].inTimePosition) > 0 and \
+                    _is_near_miss(subject, other, distance_threshold, ttc_threshold):
+                time = scenes[0].inTimePosition[0].numericPosition[0]
+                intervals.append((time, time))
+                near_misses += 1
+    logger.debug("Found " + str(len(cps)) + " criticality phenomena and " + str(near_misses) + " near-misses")
+    windows = []
+    for start, end in sorted(intervals):
+        if len(windows) > 0 and start - padding <= windows[-1][1]:
+            windows[-1] = (windows[-1][0], max(windows[-1][1], end + padding))
+        else:
+            windows.append((start - padding, end + padding))
+    logger.debug("Refinement windows: " + ", ".join("[%.2f, %.2f]" % x for x in windows))
+    return windows
+
+
+def select(scenario: list, windows: list) -> list:
+    """
+    Selects the scenes of the given scenario that lie within the given time windows. The other scene worlds are closed.
+    :param scenario: A list of worlds, each world representing a single scene.
+    :param windows: A list of time windows as tuples of their start and end time (in s).
+    :return: A list of the selected worlds.
+    """
+    selected = []
+    for scene_world in scenario:
+        time = _get_scene_time(scene_world)
+        if any(start <= time <= end for start, end in windows):
+            selected.append(scene_world)
+        else:
+            scene_world.close()
+    return selected
+
+
+def _is_near_miss(a, b, distance_threshold: float, ttc_threshold: float) -> bool:
+    """
+    :return: True iff. the geometries of the given individuals are closer than the distance threshold or the
+    individuals approach each other such that they would collide within the time to collision threshold.
+    """
+    kinematics_a, kinematics_b = _get_kinematics(a), _get_kinematics(b)
+    if kinematics_a is None or kinematics_b is None:
+        return False
+    (geometry_a, velocity_a), (geometry_b, velocity_b) = kinematics_a, kinematics_b
+    distance = geometry_a.distance(geometry_b)
+    if distance <= distance_threshold:
+        return True
+    dx, dy = geometry_b.centroid.x - geometry_a.centroid.x, geometry_b.centroid.y - geometry_a.centroid.y
+    norm = math.hypot(dx, dy)
+    if norm == 0:
+        return False
+    closing_speed = ((velocity_a[0] - velocity_b[0]) * dx + (velocity_a[1] - velocity_b[1]) * dy) / norm
+    return closing_speed > 0 and distance / closing_speed <= ttc_threshold
+
+
+def _get_kinematics(individual):
+    """
+    :param individual: An individual of a reasoned scenario.
+    :return: A tuple of the geometry and the global velocity (in m/s, as a list of x and y) of the individual, or None
+    if it has no geometry. Individuals without yaw or velocity are regarded as standing still.
+    """
+    if len(getattr(individual, "hasGeometry", [])) == 0 or len(individual.hasGeometry[0].asWKT) == 0:
+        return None
+    geometry = wkt.loads(individual.hasGeometry[0].asWKT[0])
+    yaw = getattr(individual, "has_yaw", None)
+    velocity_x = getattr(individual, "has_velocity_x", None)
+    if yaw is None or velocity_x is None:
+        return geometry, [0, 0]
+    # Velocities are given in the coordinate system of the individual
+    return geometry, convert_local_to_global_vector([velocity_x, getattr(individual, "has_velocity_y", None) or 0], yaw)
+
+
+def _get_scene_time(world: owlready2.World) -> float:
+    """
+    :param world: The world representing a single scene.
+    :return: The time of the scene.
+    """
+    tm = auto.get_ontology(auto.Ontology.Traffic_Model, world)
+    return world.search(type=tm.Scene)[0].inTimePosition[0].numericPosition[0]
+
+
+def _get_actors(world: owlready2.World) -> dict:
+    """
+    :param world: The world representing a single scene.
+    :return: A dict from the identifiers of the actors in the scene to a tuple of their speed, yaw and centroid.
+    """
+    actors = dict()
+    for individual in world.search(identifier="*"):
+        if not isinstance(individual, owlready2.entity.ThingClass) and \
+                getattr(individual, "has_yaw", None) is not None and len(getattr(individual, "hasGeometry", [])) > 0 \
+                and len(individual.hasGeometry[0].asWKT) > 0:
+            velocity = [x for x in [individual.has_velocity_x, individual.has_velocity_y, individual.has_velocity_z]
+                        if x is not None]
+            speed = math.sqrt(sum(x ** 2 for x in velocity))
+            centroid = wkt.loads(individual.hasGeometry[0].asWKT[0]).centroid
+            actors[individual.identifier[0]] = (speed, individual.has_yaw, centroid)
+    return actors
+
+
+def _get_change(last_actors: dict, actors: dict, speed_threshold: float, yaw_threshold: float,
+                distance_threshold: float):
+    """
+    :return: A description of the first change between the actors of the last kept scene and the current scene that
+    exceeds the thresholds, or None if there is no such change.
+    """
+    for identifier, (speed, yaw, _) in actors.items():
+        if identifier not in last_actors:
+            return "new actor " + str(identifier)
+        last_speed, last_yaw, _ = last_actors[identifier]
+        if abs(speed - last_speed) > speed_threshold:
+            return "speed of " + str(identifier)
+        if abs((yaw - last_yaw + 180) % 360 - 180) > yaw_threshold:
+            return "yaw of " + str(identifier)
+    identifiers = sorted(x for x in actors.keys() if x in last_actors)
+    for i, identifier_1 in enumerate(identifiers):
+        for identifier_2 in identifiers[i + 1:]:
+            distance = actors[identifier_1][2].distance(actors[identifier_2][2])
+            last_distance = last_actors[identifier_1][2].distance(last_actors[identifier_2][2])
+            if min(distance, last_distance) < _INTERACTION_RADIUS and \
+                    abs(distance - last_distance) > distance_threshold:
+                return "distance of " + str(identifier_1) + " and " + str(identifier_2)
+    return None
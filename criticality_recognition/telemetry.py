@@ -0,0 +1,141 @@
+import contextlib
+import json
+import logging
+import os
+import sys
+import threading
+import timeit
+
+import owlready2
+import psutil
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# The tracer that records the spans, if telemetry is enabled (see start()).
+_tracer = None
+
+
+class Tracer:
+    """
+    Records spans (i.e. named and possibly nested stages of the criticality recognition) together with the Python
+    process' resident memory, the peak memory of the child processes (i.e. of Pellet's JVM) and optionally the A-Box
+    size of the world a span works on, both at its start and its end. The spans are stored in the Chrome trace event
+    format, which can be viewed in chrome://tracing or https://ui.perfetto.dev.
+    """
+
+    def __init__(self, file: str = None, triples=False):
+        """
+        :param file: Optional. The JSON file to store the trace in.
+        :param triples: Whether to record the A-Box size of the worlds given to the spans. Counting the triples scans
+        the quadstore at the start and end of each span, which adds to the time of large scenarios.
+        """
+        self.file = file
+        self.triples = triples
+        self.events = []
+        self._process = psutil.Process()
+        self._start = timeit.default_timer()
+
+    @contextlib.contextmanager
+    def span(self, name: str, world: owlready2.World = None, **args):
+        """
+        Records a span for the duration of the with-block.
+        :param name: The name of the span.
+        :param world: Optional. The world whose number of triples shall be recorded (if enabled).
+        :param args: Further arguments to store in the span.
+        """
+        start = self._get_state(world)
+        t1 = timeit.default_timer()
+        try:
+            yield
+        finally:
+            t2 = timeit.default_timer()
+            end = self._get_state(world)
+            args.update({k + "_before": v for k, v in start.items()})
+            args.update({k + "_after": v for k, v in end.items()})
+            self.events.append({"name": name, "ph": "X", "ts": self._timestamp(t1), "dur": (t2 - t1) * 1e6,
+                                "pid": os.getpid(), "tid": threading.get_native_id(), "args": args})
+            counters = {k: v for k, v in end.items() if k != "triples"}
+            self.events.append({"name": "memory", "ph": "C", "ts": self._timestamp(t2), "pid": os.getpid(),
+                                "tid": threading.get_native_id(), "args": counters})
+
+    def save(self):
+        """
+        Stores the recorded spans in the trace file.
+        """
+        with open(self.file, "w") as f:
+            json.dump({"traceEvents": sorted(self.events, key=lambda x: x["ts"]), "displayTimeUnit": "ms"}, f)
+        logger.info("Saved trace of " + str(len([e for e in self.events if e["ph"] == "X"])) + " spans to file://" +
+                    os.path.abspath(self.file))
+
+    def _timestamp(self, t: float) -> float:
+        return (t - self._start) * 1e6
+
+    def _get_state(self, world: owlready2.World) -> dict:
+        state = {"rss_mb": self._process.memory_info().rss / 2 ** 20}
+        jvm_peak_mb = get_peak_memory(children=True)
+        if jvm_peak_mb is not None:
+            state["jvm_peak_mb"] = jvm_peak_mb
+        if world is not None and self.triples:
+            state["triples"] = get_triple_count(world)
+        return state
+
+
+def start(file: str = None, triples=False) -> Tracer:
+    """
+    Enables telemetry, i.e. all subsequent spans are recorded until stop() is called.
+    :param file: Optional. The JSON file to store the trace in.
+    :param triples: Whether to record the A-Box size of the worlds given to the spans.
+    :return: The tracer recording the spans.
+    """
+    global _tracer
+    _tracer = Tracer(file, triples)
+    return _tracer
+
+
+def stop():
+    """
+    Disables telemetry and stores the trace recorded so far (if any and if a file was given).
+    """
+    global _tracer
+    if _tracer is not None and _tracer.file is not None:
+        _tracer.save()
+    _tracer = None
+
+
+def span(name: str, world: owlready2.World = None, **args):
+    """
+    Records a span for the duration of the with-block if telemetry is enabled, does nothing otherwise.
+    :param name: The name of the span.
+    :param world: Optional. The world whose number of triples shall be recorded (if enabled, see start()).
+    :param args: Further arguments to store in the span.
+    """
+    if _tracer is None:
+        return contextlib.nullcontext()
+    return _tracer.span(name, world, **args)
+
+
+def get_triple_count(world: owlready2.World) -> int:
+    """
+    :return: The number of triples in the quadstore of the given world.
+    """
+    return world.graph.execute("SELECT (SELECT COUNT() FROM objs) + (SELECT COUNT() FROM datas)").fetchone()[0]
+
+
+def get_peak_memory(children=False) -> float or None:
+    """
+    :param children: Whether to get the peak memory of the child processes (i.e. of the largest child so far, e.g.
+    Pellet's JVM) instead of the Python process.
+    :return: The peak resident memory (in MB), or None if it is not available on this platform (i.e. on Windows).
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is given in bytes on macOS and in KB on Linux
+    if sys.platform == "darwin":
+        return peak / 2 ** 20
+    return peak / 2 ** 10
@@ -1,10 +1,22 @@
 import logging
+import math
+import os
+import shutil
+import sqlite3
+import tempfile
+from collections import defaultdict
 import owlready2
+from owlready2.base import rdf_type, rdfs_subclassof, owl_equivalentclass, owl_named_individual
+from owlready2.reasoning import _INFERRENCES_ONTOLOGY, _apply_reasoning_results, _apply_inferred_obj_relations, \
+    _apply_inferred_data_relations
 
 from pyauto import auto
 
 logger = logging.getLogger(__name__)
 
+# The horizon (in scenes) of the temporal criticality phenomena if none of them formalizes a bound on its duration
+DEFAULT_HORIZON = 20
+
 
 def reduce(world: owlready2.World, augmentation_concepts=None):
     """
@@ -13,16 +25,11 @@ def reduce(world: owlready2.World, augmentation_concepts=None):
     :world: The world with the ABox to reduce.
     :augmentation_concepts: The concepts with which temporal augmentations will rely on.
     """
-    temporal_concepts = _get_temporal_concepts(world)
-    tm = auto.get_ontology(auto.Ontology.Traffic_Model, world)
-    ti = auto.get_ontology(auto.Ontology.Time, world)
-    global_temporal_concepts = {tm.Scenario, tm.Scene, ti.TimePosition, ti.Duration}
-    temporal_concepts = temporal_concepts.union(global_temporal_concepts)
-    logger.debug("Identified the following temporal concepts in CP formalization: " + str(temporal_concepts))
+    temporal_concepts = get_temporal_concepts(world)
     logger.debug("Identified the following augmentation concepts: " + str(augmentation_concepts))
-    temporal_individuals = _get_temporal_individuals(world, temporal_concepts)
+    temporal_individuals = get_temporal_individuals(world, temporal_concepts)
     if augmentation_concepts:
-        temporal_augmentation_individuals = _get_temporal_individuals(world, augmentation_concepts)
+        temporal_augmentation_individuals = get_temporal_individuals(world, augmentation_concepts)
     else:
         temporal_augmentation_individuals = set()
     logger.debug("Satisfied by " + str(len(temporal_individuals)) + " individuals: " + str(temporal_individuals))
@@ -37,6 +44,154 @@ def reduce(world: owlready2.World, augmentation_concepts=None):
     return undos, aug_undos
 
 
+def get_tbox(world: owlready2.World) -> str:
+    """
+    Creates a snapshot of the world's quad store without its ABox (i.e. without all named individuals and every triple
+    they are part of) in a temporary file. The snapshot can be re-used by project() for all projections of the world,
+    as long as its TBox does not change. Shall be removed by discard_tbox() after use.
+    :param world: The world to create the snapshot of.
+    :return: The file name of the snapshot.
+    """
+    fd, filename = tempfile.mkstemp(prefix="tbox_", suffix=".sqlite3")
+    os.close(fd)
+    world.graph.commit()
+    tbox = sqlite3.connect(filename)
+    world.graph.db.backup(tbox)
+    tbox.execute("CREATE TEMP TABLE named (storid INTEGER PRIMARY KEY)")
+    tbox.execute("INSERT OR IGNORE INTO named SELECT s FROM objs WHERE p=? AND o=?", (rdf_type, owl_named_individual))
+    tbox.execute("DELETE FROM objs WHERE s IN (SELECT storid FROM named) OR o IN (SELECT storid FROM named)")
+    tbox.execute("DELETE FROM datas WHERE s IN (SELECT storid FROM named)")
+    tbox.commit()
+    tbox.close()
+    return filename
+
+
+def discard_tbox(tbox: str):
+    """
+    Deletes a snapshot that was created by get_tbox().
+    :param tbox: The file name of the snapshot.
+    """
+    os.remove(tbox)
+
+
+def project(world: owlready2.World, individuals: set, tbox=None) -> owlready2.World:
+    """
+    Creates a lightweight reasoning world that contains a copy of the TBox of the given world but only the given
+    individuals of its ABox. Contrary to reduce(), the given world is not modified at all. The copy is done on the quad
+    store directly and thus preserves all storage IDs, which allows to write back inferences with write_back().
+    :param world: The world to project.
+    :param individuals: The individuals of the world to keep in the projection (e.g. the temporal individuals).
+    :param tbox: Optional. A snapshot of the world's TBox as created by get_tbox(), e.g. to project the world multiple
+    times. If not given, the TBox is copied from the world.
+    :return: A new world containing the projection. Shall be discarded by discard() after use.
+    """
+    fd, filename = tempfile.mkstemp(prefix="projection_", suffix=".sqlite3")
+    os.close(fd)
+    if tbox is None:
+        tbox = get_tbox(world)
+        os.replace(tbox, filename)
+    else:
+        shutil.copyfile(tbox, filename)
+    # Copies all triples of the kept individuals (except for the ones they share with other named individuals) from the
+    # world into the TBox by set-based operations
+    world.graph.commit()
+    db = world.graph.db
+    db.execute("ATTACH DATABASE ? AS projection", (filename,))
+    try:
+        db.execute("CREATE TEMP TABLE IF NOT EXISTS projected (storid INTEGER PRIMARY KEY)")
+        db.execute("DELETE FROM projected")
+        db.executemany("INSERT OR IGNORE INTO projected VALUES (?)", [(x.storid,) for x in individuals])
+        db.execute("CREATE TEMP TABLE IF NOT EXISTS named (storid INTEGER PRIMARY KEY)")
+        db.execute("DELETE FROM named")
+        db.execute("INSERT OR IGNORE INTO named SELECT s FROM main.objs WHERE p=? AND o=?",
+                   (rdf_type, owl_named_individual))
+        db.execute("INSERT OR IGNORE INTO projection.objs SELECT c, s, p, o FROM main.objs WHERE s IN projected AND "
+                   "(o NOT IN named OR o IN projected)")
+        db.execute("INSERT OR IGNORE INTO projection.objs SELECT c, s, p, o FROM main.objs WHERE o IN projected AND "
+                   "s NOT IN named")
+        db.execute("INSERT OR IGNORE INTO projection.datas SELECT c, s, p, o, d FROM main.datas WHERE s IN projected")
+        # Individuals may have been created after the snapshot of the TBox was taken
+        db.execute("INSERT OR IGNORE INTO projection.resources SELECT storid, iri FROM main.resources WHERE storid IN "
+                   "projected")
+        db.execute("DELETE FROM projection.store")
+        db.execute("INSERT INTO projection.store SELECT * FROM main.store")
+        db.commit()
+    finally:
+        db.execute("DETACH DATABASE projection")
+    return owlready2.World(filename=filename)
+
+
+def write_back(projection: owlready2.World, world: owlready2.World):
+    """
+    Writes all inferences that a reasoner stored in the projected world back into the world it was created from by
+    project(). Inferences are added to the inferences ontology of the world, as if the reasoner ran on it directly.
+    Only inferred triples that are not in the world yet are written back, i.e. the inferences the world already had
+    when it was projected (or that a previous window wrote back) are not re-applied.
+    :param projection: The projected world, after reasoning.
+    :param world: The world that the projection was created from.
+    """
+    ontology = world.get_ontology(_INFERRENCES_ONTOLOGY)
+    c = projection.get_ontology(_INFERRENCES_ONTOLOGY).graph.c
+    new_parents = defaultdict(list)
+    new_equivs = defaultdict(list)
+    entity_2_type = {}
+    relations = []
+    for s, p, o in projection.graph.execute("SELECT s, p, o FROM objs WHERE c=?", (c,)).fetchall():
+        if world._has_obj_triple_spo(s, p, o):
+            continue  # Not added by this projection, e.g. inferred by a previous window or copied from the world
+        if p == rdf_type or p == rdfs_subclassof:
+            # Parents are reset when applying, therefore we need all parents of the entity, not only the inferred ones
+            entity_2_type[s] = "individual" if p == rdf_type else "class"
+            if s not in new_parents:
+                new_parents[s] = [x for (x,) in projection.graph.execute("SELECT o FROM objs WHERE s=? AND p=? AND "
+                                                                         "o>0 AND o!=?", (s, p, owl_named_individual))]
+        elif p == owl_equivalentclass:
+            entity_2_type[s] = "class"
+            new_equivs[s].append(o)
+        else:
+            prop = world._get_by_storid(p)
+            if prop is not None:
+                relations.append((s, prop, o))
+    # Data property values are only inferred by the native rule engine (Pellet is not asked for them)
+    data_relations = []
+    for s, p, o, d in projection.graph.execute("SELECT s, p, o, d FROM datas WHERE c=?", (c,)).fetchall():
+        if world._has_data_triple_spod(s, p, o, d):
+            continue
+        prop = world._get_by_storid(p)
+        if prop is not None:
+            data_relations.append((s, prop, o, d))
+    logger.debug("Writing back " + str(len(new_parents)) + " classifications, " + str(len(relations)) +
+                 " relations and " + str(len(data_relations)) + " data values from projection")
+    _apply_reasoning_results(world, ontology, False, new_parents, new_equivs, entity_2_type)
+    _apply_inferred_obj_relations(world, ontology, False, relations)
+    _apply_inferred_data_relations(world, ontology, False, data_relations)
+
+
+def discard(projection: owlready2.World):
+    """
+    Closes and deletes a projected world that was created by project().
+    :param projection: The projected world to discard.
+    """
+    filename = projection.filename
+    projection.close()
+    os.remove(filename)
+
+
+def get_temporal_concepts(world: owlready2.World) -> set:
+    """
+    Fetches all temporal concepts of the world, i.e. those used within the definition of some temporal criticality
+    phenomenon as well as the globally needed ones (scenario, scenes, time positions and durations).
+    :param world: World to get temporal concepts in.
+    :return: A set of temporal concepts (classes, data and object properties) in the world.
+    """
+    tm = auto.get_ontology(auto.Ontology.Traffic_Model, world)
+    ti = auto.get_ontology(auto.Ontology.Time, world)
+    global_temporal_concepts = {tm.Scenario, tm.Scene, ti.TimePosition, ti.Duration}
+    temporal_concepts = _get_temporal_concepts(world).union(global_temporal_concepts)
+    logger.debug("Identified the following temporal concepts in CP formalization: " + str(temporal_concepts))
+    return temporal_concepts
+
+
 def _get_temporal_concepts(world: owlready2.World) -> set:
     """
     Fetches all classes, data and object properties that are used within the definition (equivalence or subclass) of
@@ -46,15 +201,9 @@ def _get_temporal_concepts(world: owlready2.World) -> set:
     """
     concepts = set()
     # Fetch relevant ontologies
-    ac = auto.get_ontology(auto.Ontology.Act, world)
-    ti = auto.get_ontology(auto.Ontology.Time, world)
     cp = auto.get_ontology(auto.Ontology.Criticality_Phenomena, world)
     cp_form = auto.get_ontology(auto.Ontology.Criticality_Phenomena_Formalization, world)
-    cp_cls = set(world.search(subclass_of=cp.Criticality_Phenomenon))
-    ac_cls = set(world.search(subclass_of=ac.Activity))
-    in_cls = set(world.search(subclass_of=ti.Interval))
-    temporal_cps = cp_cls.intersection(ac_cls.union(in_cls))
-    for temporal_cp in temporal_cps:
+    for temporal_cp in _get_temporal_cps(world):
         # First, check if SWRL rules are available for this CP.
         for rule in world.rules():
             if len(rule.head) == 1 and hasattr(rule.head[0], "is_a") and owlready2.swrl.ClassAtom in rule.head[0].is_a \
@@ -75,6 +224,20 @@ def _get_temporal_concepts(world: owlready2.World) -> set:
     return set(res)
 
 
+def _get_temporal_cps(world: owlready2.World) -> set:
+    """
+    :param world: World to get temporal criticality phenomena in.
+    :return: A set of all criticality phenomenon classes that are activities or intervals.
+    """
+    ac = auto.get_ontology(auto.Ontology.Act, world)
+    ti = auto.get_ontology(auto.Ontology.Time, world)
+    cp = auto.get_ontology(auto.Ontology.Criticality_Phenomena, world)
+    cp_cls = set(world.search(subclass_of=cp.Criticality_Phenomenon))
+    ac_cls = set(world.search(subclass_of=ac.Activity))
+    in_cls = set(world.search(subclass_of=ti.Interval))
+    return cp_cls.intersection(ac_cls.union(in_cls))
+
+
 def _get_sub_concepts_from_axiom(axiom) -> set:
     """
     Recursively searches for basic concepts within a possibly complex axiom.
@@ -97,10 +260,12 @@ def _get_sub_concepts_from_axiom(axiom) -> set:
         return set()
 
 
-def _get_temporal_individuals(world: owlready2.World, temporal_concepts: set) -> set:
+def get_temporal_individuals(world: owlready2.World, temporal_concepts: set, individuals=None) -> set:
     """
     Fetches all individuals within the world which are directly related (in the graph) to some temporal concept.
     :param world: World to get individuals from
+    :param temporal_concepts: The temporal concepts to check the individuals against.
+    :param individuals: Optional. Restricts the search to the given individuals (e.g. newly augmented ones).
     :return: A set of all individuals within the world that are related to a temporal concept.
     """
     def filter_func(y):
@@ -108,4 +273,171 @@ def _get_temporal_individuals(world: owlready2.World, temporal_concepts: set) ->
         for axiom in y.INDIRECT_is_a + list(y.get_properties()):
             concepts = concepts.union(_get_sub_concepts_from_axiom(axiom))
         return len(concepts.intersection(temporal_concepts)) > 0
-    return set(filter(filter_func, set(world.individuals())))
+    if individuals is None:
+        individuals = world.individuals()
+    return set(filter(filter_func, set(individuals)))
+
+
+def get_temporal_horizon(world: owlready2.World, individuals=None, default=DEFAULT_HORIZON) -> int:
+    """
+    Determines the horizon of the temporal criticality phenomena, i.e. the maximum number of consecutive scenes that a
+    single phenomenon can span. The horizon is given by the largest upper bound on the duration of some temporal
+    criticality phenomenon within its definition, converted to scenes by the (median) time between the scenes.
+    Activities among the given individuals that already span more scenes extend the horizon.
+    :param world: The world containing the scenario.
+    :param individuals: Optional. The individuals whose (already augmented) activities shall extend the horizon.
+    :param default: The horizon (as number of scenes) to assume if no duration bound is formalized.
+    :return: The horizon as number of scenes, at most the number of all scenes.
+    """
+    ti = auto.get_ontology(auto.Ontology.Time, world)
+    scenes = get_sorted_scenes(world)
+    bounds = [x for temporal_cp in _get_temporal_cps(world) for axiom in temporal_cp.equivalent_to + temporal_cp.is_a
+              for x in _get_duration_bounds_from_axiom(axiom, ti.numericDuration)]
+    if len(scenes) < 2:
+        return len(scenes)
+    if len(bounds) == 0:
+        logger.warning("No duration bounds of temporal criticality phenomena formalized, assuming a horizon of " +
+                       str(default) + " scenes - phenomena spanning more scenes are split across windows")
+        horizon = default
+    else:
+        steps = sorted(b.inTimePosition[0].numericPosition[0] - a.inTimePosition[0].numericPosition[0]
+                       for a, b in zip(scenes, scenes[1:]))
+        step = steps[len(steps) // 2]
+        horizon = len(scenes) if step <= 0 else math.ceil(max(bounds) / step) + 1
+        logger.debug("Horizon of temporal criticality phenomena: " + str(horizon) + " scenes (maximum duration " +
+                     str(max(bounds)) + ", scene step " + str(step) + ")")
+    if individuals:
+        index = {scene: i for i, scene in enumerate(scenes)}
+        for individual in individuals:
+            span = _get_scene_span(individual, index)
+            if span is not None:
+                horizon = max(horizon, span[1] - span[0] + 1)
+    return min(horizon, len(scenes))
+
+
+def _get_duration_bounds_from_axiom(axiom, duration_property) -> list:
+    """
+    Recursively searches for upper bounds on the given duration property within a possibly complex axiom.
+    :param axiom: The axiom to analyze.
+    :param duration_property: The data property that holds the duration (i.e. numericDuration).
+    :return: A list of all upper bounds on the duration property within the axiom.
+    """
+    if isinstance(axiom, owlready2.Restriction):
+        if axiom.property == duration_property and isinstance(axiom.value, owlready2.ConstrainedDatatype):
+            return [bound for bound in [getattr(axiom.value, "max_inclusive", None),
+                                        getattr(axiom.value, "max_exclusive", None)] if bound is not None]
+        return _get_duration_bounds_from_axiom(axiom.value, duration_property)
+    elif hasattr(axiom, "Classes"):
+        return [x for cls in axiom.Classes for x in _get_duration_bounds_from_axiom(cls, duration_property)]
+    elif hasattr(axiom, "Class"):
+        return _get_duration_bounds_from_axiom(axiom.Class, duration_property)
+    else:
+        return []
+
+
+def get_sorted_scenes(world: owlready2.World) -> list:
+    """
+    :param world: The world containing the scenario.
+    :return: All scenes of the world, sorted by their time position.
+    """
+    tm = auto.get_ontology(auto.Ontology.Traffic_Model, world)
+    return sorted(world.search(type=tm.Scene), key=lambda x: x.inTimePosition[0].numericPosition[0])
+
+
+def get_windows(world: owlready2.World, individuals: set, size: int) -> list:
+    """
+    Splits the given individuals of a scenario into overlapping windows of consecutive scenes, each window overlapping
+    its successor by half of its scenes. An individual belongs to the scenes it is in (or, for activities, the scenes
+    between its beginning and end), and individuals without any scene (e.g. time positions) to the scenes of the
+    individuals referring to them. Individuals that still belong to no scene (e.g. the scenario) are part of every
+    window. Activities that span multiple windows are part of each of them, such that their inferences are stitched
+    together when writing back the inferences of each window. The size shall be at least the horizon of the temporal
+    criticality phenomena (see get_temporal_horizon()), as phenomena spanning more scenes are split otherwise.
+    :param world: The world containing the scenario.
+    :param individuals: The individuals to split (e.g. the temporal individuals).
+    :param size: The number of scenes per window.
+    :return: A list of sets of individuals, one for each window.
+    """
+    scenes = get_sorted_scenes(world)
+    spans, unassigned = _get_scene_spans(world, individuals, scenes)
+    size = max(size, 1)
+    windows = []
+    for start in get_window_starts(len(scenes), size):
+        end = start + size - 1
+        window = {x for x, (first, last) in spans.items() if first <= end and last >= start}
+        windows.append(window.union(unassigned))
+    return windows
+
+
+def get_individuals_in_time_windows(world: owlready2.World, individuals: set, time_windows: list) -> set:
+    """
+    Selects the given individuals of a scenario that belong to some scene within the given time windows. Individuals
+    are assigned to scenes as in get_windows(), i.e. individuals that belong to no scene (e.g. the scenario) are always
+    selected.
+    :param world: The world containing the scenario.
+    :param individuals: The individuals to select from (e.g. the temporal individuals).
+    :param time_windows: A list of time windows as tuples of their start and end time (in s).
+    :return: The set of selected individuals.
+    """
+    scenes = get_sorted_scenes(world)
+    times = [x.inTimePosition[0].numericPosition[0] for x in scenes]
+    spans, unassigned = _get_scene_spans(world, individuals, scenes)
+    selected = {x for x, (first, last) in spans.items() if any(start <= times[last] and times[first] <= end
+                                                               for start, end in time_windows)}
+    return selected.union(unassigned)
+
+
+def _get_scene_spans(world: owlready2.World, individuals: set, scenes: list) -> tuple:
+    """
+    Assigns the given individuals to the scenes they belong to (see get_windows()).
+    :param world: The world containing the scenario.
+    :param individuals: The individuals to assign.
+    :param scenes: All scenes of the world, sorted by their time position.
+    :return: A tuple of a dict from the assigned individuals to the positions of their first and last scene, and the
+    set of individuals that belong to no scene.
+    """
+    index = {scene: i for i, scene in enumerate(scenes)}
+    spans = dict()
+    unassigned = dict()
+    for individual in individuals:
+        span = _get_scene_span(individual, index)
+        if span is not None:
+            spans[individual] = span
+        else:
+            unassigned[individual.storid] = individual
+    for individual, span in list(spans.items()):
+        for (o,) in world.graph.execute("SELECT o FROM objs WHERE s=?", (individual.storid,)):
+            if o in unassigned:
+                spans[unassigned.pop(o)] = span
+    return spans, set(unassigned.values())
+
+
+def get_window_starts(number_of_scenes: int, size: int) -> list:
+    """
+    :param number_of_scenes: The number of scenes of the scenario.
+    :param size: The number of scenes per window (at least 1).
+    :return: The positions of the first scene of each window, such that each window overlaps its successor by half of
+    its scenes and the last window ends with the last scene. Windows are only shorter than the size if the scenario is.
+    """
+    stride = max(size - size // 2, 1)
+    starts = list(range(0, max(number_of_scenes - size, 0) + 1, stride))
+    if starts[-1] + size < number_of_scenes:
+        starts.append(number_of_scenes - size)
+    return starts
+
+
+def _get_scene_span(individual, index: dict):
+    """
+    :param individual: The individual to get the scenes of.
+    :param index: A dict from the scenes to their position in the scenario.
+    :return: A tuple of the positions of the first and last scene the individual belongs to, or None if it belongs to no
+    scene.
+    """
+    if individual in index:
+        return index[individual], index[individual]
+    positions = [index[x] for x in getattr(individual, "in_traffic_model", []) if x in index]
+    positions += [index[x] for x in getattr(individual, "hasBeginning", []) + getattr(individual, "hasEnd", [])
+                  if x in index]
+    if len(positions) == 0:
+        return None
+    return min(positions), max(positions)
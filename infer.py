@@ -1,12 +1,16 @@
 import argparse
+import atexit
+import gc
 import logging
 
 import owlready2
 import os
 import psutil
+import sys
 
 from pyauto import auto
-from criticality_recognition import criticality_recognition, phenomena_extraction
+from criticality_recognition import criticality_recognition, phenomena_extraction, reasoning_cache, \
+    augmentation_profiler, telemetry, scene_sampler, results_database, scenario_file
 import omega2auto
 from inputs import example_fuc_2_3
 
@@ -19,6 +23,19 @@ parser.add_argument("--format", type=str, default="natural", metavar="{csv, natu
                     help="Whether and how to print the criticality phenomena output. Default: natural")
 parser.add_argument("--output", type=str, nargs="?", metavar="FILE", help="Optional. Store the resulting inferences in "
                                                                           "an output file")
+parser.add_argument("--output-format", type=str, choices=scenario_file.FORMATS.keys(),
+                    metavar="{owl, ntriples, sqlite}",
+                    help="Format of the output files. sqlite stores a copy of the quadstore, which is much faster to "
+                         "save and to load (by visualize.py) than parsing an OWL file. If given, the extension of the "
+                         "output files is changed accordingly. Default: Given by the extension of the output file "
+                         "(.owl, .nt, .sqlite3), otherwise owl")
+parser.add_argument("--save-queue", type=int, default=1, metavar="N", help="Maximum number of scenarios waiting to be "
+                                                                          "saved to the output files, which happens "
+                                                                          "in the background while the next scenario "
+                                                                          "is reasoned on. Default: 1")
+parser.add_argument("--database", type=str, metavar="FILE", help="Optional. Stores the criticality phenomena of each "
+                                                               "scenario in the given SQLite database (as soon as the "
+                                                               "scenario is finished), to be queried by query.py")
 parser.add_argument("--convert-only", action="store_true", help="If flag is set, does not run any inferencing. It "
                                                                 "only converts the inputs into A.U.T.O. and (if, "
                                                                 "--output is given) stores them (one OWL file for "
@@ -32,9 +49,51 @@ parser.add_argument("--start", type=float, metavar="N", help="Optional start off
 parser.add_argument("--end", type=float, metavar="N", help="Optional end offset (subtracted) for scenarios (in s).")
 parser.add_argument("--hertz", type=float, metavar="N", help="The sampling rate to reduce the input scenarios to. Can "
                                                              "also be a fraction. Default: 1 Hz.")
+parser.add_argument("--adaptive-sampling", type=float, nargs=2, metavar=("MIN_GAP", "MAX_GAP"),
+                    help="If given, keeps only the scenes in which the speed, yaw or relative distance of some actor "
+                         "changed notably or a new actor appeared, with at least MIN_GAP and at most MAX_GAP seconds "
+                         "between two kept scenes (use a high --hertz for the conversion)")
+parser.add_argument("--refine", type=float, metavar="N", help="If given, converts the input scenarios at this (fine) "
+                                                              "sampling rate, reasons on them at the rate given by "
+                                                              "--hertz first, and then refines the time windows around "
+                                                              "the criticality phenomena and near-misses found by "
+                                                              "reasoning on them at the fine rate (temporal reasoning "
+                                                              "then only runs on these windows)")
 parser.add_argument("--logging", type=str, metavar="{critical, error, warning, info, debug}", help="Log level. Default:"
                                                                                                    " info")
 parser.add_argument("--pellet-output", action="store_true", help="If flag is set, shows Pellet's output")
+parser.add_argument("--projection", action="store_true", help="If flag is set, temporal reasoning runs on a projection "
+                                                              "of the scenario to its temporal individuals instead of "
+                                                              "reducing and restoring the scenario itself")
+parser.add_argument("--window", type=int, nargs="?", const=0, metavar="N", help="If given, temporal reasoning runs on "
+                                                                                "overlapping windows of N scenes of "
+                                                                                "the projection of the scenario "
+                                                                                "(implies --projection). N is at "
+                                                                                "least (and by default) the horizon "
+                                                                                "of the temporal criticality "
+                                                                                "phenomena (20 scenes by default if "
+                                                                                "they do not bound their durations)")
+parser.add_argument("--native-rules", action="store_true", help="Experimental. If flag is set, evaluates the SWRL "
+                                                                "rules by a native rule engine and uses Pellet for the "
+                                                                "DL part only (see compare_rules.py)")
+parser.add_argument("--incremental-augmentation", action="store_true", help="If flag is set, augmentation functions "
+                                                                            "are only re-evaluated for individuals "
+                                                                            "that changed since their last evaluation, "
+                                                                            "and scheduled along their dependencies")
+parser.add_argument("--cache", type=str, metavar="FOLDER_PATH", help="Optional. Caches the results of Pellet in the "
+                                                                   "given folder and re-uses them for scenes and "
+                                                                   "scenarios with the same (canonical) ABox")
+parser.add_argument("--cache-size", type=int, default=1024, metavar="N", help="Maximum size of the cache (in MB). "
+                                                                              "Default: 1024")
+parser.add_argument("--profile", type=str, metavar="FILE", help="Optional. Profiles the augmentation functions (calls, "
+                                                               "outcomes, time, geometry parses), stores the profile "
+                                                               "as JSON in the given file and prints it as a table")
+parser.add_argument("--trace", type=str, metavar="FILE", help="Optional. Records the time and memory of each stage "
+                                                             "and stores them as a Chrome trace (JSON) in the given "
+                                                             "file")
+parser.add_argument("--trace-triples", action="store_true", help="If flag is set, the trace also records the A-Box "
+                                                                 "size at the start and end of each stage (which "
+                                                                 "takes time on large scenarios)")
 parser.add_argument("input", type=str, metavar="FILE", help="Input file. A .hdf5 file in OMEGA-format or the string \""
                                                             "fuc23\" (will run the provided use case example)")
 args = parser.parse_args()
@@ -68,23 +127,103 @@ else:
     owlready2.reasoning.JAVA_MEMORY = int((psutil.virtual_memory().available >> 20) * 0.7)  # using 70% of available RAM
 logger.info("Pellet will use a maximum of " + str(owlready2.reasoning.JAVA_MEMORY) + " MB RAM.")
 
-# Reading inputs
-if args.input.endswith(".hdf5"):
-    scenarios = omega2auto.convert(os.path.abspath(args.input), args.auto, cp=True, scenarios=args.scenarios,
-                                      sampling_rate=args.hertz, start_offset=args.start, end_offset=args.end)
-elif args.input == "fuc23":
-    scenarios = [example_fuc_2_3.get_fuc23_worlds()]
+# Reasoning cache
+if args.cache:
+    cache = reasoning_cache.Reasoning_Cache(args.cache, args.cache_size)
 else:
-    scenarios = []
-    logger.info("No scenarios found - is this the right file name?")
+    cache = None
+
+# Augmentation profiling
+if args.profile:
+    profiler = augmentation_profiler.Augmentation_Profiler()
+else:
+    profiler = None
+
+# Telemetry (the trace is also stored if the run fails)
+if args.trace:
+    telemetry.start(args.trace, args.trace_triples)
+    atexit.register(telemetry.stop)
+
+# Background writer of the output files (queued scenarios are also saved if the run fails). Registered after the
+# telemetry, such that it is closed (and its save spans are traced) before the trace is stored at exit.
+if args.output:
+    writer = scenario_file.Scenario_Writer(args.save_queue)
+    atexit.register(writer.close)
+else:
+    writer = None
+
+# Results database
+if args.database:
+    database = results_database.Results_Database(args.database, " ".join(sys.argv))
+    logger.info("Storing criticality phenomena in file://" + os.path.abspath(args.database))
+else:
+    database = None
+
+
+def read_scenarios():
+    """
+    Reads the input scenarios one after another, such that only the scenario that is currently processed is held in
+    memory (given IDs are converted one by one, otherwise, all scenarios are converted at once since their IDs are only
+    known to the conversion).
+    :return: A generator of tuples of a scenario (i.e. a list of scene worlds) and the total number of scenarios.
+    """
+    if args.input.endswith(".hdf5"):
+        if args.scenarios:
+            conversions = [[x] for x in args.scenarios]
+        else:
+            conversions = [None]
+        for scenario_ids in conversions:
+            with telemetry.span("convert", scenarios=scenario_ids):
+                converted = omega2auto.convert(os.path.abspath(args.input), args.auto, cp=True, scenarios=scenario_ids,
+                                               sampling_rate=args.refine or args.hertz, start_offset=args.start,
+                                               end_offset=args.end)
+            if args.scenarios:
+                number_of_scenarios = len(args.scenarios)
+            else:
+                number_of_scenarios = len(converted)
+            while len(converted) > 0:
+                yield converted.pop(0), number_of_scenarios
+    elif args.input == "fuc23":
+        yield example_fuc_2_3.get_fuc23_worlds(), 1
+    else:
+        logger.info("No scenarios found - is this the right file name?")
+
 
 # Augmentation & reasoning for every scenario
-for i, scenario_worlds in enumerate(scenarios):
-    logger.info("Criticality reasoning on scenario " + str(i + 1) + "/" + str(len(scenarios)) + " (" +
+for i, (scenario_worlds, number_of_scenarios) in enumerate(read_scenarios()):
+    fine_worlds = []
+    if args.refine:
+        with telemetry.span("sampling", scenario=i + 1, scenes=len(scenario_worlds)):
+            scenario_worlds, fine_worlds = scene_sampler.split(scenario_worlds, args.hertz or 1)
+    if args.adaptive_sampling:
+        with telemetry.span("sampling", scenario=i + 1, scenes=len(scenario_worlds)):
+            scenario_worlds = scene_sampler.sample(scenario_worlds, *args.adaptive_sampling)
+    logger.info("Criticality reasoning on scenario " + str(i + 1) + "/" + str(number_of_scenarios) + " (" +
                 str(len(scenario_worlds)) + " scenes) ...")
 
-    scenario = criticality_recognition.reason_scenario(scenario_worlds, pellet_output=args.pellet_output,
-                                                       no_reasoning=args.convert_only, scenario_number=i + 1)
+    with telemetry.span("scenario", scenario=i + 1, scenes=len(scenario_worlds)):
+        scenario = criticality_recognition.reason_scenario(scenario_worlds, pellet_output=args.pellet_output,
+                                                           no_reasoning=args.convert_only, scenario_number=i + 1,
+                                                           projection=args.projection, cache=cache,
+                                                           native_rules=args.native_rules,
+                                                           incremental_augmentation=args.incremental_augmentation,
+                                                           profiler=profiler, window=args.window)
+
+    # Refining the time windows around the criticality phenomena & near-misses at the fine sampling rate
+    if args.refine and not args.convert_only:
+        with telemetry.span("refinement", scenario, scenario=i + 1):
+            windows = scene_sampler.get_refinement_windows(scenario, phenomena_extraction.phenomena_scenario(scenario),
+                                                           1 / (args.hertz or 1))
+            fine_worlds = scene_sampler.select(fine_worlds, windows)
+            logger.info("Refining " + str(len(windows)) + " time windows of scenario " + str(i + 1) + "/" +
+                        str(number_of_scenarios) + " (" + str(len(fine_worlds)) + " additional scenes) ...")
+            criticality_recognition.refine_scenario(scenario, fine_worlds, pellet_output=args.pellet_output,
+                                                    projection=args.projection, cache=cache,
+                                                    native_rules=args.native_rules,
+                                                    incremental_augmentation=args.incremental_augmentation,
+                                                    profiler=profiler, window=args.window, time_windows=windows)
+    for world in fine_worlds:
+        world.close()
 
     # Nicer scenario name for FUC 2.3
     if args.input == "fuc23":
@@ -92,18 +231,53 @@ for i, scenario_worlds in enumerate(scenarios):
             "Functional Use Case 2.3"
 
     # Printing inferences
-    cps = phenomena_extraction.phenomena_scenario(scenario)
+    with telemetry.span("phenomena extraction", scenario, scenario=i + 1):
+        cps = phenomena_extraction.to_records(phenomena_extraction.phenomena_scenario(scenario))
     cps_list = phenomena_extraction.list_cps(cps, args.format)
     if args.format != "none":
         print(cps_list)
 
-    # Saving OWL
+    # Saving the scenario
+    scenario_output_file = None
     if args.output:
-        if len(scenarios) > 1:
+        if number_of_scenarios > 1:
             number = "_" + str(i + 1)
         else:
             number = ""
-        scenario_owl_file = args.output.replace(".owl", "") + number + ".owl"
-        scenario.save(scenario_owl_file)
-        logger.info("Saved scenario " + str(i + 1) + "/" + str(len(scenarios)) + " to file://" + os.path.abspath(
-            scenario_owl_file))
+        output_format = args.output_format or scenario_file.get_format(args.output)
+        output_name, output_extension = os.path.splitext(args.output)
+        if output_extension == "" or scenario_file.get_format(args.output) != output_format:
+            # An explicit output format determines the extension (e.g. --output out.owl --output-format sqlite)
+            output_extension = scenario_file.FORMATS[output_format]
+        scenario_output_file = output_name + number + output_extension
+        with telemetry.span("snapshot", scenario, scenario=i + 1, format=output_format):
+            writer.save(scenario, scenario_output_file, output_format)
+
+    # Storing the criticality phenomena in the results database
+    if database is not None:
+        scenario_individuals = scenario.search(type=auto.get_ontology(auto.Ontology.Traffic_Model, scenario).Scenario)
+        if len(scenario_individuals) > 0 and scenario_individuals[0].identifier is not None:
+            scenario_name = str(scenario_individuals[0].identifier)
+        else:
+            scenario_name = None
+        if scenario_output_file is not None:
+            scenario_output_file = os.path.abspath(scenario_output_file)
+        source = os.path.abspath(args.input) if args.input.endswith(".hdf5") else args.input
+        with telemetry.span("database", scenario=i + 1, cps=len(cps)):
+            database.add_scenario(cps, number=i + 1, name=scenario_name, source=source, output=scenario_output_file)
+
+    # Freeing the scenario before reading the next one
+    for world in scenario_worlds:
+        world.close()
+    del scenario_worlds, fine_worlds, scenario, cps, cps_list
+    gc.collect()
+
+if writer is not None:
+    writer.close()
+if database is not None:
+    database.close()
+if cache is not None:
+    logger.info("Reasoning cache: " + str(cache.hits) + " hits, " + str(cache.misses) + " misses")
+if profiler is not None:
+    profiler.save(os.path.abspath(args.profile))
+    print(profiler.to_table())
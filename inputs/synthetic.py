@@ -0,0 +1,222 @@
+# Generates synthetic scenarios within A.U.T.O. (e.g. for benchmarking)
+
+import logging
+import random
+
+import owlready2
+from shapely import geometry
+
+from pyauto import auto
+
+# Logging
+logger = logging.getLogger(__name__)
+
+_LANE_WIDTH = 3  # m
+_SEGMENT_LENGTH = 50  # m, length of the road segments between two crossings
+_SOUTHERN_ROAD_LENGTH = 30  # m
+_SPEED_LIMIT = 30  # km/h
+
+
+def get_synthetic_worlds(scenes=3, vehicles=2, pedestrians=1, bicyclists=1, lanes=2, crossings=1, step=1.0, seed=0,
+                         folder="pyauto/auto") -> list:
+    """
+    Generates a synthetic scenario on a straight east-west road with the given number of lanes that is interrupted by
+    the given number of crossings, each connecting a road to the south and having a pedestrian crossing to its west.
+    Vehicles (the first one being automated) and bicyclists drive eastwards on random lanes with random constant
+    speeds, pedestrians walk northwards over the pedestrian crossings. The scenario is suited to be reasoned on by
+    criticality_recognition.reason_scenario().
+    :param scenes: The number of scenes.
+    :param vehicles: The number of vehicles (each with a driver).
+    :param pedestrians: The number of pedestrians.
+    :param bicyclists: The number of bicyclists (each with a bicycle).
+    :param lanes: The number of lanes of each road.
+    :param crossings: The number of crossings. Has to be at least one if there are pedestrians.
+    :param step: The time between two scenes (in s).
+    :param seed: The seed for the random positions and speeds, i.e. equal parameters generate equal scenarios.
+    :param folder: The folder to load A.U.T.O. from.
+    :return: A list of worlds, each world representing a single scene.
+    """
+    if pedestrians > 0 and crossings < 1:
+        raise ValueError("Pedestrians walk over the pedestrian crossings, but there are no crossings")
+    logger.info("Generating synthetic scenario with " + str(scenes) + " scenes, " + str(vehicles) + " vehicles, " +
+                str(pedestrians) + " pedestrians, " + str(bicyclists) + " bicyclists, " + str(lanes) + " lanes and " +
+                str(crossings) + " crossings")
+    rand = random.Random(seed)
+    width = lanes * _LANE_WIDTH
+    length = (crossings + 1) * _SEGMENT_LENGTH + crossings * width
+    # Initial state of the road users as (identifier, x, y, speed, yaw) with yaw in degrees
+    road_users = []
+    for i in range(vehicles):
+        lane = rand.randrange(lanes)
+        road_users.append(("Vehicle-#" + str(i + 1), rand.uniform(0, length / 2), (lane + 0.5) * _LANE_WIDTH,
+                           rand.uniform(5, 12), 0))
+    for i in range(bicyclists):
+        lane = rand.randrange(lanes)
+        road_users.append(("Bicyclist-#" + str(i + 1), rand.uniform(0, length / 2), (lane + 0.3) * _LANE_WIDTH,
+                           rand.uniform(3, 6), 0))
+    for i in range(pedestrians):
+        crossing = rand.randrange(crossings)
+        x = _crossing_x(crossing, width) - rand.uniform(0.5, _LANE_WIDTH - 0.5)
+        road_users.append(("Pedestrian-#" + str(i + 1), x, -rand.uniform(1, 4), rand.uniform(0.8, 1.8), 90))
+
+    worlds = []
+    for t in range(scenes):
+        world = owlready2.World()
+        auto.load_cp(folder=folder, world=world)
+        _populate_scene(world, t * step, road_users, lanes, crossings)
+        worlds.append(world)
+    return worlds
+
+
+def _crossing_x(crossing: int, width: float) -> float:
+    """
+    :return: The x-coordinate of the western border of the given crossing.
+    """
+    return (crossing + 1) * _SEGMENT_LENGTH + crossing * width
+
+
+def _add_geometry(ge: owlready2.Ontology, individual: owlready2.Thing, shape):
+    individual_geometry = ge.Geometry()
+    individual_geometry.asWKT = [shape.wkt]
+    individual.hasGeometry = [individual_geometry]
+
+
+def _add_lanes(ge: owlready2.Ontology, l1_core: owlready2.Ontology, road: owlready2.Thing, lanes: int, x1: float,
+               y1: float, x2: float, y2: float, vertical=False) -> list:
+    """
+    Adds the given number of driveable lanes to the road with the given bounding box, side by side along the road.
+    """
+    road_lanes = []
+    for i in range(lanes):
+        lane = l1_core.Driveable_Lane()
+        if vertical:
+            box = geometry.box(x1 + i * _LANE_WIDTH, y1, x1 + (i + 1) * _LANE_WIDTH, y2)
+        else:
+            box = geometry.box(x1, y1 + i * _LANE_WIDTH, x2, y1 + (i + 1) * _LANE_WIDTH)
+        _add_geometry(ge, lane, box)
+        lane.is_persistent = True
+        road_lanes.append(lane)
+    road.has_lane = road_lanes
+    return road_lanes
+
+
+def _populate_scene(world: owlready2.World, time: float, road_users: list, lanes: int, crossings: int):
+    """
+    Populates the given world with the scene at the given time.
+    """
+    # Shorthands
+    tm = auto.get_ontology(auto.Ontology.Traffic_Model, world)
+    ti = auto.get_ontology(auto.Ontology.Time, world)
+    ge = auto.get_ontology(auto.Ontology.GeoSPARQL, world)
+    l4_core = auto.get_ontology(auto.Ontology.L4_Core, world)
+    l4_de = auto.get_ontology(auto.Ontology.L4_DE, world)
+    l1_core = auto.get_ontology(auto.Ontology.L1_Core, world)
+    l1_de = auto.get_ontology(auto.Ontology.L1_DE, world)
+
+    scene = tm.Scene()
+    time_position = ti.TimePosition()
+    time_position.numericPosition = [time]
+    scene.inTimePosition.append(time_position)
+    scene.has_speed_limit = _SPEED_LIMIT
+    entities = []
+
+    # Create traffic infrastructure
+    width = lanes * _LANE_WIDTH
+    previous_lanes = []
+    previous_crossing = None
+    west = 0
+    for i in range(crossings + 1):
+        east = west + _SEGMENT_LENGTH
+        # Road segment
+        road = l1_de.Urban_Road()
+        _add_geometry(ge, road, geometry.box(west, 0, east, width))
+        road.is_persistent = True
+        if previous_crossing is not None:
+            previous_crossing.connects.append(road)
+        road_lanes = _add_lanes(ge, l1_core, road, lanes, west, 0, east, width)
+        for previous_lane, lane in zip(previous_lanes, road_lanes):
+            previous_lane.has_successor_lane = [lane]
+        previous_lanes = road_lanes
+        entities += [road] + road_lanes
+        if i < crossings:
+            # Pedestrian crossing at the end of the segment
+            pedestrian_crossing = l1_de.Pedestrian_Crossing()
+            pedestrian_crossing.has_road = road
+            _add_geometry(ge, pedestrian_crossing, geometry.box(east - _LANE_WIDTH, 0, east, width))
+            pedestrian_crossing.is_persistent = True
+            road.has_lane.append(pedestrian_crossing)
+            # Southern road
+            road_south = l1_de.Urban_Road()
+            _add_geometry(ge, road_south, geometry.box(east, -_SOUTHERN_ROAD_LENGTH, east + width, 0))
+            road_south.is_persistent = True
+            southern_lanes = _add_lanes(ge, l1_core, road_south, lanes, east, -_SOUTHERN_ROAD_LENGTH, east + width, 0,
+                                        vertical=True)
+            # Crossing, the next segment is connected to it as well
+            crossing = l1_de.Crossing()
+            crossing.connects = [road, road_south]
+            _add_geometry(ge, crossing, geometry.box(east, 0, east + width, width))
+            crossing.is_persistent = True
+            previous_crossing = crossing
+            entities += [pedestrian_crossing, road_south, crossing] + southern_lanes
+            west = east + width
+
+    # Create road users
+    for identifier, x, y, speed, yaw in road_users:
+        if yaw == 0:
+            x += speed * time
+        else:
+            y += speed * time
+        if identifier.startswith("Vehicle"):
+            vehicle = l4_de.Passenger_Car()
+            vehicle.identifier = identifier
+            vehicle.has_height = 1.5
+            _set_motion(vehicle, speed, yaw)
+            _add_geometry(ge, vehicle, geometry.box(x - 2.5, y - 1, x + 2.5, y + 1))
+            if identifier == "Vehicle-#1":
+                driver = l4_core.Automated_Driving_Function()
+            else:
+                driver = l4_core.Driver()
+            driver.identifier = identifier + "-Driver"
+            driver.has_horizontal_field_of_view = 3.14
+            driver.has_visibility_range = 50
+            _add_geometry(ge, driver, geometry.Point(x, y))
+            driver.drives = [vehicle]
+            vehicle.driven_by = [driver]
+            entities += [vehicle, driver]
+        elif identifier.startswith("Bicyclist"):
+            bicycle = l4_de.Bicycle()
+            bicycle.identifier = identifier + "-Bicycle"
+            bicycle.has_height = 1.5
+            _set_motion(bicycle, speed, yaw)
+            _add_geometry(ge, bicycle, geometry.box(x - 0.9, y - 0.3, x + 0.9, y + 0.3))
+            bicyclist = l4_de.Bicyclist()
+            bicyclist.identifier = identifier
+            bicyclist.has_horizontal_field_of_view = 3.14
+            bicyclist.has_visibility_range = 20
+            _add_geometry(ge, bicyclist, geometry.Point(x, y))
+            bicyclist.drives = [bicycle]
+            bicycle.driven_by = [bicyclist]
+            entities += [bicycle, bicyclist]
+        else:
+            pedestrian = l4_core.Pedestrian()
+            pedestrian.identifier = identifier
+            pedestrian.has_height = 1.8
+            pedestrian.has_horizontal_field_of_view = 3.14
+            pedestrian.has_visibility_range = 20
+            _set_motion(pedestrian, speed, yaw)
+            _add_geometry(ge, pedestrian, geometry.box(x - 0.25, y - 0.25, x + 0.25, y + 0.25))
+            entities.append(pedestrian)
+
+    # Register entities in scene
+    scene.has_traffic_entity = entities
+
+
+def _set_motion(individual: owlready2.Thing, speed: float, yaw: float):
+    # The velocity is given in the local frame of the individual, i.e. the heading is given by its yaw only
+    individual.has_yaw = yaw
+    individual.has_velocity_x = speed
+    individual.has_velocity_y = 0
+    individual.has_velocity_z = 0
+    individual.has_acceleration_x = 0
+    individual.has_acceleration_y = 0
+    individual.has_acceleration_z = 0
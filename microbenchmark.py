@@ -0,0 +1,287 @@
+import argparse
+import functools
+import json
+import logging
+import math
+import os
+import random
+import sys
+import timeit
+import types
+
+import owlready2
+from shapely import geometry
+
+from pyauto import auto
+from auto_extensions import physics, perception, l4_core, time
+from criticality_recognition import world_merger
+from inputs import synthetic
+
+logger = logging.getLogger(__name__)
+
+# Registered kernels as a dict from their names to a tuple of a setup function and whether the kernel modifies its
+# fixture. The setup function is called with the fixture size and returns the function to measure and a list of the
+# worlds it created for the fixture, which are closed after measuring.
+_KERNELS = dict()
+
+# The folder to load A.U.T.O. from for the fixtures.
+_auto_folder = "pyauto/auto"
+
+# The physics spatial predicates and Allen interval relations to measure (augmentation functions defined in
+# auto_extensions.physics and auto_extensions.time).
+_SPATIAL_PREDICATES = ["augment_is_in_proximity", "augment_is_near", "augment_intersects", "augment_overlaps",
+                       "augment_touches", "augment_within", "augment_disjoint", "augment_crosses", "augment_contains",
+                       "augment_is_behind", "augment_is_left_of", "augment_is_right_of", "augment_is_in_front_of"]
+_INTERVAL_RELATIONS = ["augment_interval_after", "augment_interval_before", "augment_interval_contains",
+                       "augment_interval_during", "augment_interval_equals", "augment_interval_finishes",
+                       "augment_interval_meets", "augment_interval_overlaps", "augment_interval_starts"]
+
+
+def kernel(name: str, modifies=False):
+    """
+    Registers a kernel under the given name.
+    :param name: The name of the kernel.
+    :param modifies: Whether the kernel modifies its fixture, i.e. the fixture needs to be set up for each run.
+    """
+    def decorator(setup):
+        _KERNELS[name] = (setup, modifies)
+        return setup
+    return decorator
+
+
+class _Geometric:
+    """
+    A fixture with a geometry, standing in for an individual with a hasGeometry WKT literal.
+    """
+    def __init__(self, shape):
+        self.hasGeometry = [types.SimpleNamespace(asWKT=[shape.wkt])]
+
+
+def _get_boxes(size: int, rand: random.Random, distance=5, radius=40) -> list:
+    """
+    :return: The given number of randomly placed and rotated vehicle-sized boxes around the origin, each together with
+    its heading (yaw in degrees).
+    """
+    boxes = []
+    for _ in range(size):
+        angle = rand.uniform(0, 2 * math.pi)
+        r = rand.uniform(distance, radius)
+        box = geometry.box(-2.25, -0.9, 2.25, 0.9)
+        box = geometry.Polygon([(x * math.cos(angle) - y * math.sin(angle) + r * math.cos(angle),
+                                 x * math.sin(angle) + y * math.cos(angle) + r * math.sin(angle))
+                                for x, y in box.exterior.coords])
+        boxes.append((box, math.degrees(angle)))
+    return boxes
+
+
+@functools.lru_cache(maxsize=None)
+def _get_scene(size: int):
+    """
+    :return: A synthetic scene with (roughly) the given number of road users and the physics and time augmentations
+    registered, and the given number of time intervals.
+    """
+    world = synthetic.get_synthetic_worlds(scenes=1, vehicles=size, pedestrians=size // 4, bicyclists=size // 4,
+                                           folder=_auto_folder)[0]
+    ph = auto.get_ontology(auto.Ontology.Physics, world)
+    ti = auto.get_ontology(auto.Ontology.Time, world)
+    physics.register(physics=ph)
+    time.register(time=ti)
+    rand = random.Random(size)
+    intervals = []
+    for _ in range(size):
+        beginning = rand.randrange(10)
+        interval = ti.Interval()
+        for prop, position in [("hasBeginning", beginning), ("hasEnd", beginning + rand.randrange(1, 10))]:
+            instant = ti.Instant()
+            time_position = ti.TimePosition()
+            time_position.numericPosition = [position]
+            instant.inTimePosition = [time_position]
+            setattr(interval, prop, [instant])
+        intervals.append(interval)
+    return world, list(world.search(type=ph.Spatial_Object)), intervals
+
+
+def _spatial_predicate(name: str, size: int):
+    _, objects, _ = _get_scene(size)
+    return lambda: [getattr(x, name)(y) for x in objects for y in objects], []
+
+
+def _interval_relation(name: str, size: int):
+    _, _, intervals = _get_scene(size)
+    return lambda: [getattr(x, name)(y) for x in intervals for y in intervals], []
+
+
+for predicate in _SPATIAL_PREDICATES:
+    kernel("physics." + predicate)(functools.partial(_spatial_predicate, predicate))
+for relation in _INTERVAL_RELATIONS:
+    kernel("time." + relation)(functools.partial(_interval_relation, relation))
+
+
+@kernel("physics.has_intersecting_path")
+def _has_intersecting_path(size: int):
+    rand = random.Random(size)
+    states = [(geometry.Point(rand.uniform(0, 100), rand.uniform(0, 100)), rand.uniform(0, 360), rand.uniform(-2, 15))
+              for _ in range(size)]
+    return lambda: [physics.has_intersecting_path(p_1, yaw_1, speed_1, p_2, yaw_2, speed_2) for p_1, yaw_1, speed_1
+                    in states for p_2, yaw_2, speed_2 in states if speed_1 != 0 and speed_2 != 0], []
+
+
+@kernel("l4_core.get_relevant_area_veh")
+def _get_relevant_area_veh(size: int):
+    rand = random.Random(size)
+    vehicles = [(box, rand.uniform(1, 15), yaw) for box, yaw in _get_boxes(size, rand)]
+    return lambda: [l4_core.get_relevant_area_veh(box, speed, yaw, 25, 45) for box, speed, yaw in vehicles], []
+
+
+@kernel("l4_core._rec_ids")
+def _rec_ids(size: int):
+    # A fresh world, as the chain of identical vehicles would change the scene shared by the other kernels
+    world = owlready2.World()
+    auto.load_cp(folder=_auto_folder, world=world)
+    l4_de = auto.get_ontology(auto.Ontology.L4_DE, world)
+    chain = [l4_de.Passenger_Car()]
+    for _ in range(size - 1):
+        vehicle = l4_de.Passenger_Car()
+        vehicle.identical_to = [chain[-1]]
+        chain.append(vehicle)
+    return lambda: l4_core._rec_ids(chain[-1]), [world]
+
+
+@kernel("perception.get_occluded_areas")
+def _get_occluded_areas(size: int):
+    others = [_Geometric(box) for box, _ in _get_boxes(size, random.Random(size))]
+    fov = geometry.Point(0, 0).buffer(50)
+    return lambda: perception.get_occluded_areas(others, fov, 50), []
+
+
+@kernel("perception.get_occlusions")
+def _get_occlusions(size: int):
+    others = [_Geometric(box) for box, _ in _get_boxes(size, random.Random(size))]
+    fov = geometry.Point(0, 0).buffer(50)
+    cutoffs = perception.get_occluded_areas(others, fov, 50)
+    return lambda: perception.get_occlusions(others, cutoffs, fov), []
+
+
+@kernel("world_merger.merge", modifies=True)
+def _merge(size: int):
+    worlds = synthetic.get_synthetic_worlds(scenes=2, vehicles=size, pedestrians=size // 4, bicyclists=size // 4,
+                                            folder=_auto_folder)
+    return lambda: world_merger.merge(worlds[0], worlds[1], add_temporal_identity=False), worlds
+
+
+@kernel("world_merger.add_temporal_identity", modifies=True)
+def _add_temporal_identity(size: int):
+    worlds = synthetic.get_synthetic_worlds(scenes=3, vehicles=size, pedestrians=size // 4, bicyclists=size // 4,
+                                            folder=_auto_folder)
+    for world in worlds[1:]:
+        world_merger.merge(worlds[0], world, add_temporal_identity=False)
+    return lambda: world_merger.add_temporal_identity(worlds[0]), worlds
+
+
+def measure(name: str, size: int, repetitions: int) -> float:
+    """
+    Measures the given kernel on a fixture of the given size.
+    :return: The minimal time of the given number of runs (in s).
+    """
+    setup, modifies = _KERNELS[name]
+    times = []
+    run = None
+    worlds = []
+    try:
+        for _ in range(repetitions):
+            if run is None or modifies:
+                _close(worlds)
+                worlds = []
+                run, worlds = setup(size)
+            t1 = timeit.default_timer()
+            run()
+            times.append(timeit.default_timer() - t1)
+    finally:
+        _close(worlds)
+    return min(times)
+
+
+def calibrate(repetitions: int) -> float:
+    """
+    Measures a fixed workload of Python code and geometry operations (like the kernels). Results are stored relative
+    to its time, such that a baseline can be compared across runs on machines of different speed.
+    :return: The minimal time of the given number of runs (in s).
+    """
+    def run():
+        return [geometry.Point(i, i % 7).buffer(1).intersection(geometry.box(i, 0, i + 1, 1)).area for i in range(2000)]
+    return min(timeit.repeat(run, number=1, repeat=repetitions))
+
+
+def _close(worlds: list):
+    """
+    Closes the given fixture worlds (and thereby frees their quadstores).
+    """
+    for world in worlds:
+        world.close()
+
+
+if __name__ == "__main__":
+    # Instantiate the parser
+    parser = argparse.ArgumentParser(description="Microbenchmarks of the hot functions of augmentation and merging on "
+                                                 "fixtures of controlled size. Compares the results against a local "
+                                                 "baseline file and fails if a kernel got slower by more than the "
+                                                 "given ratio. Times are stored relative to the time of a fixed "
+                                                 "calibration workload, i.e. in multiples of it.")
+    parser.add_argument("--auto", type=str, default="pyauto/auto", metavar="FOLDER_PATH",
+                        help="Path to A.U.T.O. ontology folder. Default: pyauto/auto")
+    parser.add_argument("--kernels", type=str, nargs="+", metavar="NAME", help="The kernels (or prefixes, e.g. "
+                                                                               "\"physics\") to run. Default: all")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 40], metavar="N", help="The fixture sizes (number "
+                                                                                            "of objects). Default: 10 "
+                                                                                            "40")
+    parser.add_argument("--repetitions", type=int, default=5, metavar="N", help="Number of runs of each kernel, the "
+                                                                                "fastest one is recorded. Default: 5")
+    parser.add_argument("--baseline", type=str, default="outputs/microbenchmark_baseline.json", metavar="FILE",
+                        help="The baseline file. Default: outputs/microbenchmark_baseline.json")
+    parser.add_argument("--threshold", type=float, default=1.5, metavar="N", help="Maximum ratio of the time of a "
+                                                                                  "kernel to its baseline. Default: "
+                                                                                  "1.5")
+    parser.add_argument("--update", action="store_true", help="If flag is set, stores the results in the baseline "
+                                                              "file (created if it does not exist) instead of "
+                                                              "comparing against it")
+    args = parser.parse_args()
+    _auto_folder = args.auto
+
+    logging.basicConfig(format="%(asctime)s %(levelname)s  %(message)s", datefmt="%H:%M:%S", level=logging.WARNING)
+    logging.getLogger("shapely.geos").setLevel(logging.WARNING)
+
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    else:
+        baseline = dict()
+
+    names = [x for x in _KERNELS.keys() if not args.kernels or any(x.startswith(k) for k in args.kernels)]
+    unit = calibrate(args.repetitions)
+    print("Calibration workload: %.3f ms" % (unit * 1000))
+    results = dict()
+    regressions = []
+    print("%-50s %6s %12s %12s %12s %8s" % ("Kernel", "Size", "Time (ms)", "Relative", "Base", "Ratio"))
+    for name in names:
+        for size in args.sizes:
+            key = name + "[" + str(size) + "]"
+            t = measure(name, size, args.repetitions)
+            results[key] = t / unit
+            if key in baseline and baseline[key] > 0:
+                ratio = results[key] / baseline[key]
+                print("%-50s %6d %12.3f %12.3f %12.3f %8.2f" % (name, size, t * 1000, results[key], baseline[key],
+                                                                 ratio))
+                if ratio > args.threshold:
+                    regressions.append(key)
+            else:
+                print("%-50s %6d %12.3f %12.3f %12s %8s" % (name, size, t * 1000, results[key], "-", "-"))
+
+    if args.update:
+        baseline.update(results)
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print("Stored " + str(len(results)) + " results in baseline " + os.path.abspath(args.baseline))
+    elif len(regressions) > 0:
+        print("Kernels slower than " + str(args.threshold) + " times their baseline: " + ", ".join(regressions))
+        sys.exit(1)
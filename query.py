@@ -0,0 +1,55 @@
+import argparse
+import itertools
+import logging
+import os
+
+from criticality_recognition import phenomena_extraction, results_database
+
+# Instantiate the parser
+parser = argparse.ArgumentParser(description="Queries the criticality phenomena stored in a results database by "
+                                             "infer.py --database, across scenarios and runs.")
+parser.add_argument("--cp", type=str, metavar="CLASS", help="Optional. The class of the criticality phenomena, either "
+                                                           "its name (e.g. CP_150) or its IRI")
+parser.add_argument("--actor", type=str, nargs="+", metavar="CLASS", help="Optional. Class labels or names of actors "
+                                                                         "(e.g. Pedestrian Truck), each of which has "
+                                                                         "to be some subject or object of the "
+                                                                         "criticality phenomena. Class labels only "
+                                                                         "match the most specific classes of actors, "
+                                                                         "not their superclasses")
+parser.add_argument("--subject", type=str, metavar="CLASS", help="Optional. A class label or name of some subject of "
+                                                                "the criticality phenomena (most specific classes "
+                                                                "only, see --actor)")
+parser.add_argument("--object", type=str, metavar="CLASS", help="Optional. A class label or name of some object of "
+                                                               "the criticality phenomena (most specific classes "
+                                                               "only, see --actor)")
+parser.add_argument("--start", type=float, metavar="N", help="Optional. Only criticality phenomena ending at or after "
+                                                             "this time (in s)")
+parser.add_argument("--end", type=float, metavar="N", help="Optional. Only criticality phenomena starting at or before "
+                                                           "this time (in s)")
+parser.add_argument("--scenario", type=str, metavar="NAME", help="Optional. The name or source file of the scenarios")
+parser.add_argument("--format", type=str, default="natural", metavar="{csv, natural, count}",
+                    help="How to print the criticality phenomena. Default: natural")
+parser.add_argument("database", type=str, metavar="FILE", help="The SQLite results database")
+args = parser.parse_args()
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(format="%(asctime)s %(levelname)s  %(message)s", datefmt="%H:%M:%S")
+
+if not os.path.isfile(args.database):
+    logger.error("No results database found at " + os.path.abspath(args.database))
+    exit(1)
+
+database = results_database.Results_Database(args.database)
+results = database.query(cp_cls=args.cp, actors=args.actor, subject=args.subject, obj=args.object, start=args.start,
+                         end=args.end, scenario=args.scenario)
+database.close()
+
+if args.format == "count":
+    print(len(results))
+else:
+    # Listing the criticality phenomena grouped by their scenario (names and sources may repeat across runs)
+    for _, scenario_results in itertools.groupby(results, key=lambda x: x[0]):
+        scenario_results = list(scenario_results)
+        _, name, source, _ = scenario_results[0]
+        print("Scenario " + str(name) + " (" + str(source) + "):")
+        print(phenomena_extraction.list_cps([x[3] for x in scenario_results], args.format))
@@ -0,0 +1,75 @@
+import owlready2
+import pytest
+
+from criticality_recognition import augmentation_planner
+
+
+@pytest.fixture
+def world():
+    world = owlready2.World()
+    yield world
+    world.close()
+
+
+def _function(world, cls, name, func, **attributes):
+    func.__dict__.update(attributes)
+    return augmentation_planner.Augmentation_Function(world, cls, name, func)
+
+
+def test_schedule_orders_writers_before_readers(world):
+    physics = world.get_ontology("http://example.org/physics.owl")
+    perception = world.get_ontology("http://example.org/perception.owl")
+    with physics:
+        class Spatial_Object(owlready2.Thing):
+            pass
+
+        class is_near(Spatial_Object >> Spatial_Object):
+            pass
+    with perception:
+        class Observer(Spatial_Object):
+            pass
+
+        class Is_Occlusion(owlready2.Thing):
+            pass
+
+    def augment_is_near(self, other: Spatial_Object):
+        pass
+
+    def augment_observer(self, other: Spatial_Object):
+        pass
+
+    writer = _function(world, Spatial_Object, "augment_is_near", augment_is_near, _property="is_near")
+    reader = _function(world, Observer, "augment_observer", augment_observer, _class=Is_Occlusion)
+    assert writer.writes == {is_near}
+    assert reader.reads == {Observer, Spatial_Object}
+    assert reader.depends_on(writer) and not writer.depends_on(reader)
+    assert augmentation_planner.schedule([writer, reader], [perception, physics]) == [physics, perception]
+    assert augmentation_planner.schedule([writer, reader], [physics, perception]) == [physics, perception]
+
+
+def test_schedule_keeps_order_of_cycles(world):
+    first = world.get_ontology("http://example.org/first.owl")
+    second = world.get_ontology("http://example.org/second.owl")
+    with first:
+        class A(owlready2.Thing):
+            pass
+
+        class to_b(owlready2.ObjectProperty):
+            pass
+    with second:
+        class B(owlready2.Thing):
+            pass
+
+        class to_a(owlready2.ObjectProperty):
+            pass
+
+    def augment_a(self, other: B):
+        pass
+
+    def augment_b(self, other: A):
+        pass
+
+    f = _function(world, A, "augment_a", augment_a, _property="to_b")
+    g = _function(world, B, "augment_b", augment_b, _property="to_a")
+    assert f.depends_on(g) and g.depends_on(f)
+    assert augmentation_planner.schedule([f, g], [second, first]) == [second, first]
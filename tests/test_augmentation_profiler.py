@@ -0,0 +1,32 @@
+import pytest
+from shapely import wkt
+
+from criticality_recognition import augmentation_profiler
+
+
+def test_parses_are_counted_during_calls_only():
+    profiler = augmentation_profiler.Augmentation_Profiler()
+    loads = wkt.loads
+
+    def augment(self, other):
+        return wkt.loads(self).distance(wkt.loads(other)) < 1
+
+    assert profiler._call("Spatial_Object.augment", augment, "POINT (0 0)", "POINT (0 0.5)") is True
+    assert profiler._call("Spatial_Object.augment", augment, "POINT (0 0)", "POINT (0 2)") is False
+    assert wkt.loads is loads
+    statistics = profiler.to_dict()["Spatial_Object.augment"]
+    assert (statistics["calls"], statistics["true"], statistics["false"], statistics["geometry_parses"]) == (2, 1, 1, 4)
+
+
+def test_parser_is_restored_on_errors():
+    profiler = augmentation_profiler.Augmentation_Profiler()
+    loads = wkt.loads
+
+    def augment(self):
+        wkt.loads(self)
+        raise ValueError("Failing augmentation")
+
+    with pytest.raises(ValueError):
+        profiler._call("Spatial_Object.augment", augment, "POINT (0 0)")
+    assert wkt.loads is loads
+    assert profiler.to_dict()["Spatial_Object.augment"]["geometry_parses"] == 1
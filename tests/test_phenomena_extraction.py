@@ -0,0 +1,69 @@
+import os
+
+import owlready2
+import pytest
+
+phenomena_extraction = pytest.importorskip("criticality_recognition.phenomena_extraction", exc_type=ImportError)
+
+ABOX = os.path.join(os.path.dirname(__file__), os.pardir, "outputs", "fuc_2_3_inferences.owl")
+CP = "http://purl.org/auto/criticality_phenomena#"
+
+
+@pytest.fixture(scope="module")
+def world():
+    """
+    The stored FUC 2.3 scenario with some of its individuals typed as criticality phenomena, as done by reasoning: the
+    occlusions as scene CPs with extraction code, a vehicle with an intersecting path as scene CP without subject
+    extraction code and an activity as scenario CP.
+    """
+    world = owlready2.World()
+    world.get_ontology("file://" + os.path.abspath(ABOX)).load()
+    tm = world.get_namespace("http://purl.org/auto/traffic_model#")
+    ac = world.get_namespace("http://purl.org/auto/act#")
+    ph = world.get_namespace("http://purl.org/auto/physics#")
+    scenes = sorted(world.search(type=tm.Scene), key=str)
+    onto = world.get_ontology("http://example.org/cps.owl#")
+    with onto:
+        for occlusion in world.search(is_occluded_by="*"):
+            occlusion.is_a.append(world[CP + "CP_157"])
+        vehicles = sorted(world.search(in_traffic_model=scenes[1], type=ph.Dynamical_Object), key=str)[:2]
+        vehicles[0].has_intersecting_path = vehicles[1:]
+        vehicles[0].is_a.append(world[CP + "CP_293"])
+        activity = ac.Activity("activity_1", in_traffic_model=list(world.search(type=tm.Scenario)))
+        activity.is_a.append(world[CP + "CP_140"])
+        activity.conducted_by = vehicles[:1]
+        activity.has_participant = vehicles
+    yield world
+    world.close()
+
+
+@pytest.fixture(scope="module")
+def cps(world):
+    cps = phenomena_extraction.phenomena_scenario(world)
+    assert {str(cp.cp_cls).split(".")[-1] for cp in cps} == {"CP_157", "CP_293", "CP_140"}
+    return cps
+
+
+@pytest.mark.parametrize("output_format", ["natural", "csv"])
+def test_records_list_equal_to_cps(world, cps, output_format):
+    records = phenomena_extraction.to_records(cps)
+    assert phenomena_extraction.list_cps(records, output_format) == phenomena_extraction.list_cps(cps, output_format)
+    assert phenomena_extraction.list_cps(records, output_format, world, True) == \
+        phenomena_extraction.list_cps(cps, output_format, world, True)
+
+
+def test_records_round_trip(cps):
+    records = phenomena_extraction.to_records(cps)
+    for record, cp in zip(records, cps):
+        copy = phenomena_extraction.Criticality_Phenomenon_Record.from_dict(record.to_dict())
+        assert copy.to_dict() == record.to_dict()
+        assert str(copy) == str(cp)
+        assert copy.to_csv() == cp.to_csv()
+
+
+def test_records_representable_in_scenes(world, cps):
+    tm = world.get_namespace("http://purl.org/auto/traffic_model#")
+    records = phenomena_extraction.to_records(cps)
+    for scene in world.search(type=tm.Scene):
+        assert [x.is_representable_in_scene(scene) for x in records] == [x.is_representable_in_scene(scene)
+                                                                          for x in cps]
@@ -0,0 +1,73 @@
+import io
+
+import owlready2
+import pytest
+
+from criticality_recognition import pellet
+from criticality_recognition.reasoning_cache import Reasoning_Cache
+
+
+def _make_world(names, speed=3.0):
+    """
+    Creates a small A-Box of three vehicles following each other, with individuals named by the given names.
+    """
+    world = owlready2.World()
+    onto = world.get_ontology("http://example.org/scene.owl#")
+    with onto:
+        class Vehicle(owlready2.Thing):
+            pass
+
+        class follows(Vehicle >> Vehicle):
+            pass
+
+        class has_speed(Vehicle >> float, owlready2.FunctionalProperty):
+            pass
+
+        a, b, c = (Vehicle(name) for name in names)
+        a.follows = [b]
+        b.follows = [c]
+        a.has_speed = 1.0
+        b.has_speed = 2.0
+        c.has_speed = speed
+    return world
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return Reasoning_Cache(str(tmp_path))
+
+
+def test_key_invariant_under_naming(cache):
+    world_1 = _make_world(["a", "b", "c"])
+    world_2 = _make_world(["car", "truck", "bike"])
+    key_1, labels_1 = cache.key(world_1, pellet.iter_triples(world_1))
+    key_2, labels_2 = cache.key(world_2, pellet.iter_triples(world_2))
+    assert key_1 == key_2
+    assert all(label.startswith("#") for label in labels_1.values())
+    assert sorted(labels_1.values()) == sorted(labels_2.values())
+
+
+def test_key_sensitive_to_changed_triple(cache):
+    world_1 = _make_world(["a", "b", "c"])
+    world_2 = _make_world(["a", "b", "c"], speed=4.0)
+    assert cache.key(world_1, pellet.iter_triples(world_1))[0] != cache.key(world_2, pellet.iter_triples(world_2))[0]
+
+
+def test_key_sensitive_to_changed_link(cache):
+    world_1 = _make_world(["a", "b", "c"])
+    world_2 = _make_world(["a", "b", "c"])
+    b, c = world_2.search_one(iri="*#b"), world_2.search_one(iri="*#c")
+    b.follows = []
+    c.follows = [b]
+    assert cache.key(world_1, pellet.iter_triples(world_1))[0] != cache.key(world_2, pellet.iter_triples(world_2))[0]
+
+
+def test_key_while_streaming_ntriples(cache):
+    world = _make_world(["a", "b", "c"])
+    streamed = io.BytesIO()
+    key, labels = cache.key(world, pellet.stream_ntriples(world, streamed))
+    written = io.BytesIO()
+    nb_triples = pellet.write_ntriples(world, written)
+    assert (key, labels) == cache.key(world, pellet.iter_triples(world))
+    assert streamed.getvalue() == written.getvalue()
+    assert streamed.getvalue().count(b"\n") == nb_triples > 0
@@ -0,0 +1,69 @@
+import pytest
+
+results_database = pytest.importorskip("criticality_recognition.results_database", exc_type=ImportError)
+from criticality_recognition.phenomena_extraction import Criticality_Phenomenon_Record
+
+CP = "http://purl.org/auto/l4_core#"
+SCENE = "http://example.org/scenario.owl#"
+
+PEDESTRIAN = (SCENE + "ped_1", "ped_1", ("Pedestrian",))
+TRUCK = (SCENE + "truck_1", "truck_1", ("Truck",))
+CAR = (SCENE + "car_1", "car_1", ("Passenger_Car", "Ego"))
+
+
+def _record(name, cp_cls, time, subjects, objects=()):
+    return Criticality_Phenomenon_Record(SCENE + name, CP + cp_cls, cp_cls + " (some label)", time, subjects, objects,
+                                         frozenset({SCENE + "scene_0"}))
+
+
+RECORDS = [
+    _record("cp_1", "CP_150", (0.0, 1.0), (CAR,), (("objects", (PEDESTRIAN,)),)),
+    _record("cp_2", "CP_150", (2.0, 4.0), (TRUCK,), (("objects", (PEDESTRIAN, CAR)),)),
+    _record("cp_3", "CP_042", 3.0, (PEDESTRIAN,))
+]
+
+
+@pytest.fixture
+def database(tmp_path):
+    database = results_database.Results_Database(str(tmp_path / "results.db"), command="infer.py test")
+    database.add_scenario(RECORDS, number=1, name="scenario", source="a.hdf5", output="a.owl")
+    # Same name and source as the first scenario, e.g. from a second run on the same input
+    database.add_scenario(RECORDS[:1], number=1, name="scenario", source="a.hdf5", output="b.owl")
+    database.add_scenario(RECORDS[2:], number=2, name="other", source="b.hdf5")
+    yield database
+    database.close()
+
+
+def _cps(results):
+    return [(scenario, record.cp) for scenario, _, _, record in results]
+
+
+def test_round_trip(database):
+    results = database.query(scenario="b.hdf5")
+    assert [record.to_dict() for _, _, _, record in results] == [RECORDS[2].to_dict()]
+    assert str(results[0][3]) == str(RECORDS[2])
+    results = database.query(scenario="scenario")
+    assert [record.to_dict() for _, _, _, record in results] == [x.to_dict() for x in RECORDS + RECORDS[:1]]
+
+
+def test_scenarios_are_distinguished_by_id(database):
+    results = database.query(cp_cls="CP_150")
+    assert _cps(results) == [(1, SCENE + "cp_1"), (1, SCENE + "cp_2"), (2, SCENE + "cp_1")]
+    assert {name for _, name, _, _ in results} == {"scenario"}
+
+
+@pytest.mark.parametrize("filters, cps", [
+    ({"cp_cls": CP + "CP_042"}, [(1, "cp_3"), (3, "cp_3")]),
+    ({"actors": ["Pedestrian", "Truck"]}, [(1, "cp_2")]),
+    ({"actors": ["car_1"]}, [(1, "cp_1"), (1, "cp_2"), (2, "cp_1")]),
+    ({"actors": ["Ego"], "start": 1.5}, [(1, "cp_2")]),
+    ({"subject": "Pedestrian"}, [(1, "cp_3"), (3, "cp_3")]),
+    ({"obj": "Pedestrian"}, [(1, "cp_1"), (1, "cp_2"), (2, "cp_1")]),
+    ({"start": 3.5}, [(1, "cp_2")]),
+    ({"end": 1.0}, [(1, "cp_1"), (2, "cp_1")]),
+    ({"start": 3.0, "end": 3.0, "scenario": "scenario"}, [(1, "cp_2"), (1, "cp_3")]),
+    # Actors are only stored with their most specific classes
+    ({"actors": ["Vehicle"]}, []),
+])
+def test_filters(database, filters, cps):
+    assert _cps(database.query(**filters)) == [(scenario, SCENE + cp) for scenario, cp in cps]
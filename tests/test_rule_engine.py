@@ -0,0 +1,47 @@
+import os
+import shutil
+
+import owlready2
+import pytest
+
+from criticality_recognition import pellet, rule_engine
+
+ABOX = os.path.join(os.path.dirname(__file__), os.pardir, "outputs", "fuc_2_3_no_inferences.owl")
+
+
+def _reason(native_rules: bool) -> tuple:
+    """
+    Reasons on the stored FUC 2.3 A-Box until no new facts are inferred, as criticality_recognition does.
+    :return: A tuple of the facts (see rule_engine.get_facts()) and the number of rules evaluated by the rule engine.
+    """
+    world = owlready2.World()
+    world.get_ontology("file://" + os.path.abspath(ABOX)).load()
+    rules = rule_engine.get_rules(world) if native_rules else []
+    exclude_entities = rule_engine.get_rule_storids(world, rules) if native_rules else None
+    run_pellet = True
+    while run_pellet:
+        pellet.sync_reasoner_pellet(world, infer_property_values=True, exclude_entities=exclude_entities)
+        run_pellet = len(rules) > 0 and rule_engine.materialize(world, rules) > 0
+    facts = rule_engine.get_facts(world)
+    world.close()
+    return facts, len(rules)
+
+
+@pytest.mark.skipif(shutil.which(owlready2.JAVA_EXE) is None, reason="Pellet needs Java")
+def test_native_rules_reach_pellet_fixpoint():
+    baseline, _ = _reason(native_rules=False)
+    native, nb_rules = _reason(native_rules=True)
+    assert nb_rules > 0
+    assert sorted(native - baseline) == []
+    assert sorted(baseline - native) == []
+
+
+def test_supported_rules():
+    world = owlready2.World()
+    world.get_ontology("file://" + os.path.abspath(ABOX)).load()
+    rules = rule_engine.get_rules(world)
+    storids = rule_engine.get_rule_storids(world, rules)
+    assert 0 < len(rules) <= len(list(world.rules()))
+    assert {rule.imp.storid for rule in rules} <= storids
+    assert all(x < 0 for x in storids - {rule.imp.storid for rule in rules})
+    world.close()
@@ -0,0 +1,50 @@
+import os
+
+import owlready2
+import pytest
+
+from criticality_recognition import scenario_file
+
+
+@pytest.fixture
+def world():
+    world = owlready2.World()
+    onto = world.get_ontology("http://example.org/scenario.owl")
+    with onto:
+        class Vehicle(owlready2.Thing):
+            pass
+
+        class follows(Vehicle >> Vehicle):
+            pass
+
+        class speed(Vehicle >> float):
+            pass
+    first, second = Vehicle("first"), Vehicle("second")
+    second.follows = [first]
+    first.speed, second.speed = [8.5], [10.0]
+    yield world
+    world.close()
+
+
+@pytest.mark.parametrize("file_format", sorted(scenario_file.FORMATS))
+def test_writer_round_trip(world, tmp_path, file_format):
+    file = str(tmp_path / ("scenario" + scenario_file.FORMATS[file_format]))
+    writer = scenario_file.Scenario_Writer()
+    writer.save(world, file)
+    writer.close()
+    assert sorted(os.listdir(tmp_path)) == [os.path.basename(file)]
+    loaded = scenario_file.load(file)
+    assert {str(x) for x in loaded.individuals()} == {"scenario.first", "scenario.second"}
+    assert loaded.search_one(iri="http://example.org/scenario.owl#second").follows[0].name == "first"
+    assert {x.speed[0] for x in loaded.individuals()} == {8.5, 10.0}
+
+
+def test_writer_errors(world, tmp_path):
+    writer = scenario_file.Scenario_Writer()
+    writer.save(world, str(tmp_path / "scenario.owl"))
+    os.mkdir(tmp_path / "directory.owl")
+    writer.save(world, str(tmp_path / "directory.owl"))
+    with pytest.raises(RuntimeError, match="Saving 1 scenario"):
+        writer.close()
+    assert os.path.exists(tmp_path / "scenario.owl")
+    assert sorted(os.listdir(tmp_path)) == ["directory.owl", "scenario.owl"]
@@ -0,0 +1,54 @@
+import owlready2
+import pytest
+
+scene_sampler = pytest.importorskip("criticality_recognition.scene_sampler", exc_type=ImportError)
+
+
+@pytest.fixture
+def actor():
+    world = owlready2.World()
+    onto = world.get_ontology("http://example.org/actors.owl")
+    with onto:
+        class Geometry(owlready2.Thing):
+            pass
+
+        class Actor(owlready2.Thing):
+            pass
+
+        class hasGeometry(Actor >> Geometry):
+            pass
+
+        class asWKT(Geometry >> str):
+            pass
+
+        for name in ["has_yaw", "has_velocity_x", "has_velocity_y"]:
+            type(name, (Actor >> float, owlready2.FunctionalProperty), {})
+
+    def create(x, y, yaw=None, velocity=None):
+        individual = Actor(hasGeometry=[Geometry(asWKT=["POINT (%s %s)" % (x, y)])])
+        if yaw is not None:
+            individual.has_yaw = yaw
+            individual.has_velocity_x, individual.has_velocity_y = velocity
+        return individual
+    yield create
+    world.close()
+
+
+def test_near_miss_by_distance(actor):
+    assert scene_sampler._is_near_miss(actor(0, 0), actor(1.5, 0), 2, 1.5)
+    assert not scene_sampler._is_near_miss(actor(0, 0), actor(3, 0), 2, 1.5)
+
+
+def test_near_miss_by_time_to_collision(actor):
+    # 10 m apart, approaching each other head-on with 5 m/s each
+    assert scene_sampler._is_near_miss(actor(0, 0, 0, (5, 0)), actor(10, 0, 180, (5, 0)), 2, 1.5)
+    # Velocities are local, i.e. a yaw of 180 degrees and a positive velocity moves away
+    assert not scene_sampler._is_near_miss(actor(0, 0, 180, (5, 0)), actor(10, 0, 0, (5, 0)), 2, 1.5)
+    # Approaching, but not within the time to collision threshold
+    assert not scene_sampler._is_near_miss(actor(0, 0, 0, (2, 0)), actor(10, 0), 2, 1.5)
+    # Passing by in parallel
+    assert not scene_sampler._is_near_miss(actor(0, 0, 90, (10, 0)), actor(10, 0, 90, (10, 0)), 2, 1.5)
+
+
+def test_no_near_miss_without_geometry(actor):
+    assert not scene_sampler._is_near_miss(actor(0, 0).hasGeometry[0], actor(0, 0), 2, 1.5)
@@ -0,0 +1,80 @@
+import logging
+import os
+
+import owlready2
+import pytest
+
+temporal_reduction = pytest.importorskip("criticality_recognition.temporal_reduction", exc_type=ImportError)
+
+ABOX = os.path.join(os.path.dirname(__file__), os.pardir, "outputs", "fuc_2_3_no_inferences.owl")
+
+
+@pytest.fixture(scope="module")
+def world():
+    world = owlready2.World()
+    world.get_ontology("file://" + os.path.abspath(ABOX)).load()
+    yield world
+    world.close()
+
+
+@pytest.mark.parametrize("number_of_scenes, size, starts", [
+    (10, 4, [0, 2, 4, 6]),
+    (12, 5, [0, 3, 6, 7]),
+    (11, 4, [0, 2, 4, 6, 7]),
+    (5, 1, [0, 1, 2, 3, 4]),
+    (3, 3, [0]),
+    (3, 10, [0]),
+    (0, 4, [0])
+])
+def test_window_starts(number_of_scenes, size, starts):
+    assert temporal_reduction.get_window_starts(number_of_scenes, size) == starts
+
+
+@pytest.mark.parametrize("number_of_scenes, size", [(n, s) for n in range(1, 30) for s in range(1, 12)])
+def test_windows_overlap_and_cover_scenes(number_of_scenes, size):
+    starts = temporal_reduction.get_window_starts(number_of_scenes, size)
+    assert starts[0] == 0
+    assert starts[-1] + size >= number_of_scenes
+    for start, successor in zip(starts, starts[1:]):
+        assert 0 < successor - start <= size - size // 2
+        assert successor + size <= number_of_scenes
+
+
+def test_windows_of_whole_scenario(world):
+    individuals = set(world.individuals())
+    scenes = temporal_reduction.get_sorted_scenes(world)
+    assert temporal_reduction.get_windows(world, individuals, len(scenes)) == [individuals]
+    assert temporal_reduction.get_windows(world, individuals, len(scenes) + 5) == [individuals]
+
+
+def test_windows_of_single_scenes(world):
+    individuals = set(world.individuals())
+    scenes = temporal_reduction.get_sorted_scenes(world)
+    windows = temporal_reduction.get_windows(world, individuals, 1)
+    assert len(windows) == len(scenes)
+    for scene, window in zip(scenes, windows):
+        assert scene in window
+        assert not window.intersection(set(scenes) - {scene})
+    assert set().union(*windows) == individuals
+
+
+def test_horizon_without_duration_bounds(world, caplog):
+    number_of_scenes = len(temporal_reduction.get_sorted_scenes(world))
+    with caplog.at_level(logging.WARNING):
+        assert temporal_reduction.get_temporal_horizon(world) == number_of_scenes
+    assert "No duration bounds" in caplog.text
+    assert temporal_reduction.get_temporal_horizon(world, default=2) == 2
+
+
+def test_individuals_in_time_windows(world):
+    individuals = set(world.individuals())
+    scenes = temporal_reduction.get_sorted_scenes(world)
+    times = [x.inTimePosition[0].numericPosition[0] for x in scenes]
+    windows = temporal_reduction.get_windows(world, individuals, 1)
+    assert temporal_reduction.get_individuals_in_time_windows(world, individuals, [(times[0], times[-1])]) == \
+        individuals
+    for time, window in zip(times, windows):
+        assert temporal_reduction.get_individuals_in_time_windows(world, individuals, [(time, time)]) == window
+    selected = temporal_reduction.get_individuals_in_time_windows(world, individuals, [(times[-1] + 1, times[-1] + 2)])
+    assert not selected.intersection(scenes)
+    assert selected < set.intersection(*windows)
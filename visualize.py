@@ -1,15 +1,13 @@
 import argparse
 import logging
-import os
+import sys
 import tempfile
 
-import owlready2
-
 from pyauto import auto
 from pyauto.visualizer import visualizer
 
 # Instantiate the parser
-from criticality_recognition import phenomena_extraction
+from criticality_recognition import phenomena_extraction, scenario_file
 
 parser = argparse.ArgumentParser(description="Visualization of criticality phenomena within inferred A.U.T.O. A-Boxes.")
 parser.add_argument("--cps", type=str, default="natural", metavar="{natural, csv, csv-file, none}",
@@ -19,8 +17,8 @@ parser.add_argument("--logging", type=str, metavar="{critical, error, warning, i
                                                                                                    " info")
 parser.add_argument("--output", type=str, nargs="?", default="/tmp/", metavar="FOLDER",
                     help="Optional. Store visualizations (folder with HTML files) in the given folder. Default: /tmp/")
-parser.add_argument("input", type=str, metavar="FILE", help="Input file. One .owl file containing exactly one scenario "
-                                                            "to visualize")
+parser.add_argument("input", type=str, metavar="FILE", help="Input file. One file (.owl, .nt or .sqlite3, as saved by "
+                                                            "infer.py) containing exactly one scenario to visualize")
 parser.add_argument("--no-visualization", action="store_true", help="If flag is set, does not produce visualization.")
 args = parser.parse_args()
 
@@ -49,11 +47,12 @@ logging.getLogger("shapely.geos").setLevel(logging.WARNING)
 # Extraction & Visualization
 scenario = args.input
 logger.info("Loading scenario from " + str(scenario))
-world = owlready2.get_ontology("file://" + os.path.abspath(scenario)).load().world
+world = scenario_file.load(scenario)
 
 # Extract CP objects
 logger.info("Extracting criticality phenomena from scenario")
 cps = phenomena_extraction.phenomena_scenario(world)
+phenomena_extraction.cache_most_specific_classes(cps)
 
 # Visualize
 tmp_dir = tempfile.gettempdir()
@@ -63,11 +62,10 @@ if not args.no_visualization:
 
 if args.cps != "none":
     # Print CPs
-    cps_list = phenomena_extraction.list_cps(cps, args.cps, world=world, print_non_visualizable_info=True)
     if args.cps != "csv-file":
-        print(cps_list)
+        phenomena_extraction.write_cps(sys.stdout, cps, args.cps, world=world, print_non_visualizable_info=True)
     else:
         csv_file_name = tmp_dir + "/cps_scenario.csv"
         with open(csv_file_name, "w+") as csv_file:
-            csv_file.write(cps_list)
+            phenomena_extraction.write_cps(csv_file, cps, args.cps, world=world, print_non_visualizable_info=True)
             logger.info("CSV file with criticality phenomena is available at: file://" + str(csv_file_name))